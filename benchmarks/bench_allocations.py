@@ -0,0 +1,180 @@
+#Measure memory allocations per frame during sustained
+#combat. Particles, sparks and projectiles are spawned and
+#removed every frame like in a fight. Dozens of enemies fire
+#so close to a hundred projectiles are flying at any time.
+#Three things are checked:
+#- the bytes a frame allocates on top of the memory in use
+#  when it starts, at the highest point during the frame.
+#  Objects made and dropped within the frame, like lists
+#  made again on every update, count here.
+#- the number of memory blocks allocated during a window of
+#  frames that are still alive at its end(retained blocks)
+#- the memory in use from one window to the next
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_allocations
+import math
+import os
+import random
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from scripts.clouds import Clouds
+from scripts.constants import init_assets, init_anims
+from scripts.particle import Particles
+from scripts.projectile import Projectiles
+from scripts.spark import Sparks, ANGLE_STEPS, SPEED_STEP
+
+WINDOWS = 8
+WINDOW_FRAMES = 120
+#Allowed growth of the memory in use from the second window
+#to the last. The first window also counts the memory
+#tracemalloc starts tracing on the first frames.
+MAX_GROWTH = 1.25
+#Allowed average of the bytes allocated on top of the
+#memory in use at the start of a frame, over the checked
+#windows. The sparks lists made again on every update and
+#the fblits() lists are most of it.
+MAX_FRAME_ALLOCATED = 8 * 1024
+#Allowed blocks allocated and still alive at the end, per
+#frame on average over the checked windows. Pools and caches
+#are full after the warm up so nothing should be kept from
+#frame to frame. Single windows go up and down a bit with
+#the number of sparks and particles alive.
+MAX_RETAINED = 0.25
+#Windows left out of the MAX_FRAME_ALLOCATED and
+#MAX_RETAINED checks. tracemalloc's own blocks are counted
+#in the first ones.
+SETTLE_WINDOWS = 2
+#Enemies shooting once a second, each on a different frame
+ENEMIES = 40
+#Frames a projectile flies before it hits something
+PROJECTILE_FRAMES = 120
+
+def explode(particles, sparks, pos):
+  #Same as Game.explode_entity()
+  for i in range(30):
+    r_angle = random.random() * math.pi * 2
+    r_speed = random.random() * 2
+    sparks.spawn(pos, r_angle, r_speed)
+    particles.spawn(
+      'dash',
+      pos,
+      [math.cos(r_angle + math.pi) * r_speed, math.sin(r_angle + math.pi) * r_speed],
+      random.randint(0, 7)
+    )
+
+def combat_frame(frame, display, clouds, particles, sparks, projectiles):
+  #Every enemy shoots once a second and every projectile
+  #hits something after PROJECTILE_FRAMES
+  for enemy in range(ENEMIES):
+    if (frame + enemy * 60 // ENEMIES) % 60 == 0:
+      pos = (random.random() * 320, random.random() * 240)
+      projectiles.acquire(pos, -1.25 if enemy % 2 else 1.25)
+      for i in range(6):
+        sparks.spawn(pos, random.random() - 0.25, 1 + random.random())
+  for projectile in list(projectiles):
+    if projectile.timer > PROJECTILE_FRAMES:
+      projectiles.release(projectile)
+      for i in range(6):
+        sparks.spawn(projectile.pos, random.random() - 0.5, 1 + random.random())
+
+  #The player dashes every 60 frames and kills an
+  #enemy every 30 frames
+  if frame % 60 == 0 or frame % 60 == 10:
+    for i in range(20):
+      angle = random.random() * math.pi * 2
+      speed = random.random() * 0.5 + 0.5
+      particles.spawn('dash', (160, 120), [math.cos(angle) * speed, math.sin(angle) * speed], random.randint(0, 7))
+  if frame % 30 == 0:
+    explode(particles, sparks, (random.random() * 320, random.random() * 240))
+  if random.randint(0, 100) < 3:
+    particles.spawn('leaf', (random.random() * 320, 0), velocity=[-0.15, 0.5], frame=random.randint(5, 15))
+
+  display.fill((0, 0, 0, 0))
+  clouds.update()
+  clouds.render(display, (0, 0))
+  projectiles.update()
+  projectiles.render(display, (0, 0))
+  sparks.update()
+  sparks.render(display, (0, 0))
+  particles.update()
+  particles.render(display, (0, 0))
+
+def main():
+  pygame.init()
+  pygame.display.set_mode((640, 480))
+  display = pygame.Surface((320, 240), pygame.SRCALPHA)
+  assets = init_assets()
+  clouds = Clouds(assets['clouds'], count=16)
+  particles = Particles(init_anims())
+  sparks = Sparks()
+  projectiles = Projectiles(assets['projectile'])
+
+  #Draw every spark sprite ahead of time. Sparks are never
+  #faster than 3, so the sprite cache can't grow after this.
+  for angle_step in range(ANGLE_STEPS):
+    for speed_step in range(round(3 / SPEED_STEP) + 1):
+      sparks.sprites[(angle_step, speed_step)] = sparks.draw_sprite(angle_step, speed_step)
+
+  random.seed(0)
+  frame = 0
+  #Warm up so the pools are full
+  for i in range(WINDOW_FRAMES * 2):
+    combat_frame(frame, display, clouds, particles, sparks, projectiles)
+    frame += 1
+
+  tracemalloc.start()
+  windows = []
+  retained_per_frame = []
+  allocated_per_frame = []
+  for window in range(WINDOWS):
+    before = tracemalloc.take_snapshot()
+    allocated = []
+    for i in range(WINDOW_FRAMES):
+      tracemalloc.reset_peak()
+      start = tracemalloc.get_traced_memory()[0]
+      combat_frame(frame, display, clouds, particles, sparks, projectiles)
+      allocated.append(tracemalloc.get_traced_memory()[1] - start)
+      frame += 1
+    after = tracemalloc.take_snapshot()
+
+    #Blocks allocated during the window that are still alive
+    #and the memory in use at the end of the window
+    retained = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    #The snapshots are traced too
+    del before, after
+    current, peak = tracemalloc.get_traced_memory()
+    windows.append(current)
+    retained_per_frame.append(retained / WINDOW_FRAMES)
+    allocated_per_frame.append(sum(allocated) / WINDOW_FRAMES)
+    print(
+      f'window {window}: '
+      f'{sum(allocated) / WINDOW_FRAMES / 1024:.1f} KiB allocated/frame({max(allocated) / 1024:.1f} at most), '
+      f'{retained / WINDOW_FRAMES:+.2f} retained blocks/frame, '
+      f'{current / 1024:.1f} KiB in use, '
+      f'{len(particles)} particles, {len(sparks)} sparks, {len(projectiles)} projectiles, '
+      f'{len(projectiles.free)} free projectiles'
+    )
+  tracemalloc.stop()
+
+  growth = windows[-1] / windows[1]
+  print(f'memory growth: {growth:.2f}x')
+  if growth > MAX_GROWTH:
+    raise SystemExit(f'memory grew more than {MAX_GROWTH}x during combat')
+  checked = allocated_per_frame[SETTLE_WINDOWS:]
+  allocated = sum(checked) / len(checked)
+  print(f'allocated/frame after window {SETTLE_WINDOWS - 1}: {allocated / 1024:.1f} KiB')
+  if allocated > MAX_FRAME_ALLOCATED:
+    raise SystemExit(f'frames allocated more than {MAX_FRAME_ALLOCATED / 1024:.0f} KiB on average during combat')
+  checked = retained_per_frame[SETTLE_WINDOWS:]
+  retained = sum(checked) / len(checked)
+  print(f'retained blocks/frame after window {SETTLE_WINDOWS - 1}: {retained:+.2f}')
+  if retained > MAX_RETAINED:
+    raise SystemExit(f'more than {MAX_RETAINED} blocks/frame were kept during combat')
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,74 @@
+#Compare loading the game images from separate PNG files
+#against loading them from the atlas made by pack_atlas.py,
+#and check that both give the same pixels. Every load runs
+#in a new process.
+#
+#Run from the game directory after python3 pack_atlas.py:
+#python3 -m benchmarks.bench_atlas
+import os
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from scripts import utils
+from scripts.atlas import ATLAS_PATH, ATLAS_INDEX
+from scripts.constants import init_assets, init_anims
+
+#Runs in the child process. Prints the load time.
+def child(use_atlas):
+  pygame.init()
+  pygame.display.set_mode((640, 480))
+  if not use_atlas:
+    utils.atlas = False
+  start = time.perf_counter()
+  init_assets()
+  init_anims()
+  print(time.perf_counter() - start)
+
+def measure(use_atlas):
+  output = subprocess.check_output(
+    [sys.executable, '-m', 'benchmarks.bench_atlas', '--child', str(int(use_atlas))],
+    text=True
+  )
+  return float(output.split()[-1])
+
+#Every loaded image as (name, RGBA bytes, colorkey)
+def loaded_images():
+  images = []
+  tables = [init_assets(), {name: animation.images for name, animation in init_anims().items()}]
+  for table in tables:
+    for name, value in table.items():
+      for i, image in enumerate(value if isinstance(value, list) else [value]):
+        images.append((name + '/' + str(i), pygame.image.tobytes(image, 'RGBA'), image.get_colorkey()))
+  return images
+
+def main():
+  if len(sys.argv) > 2 and sys.argv[1] == '--child':
+    child(sys.argv[2] == '1')
+    return
+  if not os.path.exists(ATLAS_PATH + ATLAS_INDEX):
+    print('No atlas found. Run python3 pack_atlas.py first.')
+    return
+
+  pygame.init()
+  pygame.display.set_mode((640, 480))
+  utils.atlas = False
+  files = loaded_images()
+  utils.atlas = None
+  atlas = loaded_images()
+  if not utils.atlas:
+    raise SystemExit('The atlas is out of date. Run python3 pack_atlas.py first.')
+  if files != atlas:
+    raise SystemExit('Images loaded from the atlas are different')
+  print(f'{len(files)} images, same pixels from files and atlas')
+
+  for name, use_atlas in [('files', False), ('atlas', True)]:
+    best = min(measure(use_atlas) for i in range(5))
+    print(f'{name}: load {best * 1000:.1f} ms')
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,113 @@
+#Stress scene for the hit checks between the player, enemies
+#and projectiles: 500 enemies on a short level and 2000
+#projectiles flying at all times. Checks that looking up
+#projectiles by row finds the same hits as checking every
+#pair, compares both ways and measures whole logic steps
+#against the frame budget. Fails if a step takes longer
+#than the budget.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_broadphase
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.stress_level import generate_stress_level
+from game import Game
+from scripts.constants import LOGIC_STEP
+from scripts.editor.saveload import SaveLoad
+
+LEVEL_WIDTH = 120
+ENEMIES = 500
+PROJECTILES = 2000
+STEPS = 600
+#The player dashes during this many steps out of every 120
+DASH_STEPS = 40
+
+#Fire projectiles from random places until there are
+#PROJECTILES of them. Enemies never fire from inside a wall,
+#so places in solid tiles are skipped.
+def fill_projectiles(game, rng):
+  size = game.tilemap.tile_size
+  while len(game.projectiles) < PROJECTILES:
+    enemy = rng.choice(game.enemy_spawner) if game.enemy_spawner else game.player
+    pos = (rng.random() * LEVEL_WIDTH * size, enemy.pos[1] + rng.random() * 15)
+    if not game.tilemap.solid_tile(pos):
+      game.projectiles.acquire(pos, rng.choice((-1.25, 1.25)))
+
+#The checks before projectiles were sorted by row: every
+#projectile against the player and every enemy against a new
+#player rect
+def pairwise_hits(game):
+  player = game.player
+  hits = set()
+  for projectile in game.projectiles:
+    if player.rect().collidepoint(projectile.pos):
+      hits.add(projectile)
+  targets = set()
+  for enemy in game.enemy_spawner:
+    if enemy.rect().colliderect(player.rect()):
+      targets.add(enemy)
+  return hits, targets
+
+#The checks done by Game.step() and Enemy.update()
+def row_hits(game):
+  player_rect = game.player.rect()
+  hits = game.projectiles.inside([player_rect])
+  targets = set()
+  for enemy in game.enemy_spawner:
+    if enemy.rect().colliderect(player_rect):
+      targets.add(enemy)
+  return hits, targets
+
+def main():
+  with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, 'stress.json')
+    SaveLoad().save(path, generate_stress_level(LEVEL_WIDTH, 0, ENEMIES))
+    game = Game(headless=True, seed=0)
+    game.load_level(path)
+
+  rng = random.Random(0)
+  pairwise_time = 0
+  row_time = 0
+  step_time = 0
+  worst_step = 0
+  for step in range(STEPS):
+    fill_projectiles(game, rng)
+    #The player can't die in the stress scene and keeps
+    #dashing for a part of the steps
+    game.dead = 0
+    if step % 120 < DASH_STEPS:
+      game.player.dashing = 60
+
+    start = time.perf_counter()
+    expected = pairwise_hits(game)
+    pairwise_time += time.perf_counter() - start
+    start = time.perf_counter()
+    found = row_hits(game)
+    row_time += time.perf_counter() - start
+    if found != expected:
+      sys.exit(f'step {step}: looking up rows found different hits than checking every pair')
+
+    start = time.perf_counter()
+    game.step()
+    elapsed = time.perf_counter() - start
+    step_time += elapsed
+    worst_step = max(worst_step, elapsed)
+
+  print(f'{STEPS} steps, {len(game.enemy_spawner)} enemies left, {PROJECTILES} projectiles, same hits')
+  print(
+    f'hit checks: every pair {pairwise_time / STEPS * 1000:.2f} ms/step, '
+    f'by row {row_time / STEPS * 1000:.2f} ms/step'
+  )
+  print(
+    f'logic step {step_time / STEPS * 1000:.2f} ms on average, {worst_step * 1000:.2f} ms at worst, '
+    f'budget {LOGIC_STEP * 1000:.2f} ms'
+  )
+  if worst_step > LOGIC_STEP:
+    raise SystemExit(f'a logic step took {worst_step * 1000:.2f} ms, more than the budget')
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,78 @@
+#Compare drawing whole frames against drawing only the parts
+#that changed (DIRTY_RECTS in scripts/constants.py). Plays the
+#standard input traces and a scene where nobody presses a key
+#and the camera stands still. Both ways must put the same
+#pixels on the screen on every frame.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_dirty
+import math
+import os
+import time
+import zlib
+
+import pygame
+
+from benchmarks.record_traces import TRACE_DIR
+from game import Game
+from scripts.dirtyrects import DirtyRects
+from scripts.replay import Replay, load_trace
+
+IDLE_FRAMES = 1200
+#Every scene is played this many times each way and the
+#fastest time is kept
+REPEATS = 3
+
+#Returns the checksum of the screen after every frame, the
+#time spent drawing and the average fraction redrawn
+def play(seed, level, inputs, dirty):
+  game = Game(headless=True, seed=seed, level=level)
+  if dirty:
+    game.dirty = DirtyRects(game.display.get_size())
+  checksums = []
+  elapsed = 0
+  for events in inputs(game):
+    game.step(events)
+    start = time.perf_counter()
+    game.render()
+    elapsed += time.perf_counter() - start
+    checksums.append(zlib.crc32(pygame.image.tobytes(game.screen, 'RGB')))
+  return checksums, elapsed, game.dirty.average() if dirty else 1
+
+def trace_inputs(trace):
+  def inputs(game):
+    replay = Replay(trace)
+    while not replay.done():
+      yield replay.next_events(game.movement)
+  return inputs
+
+def idle_inputs(game):
+  for i in range(IDLE_FRAMES):
+    yield []
+
+def main():
+  scenes = []
+  for file_name in sorted(os.listdir(TRACE_DIR)):
+    trace = load_trace(os.path.join(TRACE_DIR, file_name))
+    scenes.append((file_name, trace['seed'], trace['level'], trace_inputs(trace)))
+  scenes.append(('idle', 0, 0, idle_inputs))
+
+  for name, seed, level, inputs in scenes:
+    full_time = dirty_time = math.inf
+    for i in range(REPEATS):
+      full_checksums, elapsed, redrawn = play(seed, level, inputs, False)
+      full_time = min(full_time, elapsed)
+      dirty_checksums, elapsed, redrawn = play(seed, level, inputs, True)
+      dirty_time = min(dirty_time, elapsed)
+    for frame, (full, dirty) in enumerate(zip(full_checksums, dirty_checksums)):
+      if full != dirty:
+        raise SystemExit(f'{name}: frame {frame} is different with dirty rects')
+    frames = len(full_checksums)
+    print(
+      f'{name}: {frames} frames, same pixels, '
+      f'{redrawn:.0%} of the screen redrawn, '
+      f'whole frames {full_time / frames * 1000:.2f} ms, dirty rects {dirty_time / frames * 1000:.2f} ms'
+    )
+
+if __name__ == '__main__':
+  main()
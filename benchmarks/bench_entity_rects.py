@@ -0,0 +1,82 @@
+#Compare Enemy.update() with hundreds of enemies before and
+#after entities kept one collision rect and the tilemap kept
+#the collision rects around every cell. The old way made a
+#new rect on every rect() call and looked up the tiles around
+#an entity and made their rects on every update. Both must
+#move the enemies the same way.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_entity_rects
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pygame
+
+from benchmarks.stress_level import generate_stress_level
+from game import Game
+from scripts.editor.saveload import SaveLoad
+from scripts.entities import PhysicsEntity
+from scripts.tilemap import CLOSEST_TILES, Tilemap
+
+LEVEL_WIDTH = 200
+ENEMY_COUNTS = [100, 300, 600]
+FRAMES = 300
+
+#rect() and closest_collision_tiles() before the rects were
+#kept
+def new_rect(self):
+  return pygame.Rect(self.pos[0], self.pos[1], self.size[0], self.size[1])
+
+def new_collision_tiles(self, pos):
+  rects = []
+  tile_x = int(pos[0] // self.tile_size)
+  tile_y = int(pos[1] // self.tile_size)
+  for offset in CLOSEST_TILES:
+    x = tile_x + offset[0]
+    y = tile_y + offset[1]
+    if self.solid_ids[self.grid.tile_id(x, y)]:
+      rects.append(pygame.Rect(x * self.tile_size, y * self.tile_size, self.tile_size, self.tile_size))
+  return rects
+
+#Returns the time per enemy update and where the enemies
+#ended up
+def run(game, path):
+  random.seed(0)
+  game.load_level(path)
+  enemies = game.enemy_spawner
+  tilemap = game.tilemap
+  elapsed = 0
+  for frame in range(FRAMES):
+    start = time.perf_counter()
+    for enemy in enemies:
+      enemy.update(tilemap, (0, 0))
+    elapsed += time.perf_counter() - start
+    #Shots don't matter here
+    game.projectiles.clear()
+  return elapsed / (FRAMES * len(enemies)), [tuple(enemy.pos) for enemy in enemies]
+
+def main():
+  game = Game(headless=True, seed=0)
+  kept = (PhysicsEntity.rect, Tilemap.closest_collision_tiles)
+  with tempfile.TemporaryDirectory() as directory:
+    for count in ENEMY_COUNTS:
+      path = os.path.join(directory, f'stress{count}.json')
+      SaveLoad().save(path, generate_stress_level(LEVEL_WIDTH, 0, count))
+
+      PhysicsEntity.rect, Tilemap.closest_collision_tiles = new_rect, new_collision_tiles
+      new_time, new_positions = run(game, path)
+      PhysicsEntity.rect, Tilemap.closest_collision_tiles = kept
+      kept_time, kept_positions = run(game, path)
+      if new_positions != kept_positions:
+        sys.exit(f'{count} enemies: the enemies moved differently with kept rects')
+
+      print(
+        f'{count} enemies: new rects {new_time * 1000000:.2f} us/update, '
+        f'kept rects {kept_time * 1000000:.2f} us/update'
+      )
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,79 @@
+#Measure Tilemap.extract() on maps with many off-grid tiles
+#and compare it with scanning the tile list like extract()
+#used to do.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_extract
+import random
+import time
+
+import pygame
+
+from scripts.tilemap import Tilemap
+
+MAP_SIZES = [1000, 10000, 40000]
+SPAWNER_RATE = 0.01
+TREE_RATE = 0.05
+
+class BenchGame:
+  def __init__(self):
+    self.assets = {
+      'decor': [pygame.Surface((16, 16)) for i in range(4)],
+      'large_decor': [pygame.Surface((32, 32)) for i in range(3)],
+      'spawner': [pygame.Surface((16, 16)) for i in range(2)]
+    }
+
+def build_offgrid(count):
+  tiles = []
+  for i in range(count):
+    r = random.random()
+    if r < SPAWNER_RATE:
+      tile = {'type': 'spawner', 'variant': random.randint(0, 1)}
+    elif r < SPAWNER_RATE + TREE_RATE:
+      tile = {'type': 'large_decor', 'variant': 2}
+    else:
+      tile = {'type': 'decor', 'variant': random.randint(0, 3)}
+    tile['pos'] = [random.randint(0, 50000), random.randint(0, 2000)]
+    tiles.append(tile)
+  return tiles
+
+#The old extract(): copy the list, scan every tile and
+#remove the matches with list.remove()
+def extract_by_scan(offgrid_tiles, attr_pairs, keep=False):
+  matches = []
+  for tile in offgrid_tiles.copy():
+    if (tile['type'], tile['variant']) in attr_pairs:
+      matches.append(tile.copy())
+      if not keep:
+        offgrid_tiles.remove(tile)
+  return matches
+
+def main():
+  random.seed(0)
+  game = BenchGame()
+  for size in MAP_SIZES:
+    tiles = build_offgrid(size)
+
+    scan_tiles = [tile.copy() for tile in tiles]
+    start = time.perf_counter()
+    scan_trees = extract_by_scan(scan_tiles, [('large_decor', 2)], True)
+    scan_spawners = extract_by_scan(scan_tiles, [('spawner', 0), ('spawner', 1)])
+    scan_time = time.perf_counter() - start
+
+    tilemap = Tilemap(game)
+    tilemap.load_offgrid([tile.copy() for tile in tiles])
+    start = time.perf_counter()
+    trees = tilemap.extract([('large_decor', 2)], True)
+    spawners = tilemap.extract([('spawner', 0), ('spawner', 1)])
+    index_time = time.perf_counter() - start
+
+    assert trees == scan_trees and spawners == scan_spawners
+
+    print(
+      f'{size} off-grid tiles, {len(trees) + len(spawners)} matches: '
+      f'scan {scan_time * 1000:.2f} ms, '
+      f'index {index_time * 1000:.2f} ms'
+    )
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,68 @@
+#Compare drawing enemies with the images flipped on every
+#frame against the flipped images made when the animations
+#are loaded.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_flip
+import time
+
+import pygame
+
+from game import Game
+from scripts.enemy import Enemy
+
+ENEMY_COUNTS = [200, 500]
+FRAMES = 300
+
+#Enemy.render() before the flipped images were cached
+def render_flip_every_frame(enemy, surf, offset, alpha=1):
+  pos = enemy.render_pos(alpha)
+  surf.blit(
+    pygame.transform.flip(enemy.animation.image(), enemy.flip, False),
+    (int(pos[0]) - offset[0] + enemy.anim_offset[0], int(pos[1]) - offset[1] + enemy.anim_offset[1])
+  )
+  rect = enemy.render_rect(alpha)
+  gun = enemy.game.assets['gun']
+  if enemy.flip:
+    surf.blit(pygame.transform.flip(gun, enemy.flip, False), (rect.centerx - gun.get_width() - 2 - offset[0], rect.centery - offset[1]))
+  else:
+    surf.blit(gun, (rect.centerx + 2 - offset[0], rect.centery - offset[1]))
+
+def run(enemies, display, render):
+  for enemy in enemies:
+    enemy.animation.frame = 0
+  start = time.perf_counter()
+  for frame in range(FRAMES):
+    display.fill((0, 0, 0, 0))
+    for enemy in enemies:
+      enemy.animation.update()
+      render(enemy, display, (0, 0))
+  return time.perf_counter() - start
+
+def main():
+  game = Game(headless=True, seed=0)
+  display = game.display
+
+  for count in ENEMY_COUNTS:
+    #Enemies all over the screen, half of them facing left
+    enemies = []
+    for i in range(count):
+      enemy = Enemy(game, ((i * 37) % 300, (i * 53) % 220), (8, 15))
+      enemy.flip = bool(i % 2)
+      enemies.append(enemy)
+
+    old_time = run(enemies, display, render_flip_every_frame)
+    old_display = display.copy()
+    new_time = run(enemies, display, Enemy.render)
+    #Both ways must draw the same frame
+    if pygame.image.tobytes(old_display, 'RGBA') != pygame.image.tobytes(display, 'RGBA'):
+      raise SystemExit('cached flipped images were drawn differently')
+
+    print(
+      f'{count} enemies: '
+      f'flip every frame {old_time / FRAMES * 1000:.2f} ms/frame, '
+      f'cached flipped images {new_time / FRAMES * 1000:.2f} ms/frame'
+    )
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,124 @@
+#Compare load time and memory of JSON and binary levels.
+#Every load runs in a new process so the memory of one
+#format doesn't hide the other. Memory is read from
+#/proc/self/status, so this runs on Linux.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_level_format
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from scripts.editor.saveload import SaveLoad
+
+#Width and height of the generated level in tiles
+LEVEL_SIZE = (2000, 200)
+OFFGRID_COUNT = 20000
+
+def generate_level():
+  tilemap = {}
+  for x in range(LEVEL_SIZE[0]):
+    #Fill the bottom half of the level with ground and some
+    #floating platforms above it
+    ground = LEVEL_SIZE[1] // 2 + random.randint(-2, 2)
+    for y in range(LEVEL_SIZE[1]):
+      if y >= ground or random.random() < 0.05:
+        tilemap[str(x) + ',' + str(y)] = {
+          'type': random.choice(['grass', 'stone']),
+          'variant': random.randint(0, 8),
+          'pos': [x, y]
+        }
+
+  offgrid = []
+  for i in range(OFFGRID_COUNT):
+    offgrid.append({
+      'type': random.choice(['decor', 'large_decor']),
+      'variant': random.randint(0, 2),
+      'pos': [random.randint(0, LEVEL_SIZE[0] * 16), random.randint(0, LEVEL_SIZE[1] * 8)]
+    })
+  return {'tilemap': tilemap, 'tile_size': 16, 'offgrid': offgrid}
+
+#Current(VmRSS) and peak(VmHWM) resident memory of this
+#process in KiB
+def memory():
+  values = {}
+  f = open('/proc/self/status', 'r')
+  for line in f:
+    name, value = line.split(':', 1)
+    if name in ('VmRSS', 'VmHWM'):
+      values[name] = int(value.split()[0])
+  f.close()
+  return values['VmRSS'], values['VmHWM']
+
+#Runs in the child process. Loads the level into a TileGrid
+#and prints the load time and how much the RSS grew during
+#the load and at its peak, in KiB.
+def child(path):
+  from scripts.grid import TileGrid
+
+  saveload = SaveLoad()
+  grid = TileGrid()
+  #Reset the peak to the current RSS so only the load counts.
+  #ru_maxrss can't be used, it keeps the peak of the parent.
+  f = open('/proc/self/clear_refs', 'w')
+  f.write('5')
+  f.close()
+  rss_before = memory()[0]
+
+  start = time.perf_counter()
+  #Call load_json() for JSON levels because load() would
+  #pick the binary copy next to it
+  if path.endswith('.json'):
+    map_data = saveload.load_json(path)
+  else:
+    map_data = saveload.load_binary(path)
+  if 'chunks' in map_data:
+    for chunk_x, chunk_y, types, variants in map_data['chunks']:
+      grid.load_chunk(chunk_x, chunk_y, map_data['types'], types, variants)
+  else:
+    for tile in map_data['tilemap'].values():
+      grid.set(tile['pos'][0], tile['pos'][1], tile['type'], tile['variant'])
+    #Free the parsed dicts like Tilemap.load_data() does
+    del map_data
+  load_time = time.perf_counter() - start
+
+  rss_after, rss_peak = memory()
+  print(load_time, rss_after - rss_before, rss_peak - rss_before, len(grid))
+
+def measure(path):
+  output = subprocess.check_output(
+    [sys.executable, '-m', 'benchmarks.bench_level_format', '--child', path],
+    text=True
+  )
+  load_time, rss, peak, tile_count = output.split()
+  return float(load_time), int(rss), int(peak), int(tile_count)
+
+def main():
+  if len(sys.argv) > 2 and sys.argv[1] == '--child':
+    child(sys.argv[2])
+    return
+
+  random.seed(0)
+  saveload = SaveLoad()
+  level = generate_level()
+
+  with tempfile.TemporaryDirectory() as directory:
+    json_path = os.path.join(directory, 'level.json')
+    binary_path = os.path.join(directory, 'level.bin')
+    saveload.save(json_path, level)
+    saveload.save_binary(binary_path, level)
+
+    for name, path in [('json', json_path), ('binary', binary_path)]:
+      load_time, rss, peak, tile_count = measure(path)
+      print(
+        f'{name}: {os.path.getsize(path) / 1024:,.0f} KiB file, '
+        f'{tile_count} on-grid tiles, '
+        f'load {load_time * 1000:.1f} ms, '
+        f'RSS +{rss / 1024:,.1f} MiB after the load, +{peak / 1024:,.1f} MiB at the peak'
+      )
+
+if __name__ == '__main__':
+  main()
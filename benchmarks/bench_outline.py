@@ -0,0 +1,61 @@
+#Compare create_outline() against the mask based outline it
+#replaced on every frame of the standard input traces. Both
+#must draw the same pixels.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_outline
+import os
+import time
+
+import pygame
+
+import game as game_module
+from benchmarks.record_traces import TRACE_DIR
+from game import Game
+from scripts.replay import Replay, load_trace
+from scripts.utils import create_outline
+
+#create_outline() before the silhouette was made by blending
+def create_outline_mask(non_silhouette_surf, display_surf):
+  mask = pygame.mask.from_surface(display_surf)
+  silhouette = mask.to_surface(setcolor=(0,0,0,100), unsetcolor=(0,0,0,0))
+  for offset in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+    non_silhouette_surf.blit(silhouette, offset)
+  non_silhouette_surf.blit(display_surf, (0, 0))
+
+class OutlineCheck:
+  def __init__(self):
+    self.frames = 0
+    self.mask_time = 0
+    self.blend_time = 0
+
+  #Called by Game.render() instead of create_outline()
+  def __call__(self, non_silhouette_surf, display_surf, silhouette_surf=None):
+    expected = non_silhouette_surf.copy()
+    start = time.perf_counter()
+    create_outline_mask(expected, display_surf)
+    self.mask_time += time.perf_counter() - start
+
+    start = time.perf_counter()
+    create_outline(non_silhouette_surf, display_surf, silhouette_surf)
+    self.blend_time += time.perf_counter() - start
+
+    if pygame.image.tobytes(expected, 'RGB') != pygame.image.tobytes(non_silhouette_surf, 'RGB'):
+      raise SystemExit(f'frame {self.frames}: the outline is different from the mask outline')
+    self.frames += 1
+
+def main():
+  check = OutlineCheck()
+  game_module.create_outline = check
+  for file_name in sorted(os.listdir(TRACE_DIR)):
+    trace = load_trace(os.path.join(TRACE_DIR, file_name))
+    Replay(trace).play(Game(headless=True, seed=trace['seed'], level=trace['level']), render=True)
+
+  print(f'{check.frames} frames, same pixels as the mask outline')
+  print(
+    f'mask outline {check.mask_time / check.frames * 1000000:.0f} us/frame, '
+    f'create_outline {check.blend_time / check.frames * 1000000:.0f} us/frame'
+  )
+
+if __name__ == '__main__':
+  main()
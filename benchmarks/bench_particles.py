@@ -0,0 +1,65 @@
+#Measure the update and render time of particles per frame
+#with thousands of live particles. Fails if 10000 particles
+#don't fit in one frame at 60 FPS.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_particles
+import os
+import random
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from scripts.constants import LOGIC_STEP, init_anims
+from scripts.particle import Particles
+
+PARTICLE_COUNTS = [500, 2000, 10000]
+FRAMES = 120
+
+def spawn(particles, count):
+  #Keep the number of live particles at 'count'
+  for i in range(count - len(particles)):
+    particles.spawn(
+      random.choice(['leaf', 'dash']),
+      (random.random() * 320, random.random() * 240),
+      (random.random() - 0.5, random.random() - 0.5),
+      random.randint(0, 5)
+    )
+
+def main():
+  pygame.init()
+  pygame.display.set_mode((640, 480))
+  display = pygame.Surface((320, 240), pygame.SRCALPHA)
+  particles = Particles(init_anims())
+
+  random.seed(0)
+  for count in PARTICLE_COUNTS:
+    particles.clear()
+    spawn(particles, count)
+
+    update_time = 0
+    render_time = 0
+    for frame in range(FRAMES):
+      spawn(particles, count)
+      start = time.perf_counter()
+      particles.update()
+      update_time += time.perf_counter() - start
+
+      start = time.perf_counter()
+      particles.render(display)
+      render_time += time.perf_counter() - start
+
+    frame_time = (update_time + render_time) / FRAMES
+    print(
+      f'{count} particles: '
+      f'update {update_time / FRAMES * 1000:.2f} ms/frame, '
+      f'render {render_time / FRAMES * 1000:.2f} ms/frame, '
+      f'total {frame_time * 1000:.2f} ms/frame'
+    )
+    if count >= 10000 and frame_time > LOGIC_STEP:
+      raise SystemExit(f'{count} particles take more than a frame({LOGIC_STEP * 1000:.2f} ms)')
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,50 @@
+#Measure the cost of the frame profiler. The same frames are
+#run with the profiler disabled and enabled, then the times of
+#every scope are printed and saved as CSV and JSON to a
+#temporary directory that is removed afterwards.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_profiler
+import os
+import tempfile
+import time
+
+from benchmarks.bench_simulation import make_inputs, SEED
+from game import Game
+
+FRAMES = 1000
+
+def simulate(inputs, profile):
+  game = Game(headless=True, seed=SEED)
+  if profile:
+    game.profiler.toggle()
+    game.profiler.end_frame()
+
+  start = time.perf_counter()
+  for events in inputs:
+    game.step(events)
+    game.render()
+    game.profiler.render(game.screen)
+    game.profiler.end_frame()
+  return time.perf_counter() - start, game.profiler
+
+def main():
+  inputs = make_inputs(FRAMES, SEED)
+
+  disabled_time, profiler = simulate(inputs, False)
+  enabled_time, profiler = simulate(inputs, True)
+  print(f'disabled: {disabled_time / FRAMES * 1000:.3f} ms/frame')
+  print(f'enabled: {enabled_time / FRAMES * 1000:.3f} ms/frame (with overlay)')
+
+  print(f'{"scope":<12}{"p50 ms":>8}{"p99 ms":>8}')
+  for name, (p50, p99) in profiler.percentiles().items():
+    print(f'{name:<12}{p50:8.3f}{p99:8.3f}')
+
+  with tempfile.TemporaryDirectory() as directory:
+    for name, dump in (('profile.csv', profiler.dump_csv), ('profile.json', profiler.dump_json)):
+      path = os.path.join(directory, name)
+      dump(path)
+      print(f'{name}: {os.path.getsize(path)} bytes')
+
+if __name__ == '__main__':
+  main()
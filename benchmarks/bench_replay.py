@@ -0,0 +1,35 @@
+#Replay the standard input traces headless and measure the
+#steps per second of the game logic alone and with every
+#step drawn. Every replay must end in the recorded state.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_replay
+import os
+import time
+
+from benchmarks.record_traces import TRACE_DIR
+from game import Game
+from scripts.replay import Replay, load_trace
+
+def replay(trace, render):
+  game = Game(headless=True, seed=trace['seed'], level=trace['level'])
+  start = time.perf_counter()
+  matched = Replay(trace).play(game, render)
+  return time.perf_counter() - start, matched
+
+def main():
+  for file_name in sorted(os.listdir(TRACE_DIR)):
+    trace = load_trace(os.path.join(TRACE_DIR, file_name))
+    steps = len(trace['inputs'])
+    logic_time, logic_matched = replay(trace, False)
+    render_time, render_matched = replay(trace, True)
+    print(
+      f'{file_name}: {steps} steps, '
+      f'logic {steps / logic_time:.0f} steps/s, '
+      f'logic and render {steps / render_time:.0f} steps/s'
+    )
+    if not (logic_matched and render_matched):
+      raise SystemExit('replay of ' + file_name + ' did not end in the recorded state')
+
+if __name__ == '__main__':
+  main()
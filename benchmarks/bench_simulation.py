@@ -0,0 +1,71 @@
+#Measure how many frames per second the game logic runs
+#in headless mode, with and without drawing the frames, and
+#check that two runs with the same seed and inputs end in
+#the same state.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_simulation
+import random
+import time
+
+import pygame
+
+from game import Game
+
+FRAMES = 3000
+SEED = 0
+KEYS = [pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_SPACE]
+
+#Random key presses and releases. The inputs have their own
+#random generator so they don't change the game's random
+#numbers.
+def make_inputs(frames, seed):
+  rng = random.Random(seed)
+  inputs = []
+  for frame in range(frames):
+    events = []
+    r = rng.random()
+    if r < 0.1:
+      events.append(pygame.event.Event(pygame.KEYDOWN, key=rng.choice(KEYS)))
+    elif r < 0.2:
+      events.append(pygame.event.Event(pygame.KEYUP, key=rng.choice(KEYS)))
+    inputs.append(events)
+  return inputs
+
+def state(game):
+  return (
+    game.frame,
+    game.level,
+    tuple(game.player.pos),
+    len(game.enemy_spawner),
+    len(game.projectiles),
+    len(game.particles),
+    len(game.sparks)
+  )
+
+def simulate(inputs, render):
+  game = Game(headless=True, seed=SEED)
+  start = time.perf_counter()
+  for events in inputs:
+    game.step(events)
+    if render:
+      game.render()
+  return time.perf_counter() - start, state(game)
+
+def main():
+  inputs = make_inputs(FRAMES, SEED)
+
+  logic_time, logic_state = simulate(inputs, False)
+  print(f'logic only: {FRAMES / logic_time:.0f} frames/s')
+  render_time, render_state = simulate(inputs, True)
+  print(f'logic and render: {FRAMES / render_time:.0f} frames/s')
+
+  #Drawing doesn't use random numbers, so both runs must
+  #end in the same state
+  print('final state:', logic_state)
+  if logic_state != render_state:
+    raise SystemExit('runs with the same seed and inputs ended in different states')
+  print('deterministic: yes')
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,88 @@
+#Time the solid tile queries of the tilemap on a stress level:
+#a point, a rect and a ray along a row of tiles. The rect and
+#ray queries search the solid bytes of a chunk row with
+#find() and are compared against checking one tile at a
+#time with solid_tile(). Both must give the same answers.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_solid
+import random
+import sys
+import time
+
+from benchmarks.stress_level import generate_stress_level
+from game import Game
+from scripts.tilemap import Tilemap
+
+LEVEL_WIDTH = 1000
+QUERIES = 20000
+#Largest rect and ray in tiles
+RECT_TILES = 4
+RAY_TILES = 40
+
+def tile_rect(tilemap, rect):
+  size = tilemap.tile_size
+  for x in range(rect[0] // size, (rect[0] + rect[2] - 1) // size + 1):
+    for y in range(rect[1] // size, (rect[1] + rect[3] - 1) // size + 1):
+      if tilemap.solid_tile((x * size, y * size)):
+        return True
+  return False
+
+def tile_ray(tilemap, pos, end_x):
+  size = tilemap.tile_size
+  step = 1 if end_x >= pos[0] else -1
+  for x in range(int(pos[0] // size), int(end_x // size) + step, step):
+    if tilemap.solid_tile((x * size, pos[1])):
+      if step > 0:
+        return max(x * size, pos[0])
+      return min((x + 1) * size, pos[0])
+  return None
+
+def timed(function, queries):
+  start = time.perf_counter()
+  results = [function(*query) for query in queries]
+  return (time.perf_counter() - start) / len(queries), results
+
+def main():
+  game = Game(headless=True, seed=0)
+  tilemap = Tilemap(game, tile_size=16)
+  tilemap.load_data(generate_stress_level(LEVEL_WIDTH, 0, 0), warm=False)
+  size = tilemap.tile_size
+
+  rng = random.Random(0)
+  #Around the ground in the middle of the level
+  def random_pos():
+    return (rng.random() * LEVEL_WIDTH * size, (30 + rng.random() * 60) * size)
+
+  points = [(random_pos(),) for i in range(QUERIES)]
+  rects = []
+  for i in range(QUERIES):
+    x, y = random_pos()
+    rects.append(((int(x), int(y), rng.randint(1, RECT_TILES * size), rng.randint(1, RECT_TILES * size)),))
+  rays = []
+  for i in range(QUERIES):
+    pos = random_pos()
+    rays.append((pos, pos[0] + rng.uniform(-RAY_TILES, RAY_TILES) * size))
+
+  point_time, point_results = timed(tilemap.solid_tile, points)
+  rect_time, rect_results = timed(tilemap.solid_rect, rects)
+  tile_rect_time, tile_rect_results = timed(lambda rect: tile_rect(tilemap, rect), rects)
+  ray_time, ray_results = timed(tilemap.ray_cast_x, rays)
+  tile_ray_time, tile_ray_results = timed(lambda pos, end_x: tile_ray(tilemap, pos, end_x), rays)
+  if rect_results != tile_rect_results:
+    sys.exit('solid_rect() is different from checking every tile')
+  if ray_results != tile_ray_results:
+    sys.exit('ray_cast_x() is different from checking every tile')
+
+  print(f'point: {point_time * 1000000:.2f} us/query, {sum(point_results) / QUERIES:.0%} solid')
+  print(
+    f'rect up to {RECT_TILES}x{RECT_TILES} tiles: every tile {tile_rect_time * 1000000:.2f} us/query, '
+    f'solid_rect {rect_time * 1000000:.2f} us/query'
+  )
+  print(
+    f'ray up to {RAY_TILES} tiles: every tile {tile_ray_time * 1000000:.2f} us/query, '
+    f'ray_cast_x {ray_time * 1000000:.2f} us/query'
+  )
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,59 @@
+#Measure the update and render time of sparks per frame
+#with many explosions on the screen.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_sparks
+import math
+import os
+import random
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from scripts.spark import Sparks
+
+SPARK_COUNTS = [300, 1500, 6000]
+FRAMES = 120
+
+def spawn(sparks, count):
+  #Spawn bursts of 30 sparks like Game.explode_entity()
+  #until there are 'count' sparks
+  while len(sparks) < count:
+    pos = (random.random() * 320, random.random() * 240)
+    for i in range(30):
+      sparks.spawn(pos, random.random() * math.pi * 2, random.random() * 2)
+
+def main():
+  pygame.init()
+  pygame.display.set_mode((640, 480))
+  display = pygame.Surface((320, 240), pygame.SRCALPHA)
+  sparks = Sparks()
+
+  random.seed(0)
+  for count in SPARK_COUNTS:
+    sparks.clear()
+    spawn(sparks, count)
+
+    update_time = 0
+    render_time = 0
+    for frame in range(FRAMES):
+      spawn(sparks, count)
+      start = time.perf_counter()
+      sparks.update()
+      update_time += time.perf_counter() - start
+
+      start = time.perf_counter()
+      sparks.render(display, (0, 0))
+      render_time += time.perf_counter() - start
+
+    print(
+      f'{count} sparks: '
+      f'update {update_time / FRAMES * 1000:.2f} ms/frame, '
+      f'render {render_time / FRAMES * 1000:.2f} ms/frame, '
+      f'{len(sparks.sprites)} cached sprites'
+    )
+
+if __name__ == '__main__':
+  main()
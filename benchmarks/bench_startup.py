@@ -0,0 +1,112 @@
+#Time loading the game assets at startup without the asset
+#cache, with an empty cache (cold start) and with a full
+#cache (warm start), and check that cached images and sounds
+#are the same as the decoded files. Every start runs in a new
+#process. Runs with and without the image atlas if
+#pack_atlas.py was run.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_startup
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from scripts import assetcache, utils
+from scripts.assetcache import AssetCache, save_cache
+from scripts.constants import init_assets, init_anims, load_sound
+
+#Sounds that are in the repository. data/sfx/ambience.wav is
+#loaded by init_sfx() too but it isn't in the repository.
+SOUNDS = ['data/sfx/jump.wav', 'data/sfx/dash.wav', 'data/sfx/hit.wav', 'data/sfx/shoot.wav']
+
+def load_assets():
+  assets = init_assets()
+  animations = init_anims()
+  sounds = [load_sound(path) for path in SOUNDS]
+  save_cache()
+  return assets, animations, sounds
+
+#Used in place of the asset cache to load without it
+class NoCache:
+  changed = False
+
+  def load_image(self, path):
+    return pygame.image.load(path)
+
+  def load_sound(self, path):
+    return pygame.mixer.Sound(path)
+
+def use(cache_path, use_atlas):
+  assetcache.cache = AssetCache(cache_path) if cache_path else NoCache()
+  utils.atlas = None if use_atlas else False
+
+#Runs in the child process. Prints the load time.
+def child(cache_path, use_atlas):
+  pygame.init()
+  pygame.display.set_mode((640, 480))
+  start = time.perf_counter()
+  use(cache_path, use_atlas)
+  load_assets()
+  print(time.perf_counter() - start)
+
+def measure(cache_path, use_atlas, cold):
+  if cold and os.path.exists(cache_path):
+    os.remove(cache_path)
+  output = subprocess.check_output(
+    [sys.executable, '-m', 'benchmarks.bench_startup', '--child', cache_path, str(int(use_atlas))],
+    text=True
+  )
+  return float(output.split()[-1])
+
+#Every loaded image and sound as (name, bytes, colorkey)
+def loaded_data():
+  assets, animations, sounds = load_assets()
+  data = []
+  tables = [assets, {name: animation.images for name, animation in animations.items()}]
+  for table in tables:
+    for name, value in table.items():
+      for i, image in enumerate(value if isinstance(value, list) else [value]):
+        data.append((name + '/' + str(i), pygame.image.tobytes(image, 'RGBA'), image.get_colorkey()))
+  for path, sound in zip(SOUNDS, sounds):
+    data.append((path, sound.get_raw(), None))
+  return data
+
+def main():
+  if len(sys.argv) > 3 and sys.argv[1] == '--child':
+    child(sys.argv[2], sys.argv[3] == '1')
+    return
+
+  pygame.init()
+  pygame.display.set_mode((640, 480))
+  use_atlas = [False]
+  if utils.get_atlas():
+    use_atlas.append(True)
+
+  with tempfile.TemporaryDirectory() as directory:
+    cache_path = os.path.join(directory, 'assets.cache')
+    for atlas in use_atlas:
+      use('', atlas)
+      files = loaded_data()
+      #The first load fills the cache, the second reads it
+      for i in range(2):
+        use(cache_path, atlas)
+        if loaded_data() != files:
+          raise SystemExit('Cached assets are different from the files')
+      os.remove(cache_path)
+
+    print(f'{"assets":<16}{"no cache":>10}{"cold":>10}{"warm":>10}')
+    for atlas in use_atlas:
+      no_cache = min(measure('', atlas, False) for i in range(5))
+      cold = min(measure(cache_path, atlas, True) for i in range(5))
+      warm = min(measure(cache_path, atlas, False) for i in range(5))
+      print(f'{"atlas" if atlas else "separate files":<16}{no_cache * 1000:8.1f}ms{cold * 1000:8.1f}ms{warm * 1000:8.1f}ms')
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,142 @@
+#Count the surfaces made while drawing frames after the game
+#has warmed up. Drawing a frame, including the circle wipe
+#between levels, shouldn't make any surface. Also checks
+#that the cached background and the scaled frame are the
+#same as scaling them every frame.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_surfaces
+import sys
+import time
+
+import pygame
+
+from game import Game
+from scripts.constants import SCREEN_TRANSITION_DURATION
+from scripts.spark import ANGLE_STEPS, SPEED_STEP
+
+WARMUP_FRAMES = 600
+FRAMES = 600
+
+#Methods of surfaces, masks and fonts that return a new
+#surface
+SURFACE_METHODS = {'copy', 'subsurface', 'convert', 'convert_alpha', 'to_surface', 'render', 'premul_alpha'}
+
+class SurfaceCounter:
+  def __init__(self):
+    #function name -> surfaces made
+    self.counts = {}
+    self.surface_class = pygame.Surface
+    self.transform_functions = {}
+    #Surfaces made while paused aren't counted
+    self.paused = False
+
+  def count(self, name):
+    if not self.paused:
+      self.counts[name] = self.counts.get(name, 0) + 1
+
+  #Surfaces made by methods implemented in C
+  def profile(self, frame, event, function):
+    if event == 'c_call' and function.__name__ in SURFACE_METHODS:
+      if isinstance(getattr(function, '__self__', None), (self.surface_class, pygame.mask.Mask, pygame.font.Font)):
+        self.count(function.__name__)
+
+  def start(self):
+    counter = self
+    surface_class = self.surface_class
+
+    class CountedSurface(surface_class):
+      def __init__(self, *args, **kwargs):
+        counter.count('Surface')
+        super().__init__(*args, **kwargs)
+
+    pygame.Surface = CountedSurface
+
+    #pygame.transform functions make a new surface unless
+    #they're given one to draw into
+    for name in ['scale', 'smoothscale', 'flip', 'rotate', 'rotozoom', 'scale_by', 'smoothscale_by']:
+      function = getattr(pygame.transform, name)
+      self.transform_functions[name] = function
+
+      def counted(*args, name=name, function=function, **kwargs):
+        if name not in ('scale', 'smoothscale') or (len(args) < 3 and 'dest_surface' not in kwargs):
+          counter.count('transform.' + name)
+        return function(*args, **kwargs)
+
+      setattr(pygame.transform, name, counted)
+    sys.setprofile(self.profile)
+
+  def stop(self):
+    sys.setprofile(None)
+    pygame.Surface = self.surface_class
+    for name, function in self.transform_functions.items():
+      setattr(pygame.transform, name, function)
+
+def frame(game, counter=None):
+  tilemap = game.tilemap
+  game.step()
+  #The level was loaded again after the player died. Bake
+  #the chunks of the new level like after the warm up, it's
+  #part of loading a level and not of drawing.
+  if game.tilemap is not tilemap and counter is not None:
+    counter.paused = True
+    game.tilemap.chunk_cache.warm()
+    counter.paused = False
+  game.render()
+
+def check_pixels(game):
+  targets = game.targets
+  expected = pygame.transform.scale(game.assets['background'], game.screen.get_size())
+  if pygame.image.tobytes(expected, 'RGB') != pygame.image.tobytes(targets.background(game.assets['background']), 'RGB'):
+    raise SystemExit('the cached background is different from the scaled background')
+  expected = pygame.transform.scale(game.non_silhouette, game.screen.get_size())
+  targets.present()
+  if pygame.image.tobytes(expected, 'RGB') != pygame.image.tobytes(game.screen, 'RGB'):
+    raise SystemExit('the scaled frame is different from scaling the frame')
+
+def main():
+  game = Game(headless=True, seed=0)
+  #Draw every spark sprite ahead of time like
+  #benchmarks/bench_allocations.py
+  for angle_step in range(ANGLE_STEPS):
+    for speed_step in range(round(3 / SPEED_STEP) + 1):
+      game.sparks.sprites[(angle_step, speed_step)] = game.sparks.draw_sprite(angle_step, speed_step)
+
+  #The level starts with the circle wipe
+  for i in range(WARMUP_FRAMES):
+    frame(game)
+  check_pixels(game)
+  #Bake every chunk of the level. Chunks are baked the first
+  #time they're on the screen.
+  game.tilemap.chunk_cache.warm()
+
+  counter = SurfaceCounter()
+  #Loading a level bakes the chunks of its first frame,
+  #that's not part of drawing either
+  load_level = game.load_level
+
+  def paused_load_level(path):
+    counter.paused = True
+    load_level(path)
+    counter.paused = False
+
+  game.load_level = paused_load_level
+  counter.start()
+  start = time.perf_counter()
+  for i in range(FRAMES):
+    #Play the circle wipe on a part of the frames
+    if i % 200 == 0:
+      game.transition = -SCREEN_TRANSITION_DURATION
+    frame(game, counter)
+  elapsed = time.perf_counter() - start
+  counter.stop()
+
+  made = sum(counter.counts.values())
+  print(f'{FRAMES} frames, {made / FRAMES:.2f} surfaces/frame, {elapsed / FRAMES * 1000:.2f} ms/frame (profiled)')
+  for name, count in sorted(counter.counts.items()):
+    print(f'  {name}: {count}')
+  if made:
+    raise SystemExit('surfaces were made while drawing frames')
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,74 @@
+#Compare grid lookups per second of the old "x,y" string keyed
+#dict against the integer keyed TileGrid on large maps. Each
+#way is timed REPEATS times and the best time is kept.
+#
+#Run from the game directory:
+#python3 -m benchmarks.bench_tilemap_lookup
+import math
+import random
+import sys
+import time
+
+from scripts.grid import TileGrid
+
+MAP_SIZES = [256, 1024, 2048]
+LOOKUPS = 200000
+REPEATS = 5
+
+def build_maps(size, density=0.4):
+  string_map = {}
+  grid = TileGrid()
+  for x in range(size):
+    for y in range(size):
+      if random.random() < density:
+        string_map[str(x) + ',' + str(y)] = {'type': 'stone', 'variant': 1, 'pos': [x, y]}
+        grid.set(x, y, 'stone', 1)
+  return string_map, grid
+
+def bench_string_map(string_map, probes):
+  solid = {'grass', 'stone'}
+  hits = 0
+  start = time.perf_counter()
+  for x, y in probes:
+    loc = str(x) + ',' + str(y)
+    if loc in string_map and string_map[loc]['type'] in solid:
+      hits += 1
+  return time.perf_counter() - start, hits
+
+def bench_grid(grid, probes):
+  solid_ids = bytearray(256)
+  solid_ids[grid.type_id('stone')] = 1
+  solid_ids[grid.type_id('grass')] = 1
+  tile_id = grid.tile_id
+  hits = 0
+  start = time.perf_counter()
+  for x, y in probes:
+    if solid_ids[tile_id(x, y)]:
+      hits += 1
+  return time.perf_counter() - start, hits
+
+def main():
+  random.seed(0)
+  for size in MAP_SIZES:
+    string_map, grid = build_maps(size)
+    probes = [(random.randrange(size), random.randrange(size)) for i in range(LOOKUPS)]
+
+    string_time = math.inf
+    grid_time = math.inf
+    for i in range(REPEATS):
+      elapsed, string_hits = bench_string_map(string_map, probes)
+      string_time = min(string_time, elapsed)
+      elapsed, grid_hits = bench_grid(grid, probes)
+      grid_time = min(grid_time, elapsed)
+      if string_hits != grid_hits:
+        sys.exit('Lookup results differ between string map and grid')
+
+    print(
+      f'{size}x{size} tiles: '
+      f'string dict {LOOKUPS / string_time:,.0f} lookups/s, '
+      f'grid {LOOKUPS / grid_time:,.0f} lookups/s '
+      f'({string_time / grid_time:.2f}x)'
+    )
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,87 @@
+#Record the standard input traces used as benchmark
+#workloads. A simple bot plays each level headless: it walks
+#to the closest enemy, jumps over walls and dashes through
+#enemies. The traces are saved in benchmarks/traces and
+#checked by replaying them.
+#
+#Run from the game directory:
+#python3 -m benchmarks.record_traces
+import os
+import random
+
+import pygame
+
+from game import Game
+from scripts.replay import InputRecorder, Replay, load_trace
+
+TRACE_DIR = 'benchmarks/traces'
+#(level, random seed, number of steps)
+TRACES = [
+  (0, 1000, 3600),
+  (1, 1001, 3600)
+]
+
+def trace_path(level):
+  return os.path.join(TRACE_DIR, 'map' + str(level) + '.trace')
+
+#Key events of the bot for the next step
+def bot_events(game, rng):
+  player = game.player
+  movement = [False, False]
+  jump = False
+  dash = False
+
+  if game.enemy_spawner:
+    target = min(
+      game.enemy_spawner,
+      key=lambda enemy: abs(enemy.pos[0] - player.pos[0]) + abs(enemy.pos[1] - player.pos[1])
+    )
+    dist = (target.pos[0] - player.pos[0], target.pos[1] - player.pos[1])
+    movement = [dist[0] < -4, dist[0] > 4]
+    #Jump over walls and up to enemies above the player
+    if player.collisions['left'] or player.collisions['right'] or dist[1] < -16:
+      jump = rng.random() < 0.1
+    #Dash when the enemy is close and in front of the player
+    if abs(dist[1]) < 12 and abs(dist[0]) < 70 and (dist[0] < 0) == player.flip:
+      dash = rng.random() < 0.3
+  #Wander while the next level loads or when stuck
+  if rng.random() < 0.05:
+    movement = [rng.random() < 0.5, rng.random() < 0.5]
+
+  events = []
+  for held, wanted, key in [
+    (game.movement[0], movement[0], pygame.K_LEFT),
+    (game.movement[1], movement[1], pygame.K_RIGHT)
+  ]:
+    if held != wanted:
+      events.append(pygame.event.Event(pygame.KEYDOWN if wanted else pygame.KEYUP, key=key))
+  if jump:
+    events.append(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_UP))
+  if dash:
+    events.append(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+  return events
+
+def main():
+  os.makedirs(TRACE_DIR, exist_ok=True)
+  for level, seed, steps in TRACES:
+    path = trace_path(level)
+    game = Game(headless=True, seed=seed, level=level)
+    game.recorder = InputRecorder(path, seed, level)
+    #The bot has its own random generator so it doesn't
+    #change the game's random numbers
+    rng = random.Random(seed)
+    for i in range(steps):
+      game.step(bot_events(game, rng))
+    game.recorder.save(game)
+
+    trace = load_trace(path)
+    matched = Replay(trace).play(Game(headless=True, seed=trace['seed'], level=trace['level']))
+    print(
+      f'{path}: {steps} steps, {os.path.getsize(path)} bytes, '
+      f'ended on level {game.level}, replay {"matches" if matched else "does NOT match"}'
+    )
+    if not matched:
+      raise SystemExit('replay of ' + path + ' did not end in the recorded state')
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,76 @@
+#Generate stress levels in the level file format: a wide
+#level of ground and floating platforms, thousands of trees
+#('large_decor' variant 2, the leaf spawners) and hundreds of
+#enemy spawners.
+#
+#Run from the game directory:
+#python3 -m benchmarks.stress_level <level file> [width] [trees] [enemies]
+import random
+import sys
+
+from scripts.editor.saveload import SaveLoad
+
+TILE_SIZE = 16
+#Height of the level in tiles. The ground is around the middle.
+LEVEL_HEIGHT = 120
+#Enemy size in pixels. See Factory.create_enemies()
+ENEMY_SIZE = (8, 15)
+
+def generate_stress_level(width=1000, trees=2000, enemies=300, seed=0):
+  rng = random.Random(seed)
+  tilemap = {}
+  #Top tile of the ground for every column
+  ground = []
+  height = LEVEL_HEIGHT // 2
+  for x in range(width):
+    #Hills that change height slowly
+    if rng.random() < 0.1:
+      height = max(LEVEL_HEIGHT // 4, min(LEVEL_HEIGHT - 10, height + rng.choice([-1, 1])))
+    ground.append(height)
+    for y in range(height, LEVEL_HEIGHT):
+      tilemap[str(x) + ',' + str(y)] = {
+        'type': 'grass' if y == height else 'stone',
+        'variant': 1 if y == height else 5,
+        'pos': [x, y]
+      }
+
+  #Floating platforms
+  for i in range(width // 8):
+    x = rng.randrange(width - 6)
+    y = ground[x] - rng.randint(4, 10)
+    for platform_x in range(x, x + rng.randint(3, 6)):
+      tilemap[str(platform_x) + ',' + str(y)] = {'type': 'grass', 'variant': 1, 'pos': [platform_x, y]}
+
+  offgrid = []
+  for i in range(trees):
+    x = rng.randrange(width)
+    offgrid.append({
+      'type': 'large_decor',
+      'variant': 2,
+      #Trees stand on the ground. The tree image is 33x44.
+      'pos': [x * TILE_SIZE, ground[x] * TILE_SIZE - 44]
+    })
+
+  #Player on the left side of the level
+  offgrid.append({'type': 'spawner', 'variant': 0, 'pos': [2 * TILE_SIZE, ground[2] * TILE_SIZE - 13]})
+  for i in range(enemies):
+    x = rng.randrange(8, width)
+    offgrid.append({
+      'type': 'spawner',
+      'variant': 1,
+      'pos': [x * TILE_SIZE + 4, ground[x] * TILE_SIZE - ENEMY_SIZE[1]]
+    })
+
+  return {'tilemap': tilemap, 'tile_size': TILE_SIZE, 'offgrid': offgrid}
+
+def main():
+  if len(sys.argv) < 2:
+    print('usage: python3 -m benchmarks.stress_level <level file> [width] [trees] [enemies]')
+    return
+  counts = [int(arg) for arg in sys.argv[2:5]]
+  level = generate_stress_level(*counts)
+  SaveLoad().save(sys.argv[1], level)
+  print(f'{sys.argv[1]}: {len(level["tilemap"])} on-grid tiles, {len(level["offgrid"])} off-grid tiles')
+
+if __name__ == '__main__':
+  main()
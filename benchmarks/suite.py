@@ -0,0 +1,228 @@
+#Benchmark suite. Runs every benchmark on a generated stress
+#level and the standard input traces, saves the results as
+#JSON and compares them with a baseline. Exits with an error
+#if a benchmark is slower than the baseline by more than the
+#threshold.
+#
+#Run from the game directory:
+#python3 -m benchmarks.suite
+#python3 -m benchmarks.suite --threshold 0.3
+#python3 -m benchmarks.suite --save-baseline
+#
+#Baselines depend on the machine. Save a baseline on the
+#machine the suite runs on before comparing.
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import tempfile
+import time
+
+import pygame
+
+from benchmarks.record_traces import TRACE_DIR
+from benchmarks.stress_level import generate_stress_level
+from game import Game
+from scripts.editor.saveload import SaveLoad
+from scripts.entities import PhysicsEntity
+from scripts.particle import Particles
+from scripts.replay import Replay, load_trace
+from scripts.spark import Sparks
+from scripts.tilemap import Tilemap
+
+BASELINE_PATH = 'benchmarks/baseline.json'
+RESULTS_PATH = 'benchmarks/results.json'
+#Allowed slowdown compared to the baseline. 0.25 is 25%.
+THRESHOLD = 0.25
+#Every benchmark is run this many times and the fastest
+#run is kept
+REPEATS = 5
+
+#Stress level size
+LEVEL_WIDTH = 1000
+TREES = 2000
+ENEMIES = 300
+
+def best_time(function, repeats=REPEATS):
+  best = math.inf
+  for i in range(repeats):
+    start = time.perf_counter()
+    function()
+    best = min(best, time.perf_counter() - start)
+  return best
+
+def bench_level_load(game, json_path, binary_path):
+  saveload = SaveLoad()
+
+  def load_json():
+    Tilemap(game, tile_size=16).load_data(saveload.load_json(json_path), warm=False)
+
+  def load_binary():
+    Tilemap(game, tile_size=16).load_data(saveload.load_binary(binary_path), warm=False)
+
+  return {
+    'level_load_json_ms': best_time(load_json) * 1000,
+    'level_load_binary_ms': best_time(load_binary) * 1000
+  }
+
+#Draw the level with the camera moving from the left to the
+#right side of the level
+def bench_tilemap_render(game, tilemap, frames=600):
+  surf = pygame.Surface(game.display.get_size(), pygame.SRCALPHA)
+  level_width = LEVEL_WIDTH * tilemap.tile_size
+
+  def render():
+    for frame in range(frames):
+      surf.fill((0, 0, 0, 0))
+      tilemap.render(surf, offset=(frame / frames * level_width, 56 * tilemap.tile_size - 120))
+
+  return {'tilemap_render_ms': best_time(render) / frames * 1000}
+
+#Entities falling and running into the ground and walls
+def bench_entity_update(game, tilemap, entity_count=300, frames=120):
+  rng = random.Random(0)
+  spawns = [(rng.random() * LEVEL_WIDTH * tilemap.tile_size, 600 + rng.random() * 200) for i in range(entity_count)]
+
+  def update():
+    entities = [PhysicsEntity(game, 'enemy', pos, (8, 15)) for pos in spawns]
+    for frame in range(frames):
+      for i, entity in enumerate(entities):
+        entity.update(tilemap, (0.5 if i % 2 else -0.5, 0))
+
+  return {'entity_update_us': best_time(update) / (entity_count * frames) * 1000000}
+
+#Explosions of 30 sparks or 30 particles like
+#Game.explode_entity() every frame until there are 'count'
+def bench_effects(game, count=3000, frames=120):
+  particles = Particles(game.animations)
+  sparks = Sparks()
+  surf = pygame.Surface(game.display.get_size(), pygame.SRCALPHA)
+  rng = random.Random(0)
+
+  def run_particles():
+    for frame in range(frames):
+      while len(particles) < count:
+        pos = (rng.random() * 320, rng.random() * 240)
+        for i in range(30):
+          angle = rng.random() * math.pi * 2
+          speed = rng.random() * 2
+          particles.spawn('dash', pos, [math.cos(angle) * speed, math.sin(angle) * speed], rng.randint(0, 7))
+      particles.update()
+      particles.render(surf)
+
+  def run_sparks():
+    for frame in range(frames):
+      while len(sparks) < count:
+        pos = (rng.random() * 320, rng.random() * 240)
+        for i in range(30):
+          sparks.spawn(pos, rng.random() * math.pi * 2, rng.random() * 2)
+      sparks.update()
+      sparks.render(surf, (0, 0))
+
+  return {
+    'particles_ms': best_time(run_particles) / frames * 1000,
+    'sparks_ms': best_time(run_sparks) / frames * 1000
+  }
+
+#Whole frames (logic step and drawing) on the stress level
+def bench_stress_frame(game, json_path, frames=120):
+  best = math.inf
+  for i in range(REPEATS):
+    random.seed(0)
+    game.load_level(json_path)
+    start = time.perf_counter()
+    for frame in range(frames):
+      game.step()
+      game.render()
+    best = min(best, time.perf_counter() - start)
+  return {'stress_frame_ms': best / frames * 1000}
+
+#Logic steps of the standard input traces
+def bench_replays():
+  results = {}
+  for file_name in sorted(os.listdir(TRACE_DIR)):
+    trace = load_trace(os.path.join(TRACE_DIR, file_name))
+
+    def replay():
+      Replay(trace).play(Game(headless=True, seed=trace['seed'], level=trace['level']))
+
+    name = 'replay_' + os.path.splitext(file_name)[0] + '_step_us'
+    results[name] = best_time(replay) / len(trace['inputs']) * 1000000
+  return results
+
+def run_suite():
+  game = Game(headless=True, seed=0)
+  saveload = SaveLoad()
+  level = generate_stress_level(LEVEL_WIDTH, TREES, ENEMIES)
+
+  results = {}
+  with tempfile.TemporaryDirectory() as directory:
+    json_path = os.path.join(directory, 'stress.json')
+    binary_path = os.path.join(directory, 'stress.bin')
+    saveload.save(json_path, level)
+    saveload.save_binary(binary_path, level)
+
+    tilemap = Tilemap(game, tile_size=16)
+    tilemap.load_data(saveload.load_json(json_path))
+
+    results.update(bench_level_load(game, json_path, binary_path))
+    results.update(bench_tilemap_render(game, tilemap))
+    results.update(bench_entity_update(game, tilemap))
+    results.update(bench_effects(game))
+    results.update(bench_stress_frame(game, json_path))
+  results.update(bench_replays())
+  return results
+
+def compare(results, baseline, threshold):
+  regressions = []
+  for name, value in results.items():
+    if name not in baseline:
+      print(f'{name:<28}{value:12.3f}  (no baseline)')
+      continue
+    change = value / baseline[name] - 1
+    regressed = change > threshold
+    print(f'{name:<28}{value:12.3f}{baseline[name]:12.3f}{change:+9.1%}{"  REGRESSION" if regressed else ""}')
+    if regressed:
+      regressions.append(name)
+  return regressions
+
+def main():
+  parser = argparse.ArgumentParser(description='Run the benchmark suite')
+  parser.add_argument('--output', default=RESULTS_PATH, help='file to save the results to')
+  parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline file to compare with')
+  parser.add_argument('--threshold', type=float, default=THRESHOLD, help='allowed slowdown, 0.25 is 25%%')
+  parser.add_argument('--save-baseline', action='store_true', help='save the results as the baseline')
+  args = parser.parse_args()
+
+  results = run_suite()
+  report = {
+    'python': platform.python_version(),
+    'pygame': pygame.version.ver,
+    'machine': platform.machine(),
+    'results': results
+  }
+  f = open(args.output, 'w')
+  json.dump(report, f, indent=2)
+  f.close()
+
+  if args.save_baseline:
+    f = open(args.baseline, 'w')
+    json.dump(report, f, indent=2)
+    f.close()
+    print('saved baseline to', args.baseline)
+
+  baseline = {}
+  if os.path.exists(args.baseline):
+    f = open(args.baseline, 'r')
+    baseline = json.load(f)['results']
+    f.close()
+
+  print(f'{"benchmark":<28}{"result":>12}{"baseline":>12}{"change":>9}')
+  regressions = compare(results, baseline, args.threshold)
+  if regressions:
+    raise SystemExit(f'{len(regressions)} benchmarks are more than {args.threshold:.0%} slower than the baseline')
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,33 @@
+import os
+import sys
+
+from scripts.editor.saveload import SaveLoad, BINARY_EXT
+
+#Converts JSON levels in data/maps to the binary level
+#format. The game loads the binary copy of a level if
+#it's not older than the JSON file.
+#
+#Convert all levels: python3 convert_maps.py
+#Convert some levels: python3 convert_maps.py 0 1
+MAPS_PATH = 'data/maps/'
+
+def convert(saveload, name):
+  json_path = MAPS_PATH + name + '.json'
+  binary_path = MAPS_PATH + name + BINARY_EXT
+  saveload.save_binary(binary_path, saveload.load_json(json_path))
+  print(json_path + ' -> ' + binary_path)
+
+def main():
+  saveload = SaveLoad()
+  names = sys.argv[1:]
+  if not names:
+    names = sorted(
+      os.path.splitext(file_name)[0]
+      for file_name in os.listdir(MAPS_PATH)
+      if file_name.endswith('.json')
+    )
+  for name in names:
+    convert(saveload, name)
+
+if __name__ == '__main__':
+  main()
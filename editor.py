@@ -2,11 +2,12 @@ import sys
 
 import pygame
 
+from scripts.assetcache import save_cache
 from scripts.editor.saveload import SaveLoad
 from scripts.utils import load_images
 from scripts.tilemap import Tilemap
 
-from scripts.constants import MAX_LEVEL
+from scripts.constants import max_level
 
 #The purpose of this dict is to look for 
 #existing closest tile of a tile and fill up
@@ -65,6 +66,8 @@ class LevelEditor:
             'stone': load_images('tiles/stone'),
             'spawner': load_images('tiles/spawners'),
         }
+        #Keep the decoded images for the next start
+        save_cache()
         self.tilemap = Tilemap(self, tile_size=16)
 
         self.scroll = [0, 0]
@@ -100,34 +103,29 @@ class LevelEditor:
               map_data = self.saveload.load('data/maps/'+self.argv[2]+'.json')
 
           if len(map_data) > 0:
-            self.tilemap.tilemap = map_data['tilemap']
-            self.tilemap.tile_size = map_data['tile_size']
-            self.tilemap.offgrid_tiles = map_data['offgrid']
+            self.tilemap.load_data(map_data)
         except FileNotFoundError:
           print("No map found. You should create one.")
 
     def autotile(self):
+        grid = self.tilemap.grid
         #Loop through tiles in the on-grid tilemap.
-        #tilemap is a dict and thus, we will be
-        #looping through keys not values
-        for loc in self.tilemap.tilemap:
-          #Get the value corresponds with the key
-          selected_tile = self.tilemap.tilemap[loc]
+        #items() yields the grid coordinates, type and
+        #variant of every tile.
+        for x, y, type, variant in grid.items():
+          type_id = grid.tile_id(x, y)
           #initialize a set
           neighbors = tuple()
         
           #Loop through tiles around the selected tile
           for neighbor_coords in [(1, 0), (-1, 0), (0, -1), (0, 1)]:
-              #Get the grid coordinates of closest tile
-              neighbor_tile = str(selected_tile['pos'][0] + neighbor_coords[0]) + ',' + str(selected_tile['pos'][1] + neighbor_coords[1])
               #Check if there's tile in the closest tile coordinates
-              if neighbor_tile in self.tilemap.tilemap:
-                  #If closest tile exists, check if the selected tile and the
-                  #closest tile has the same type.
-                  if self.tilemap.tilemap[neighbor_tile]['type'] == selected_tile['type']:
-                      #If both tiles have equal type, add the closest tile to
-                      #'neighbors' set
-                      neighbors = (*neighbors, neighbor_coords)
+              #and if the selected tile and the closest tile has the 
+              #same type.
+              if grid.tile_id(x + neighbor_coords[0], y + neighbor_coords[1]) == type_id:
+                  #If both tiles have equal type, add the closest tile to
+                  #'neighbors' set
+                  neighbors = (*neighbors, neighbor_coords)
 
           #Sorted convert neighbors to list. Thus, we need to convert it back to tuple
           neighbors = tuple(sorted(neighbors))
@@ -143,8 +141,8 @@ class LevelEditor:
           #The syntax '(neighbors in AUTOTILE_MAP)' compares the tuples of AUTOTILE_MAP
           #and 'neighbors'. If the tuples in 'neighbors' are equal to one of the set of
           #tuples in AUTOTILE_MAP, this will be executed.
-          if (selected_tile['type'] in AUTOTILE_TYPES) and (neighbors in AUTOTILE_MAP):
-              selected_tile['variant'] = AUTOTILE_MAP[neighbors]
+          if (type in AUTOTILE_TYPES) and (neighbors in AUTOTILE_MAP):
+              grid.set(x, y, type, AUTOTILE_MAP[neighbors])
 
     def run(self):
         while True:
@@ -197,37 +195,24 @@ class LevelEditor:
 
             #Add on-grid tile
             if self.left_click and self.ongrid and not self.character_tile:
-                self.tilemap.tilemap[
-                  str(tile_grid_pos[0]) + 
-                  ',' + 
-                  str(tile_grid_pos[1])
-                ] = { 
-                  'type': self.tile_list[self.tile_set],
-                  'variant': self.tile_variant,
-                  'pos': tile_grid_pos
-                }
+                self.tilemap.add_tile(
+                  tile_grid_pos,
+                  self.tile_list[self.tile_set],
+                  self.tile_variant
+                )
             #Delete Tile
             if self.right_click:
-                tile_loc = str(tile_grid_pos[0]) + ',' + str(tile_grid_pos[1])
-                if tile_loc in self.tilemap.tilemap:
-                  del self.tilemap.tilemap[tile_loc]
-
-                for tile in self.tilemap.offgrid_tiles:
-                  tile_img = self.assets[tile['type']][tile['variant']]
-                  #Add collision box to the off-grid tile to test
-                  #If our mouse is clicking on it. Subtract the camera
-                  #offset here because we're looking for placed tile
-                  tile_rect = pygame.Rect(
-                    tile['pos'][0] - self.scroll[0],
-                    tile['pos'][1] - self.scroll[1],
-                    tile_img.get_width(),
-                    tile_img.get_height()
-                  )
-                  #If mouse is in off-grid tile while right clicking,
-                  #remove the off-grid tile
-                  if tile_rect.collidepoint(mouse_pos):
-                      self.tilemap.offgrid_tiles.remove(tile)
-                      break
+                self.tilemap.remove_tile(tile_grid_pos)
+
+                #Find the off-grid tile under the mouse. Add the camera
+                #offset here because placed tiles are in world coordinates
+                tile = self.tilemap.offgrid_at(
+                  (mouse_pos[0] + self.scroll[0], mouse_pos[1] + self.scroll[1])
+                )
+                #If mouse is in off-grid tile while right clicking,
+                #remove the off-grid tile
+                if tile is not None:
+                    self.tilemap.remove_offgrid(tile)
                 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -238,7 +223,7 @@ class LevelEditor:
                     if event.button == 1:
                         self.left_click = True
                         if not self.ongrid or self.character_tile:
-                            self.tilemap.offgrid_tiles.append(
+                            self.tilemap.add_offgrid(
                               { 
                                 'type': self.tile_list[self.tile_set],
                                 'variant': self.tile_variant,
@@ -308,20 +293,13 @@ class LevelEditor:
                         if not self.character_tile:
                           self.ongrid = not self.ongrid
                     if event.key == pygame.K_o:
-                        file_path = 'data/maps/'+str(MAX_LEVEL)+'.json'
+                        file_path = 'data/maps/'+str(max_level())+'.json'
 
                         if self.editor_mode == 'edit':
                           file_path = 'data/maps/'+self.argv[2]+'.json'
 
                         #Save Level
-                        self.saveload.save(
-                          file_path,
-                          {
-                            'tilemap': self.tilemap.tilemap, 
-                            'tile_size': self.tilemap.tile_size, 
-                            'offgrid': self.tilemap.offgrid_tiles
-                          }
-                        )
+                        self.saveload.save(file_path, self.tilemap.serialize())
                     if event.key == pygame.K_t:
                         self.autotile()
                     if event.key == pygame.K_LSHIFT:
@@ -1,354 +1,685 @@
 import math
+import os
 import random
 import sys
 
 import pygame
 
+from scripts.assets import AssetManager
 from scripts.clouds import Clouds
+from scripts.dirtyrects import DirtyRects
 from scripts.factory import Factory
-from scripts.particle import Particle
+from scripts.levelcache import LevelCache
+from scripts.particle import Particles
 from scripts.player import Player
-from scripts.spark import Spark
+from scripts.profiler import FrameProfiler
+from scripts.rendertargets import RenderTargets
+from scripts.replay import InputRecorder, Replay, load_trace
+from scripts.projectile import Projectiles
+from scripts.spark import Sparks
 from scripts.tilemap import Tilemap
 from scripts.constants import \
-  init_assets, init_anims, init_sfx, \
+  asset_loaders, anim_loaders, sfx_loaders, \
   SCREEN_TRANSITION_DURATION, \
-  MAX_LEVEL
+  LOGIC_STEP, \
+  MAX_STEPS_PER_FRAME, \
+  max_level, \
+  STREAM_LEVELS, \
+  DIRTY_RECTS
 from scripts.utils import create_outline
 
 class Game:
-    def __init__(self):
+    #If headless is True, the game runs without a window and
+    #without sound, and run() doesn't wait between frames.
+    #Use step() to run the game logic only. If seed is given,
+    #the random module is seeded so every run with the same
+    #seed and inputs plays the same. level is the first level.
+    def __init__(self, headless=False, seed=None, level=0):
+        self.headless = headless
+        if headless:
+          os.environ['SDL_VIDEODRIVER'] = 'dummy'
+          os.environ['SDL_AUDIODRIVER'] = 'dummy'
+        if seed is not None:
+          random.seed(seed)
+
         pygame.init()
 
-        self.sfx = init_sfx()
+        #Assets are loaded when they're first used or ahead of
+        #time on a worker thread. See scripts/assets.py
+        self.asset_manager = AssetManager()
+        self.sfx = self.asset_manager.table('sfx', sfx_loaders(enabled=not headless))
 
-        pygame.mixer.music.load('data/music.wav')
-        #music volume
-        pygame.mixer.music.set_volume(0.5)
-        #-1 means infinite looping
-        pygame.mixer.music.play(-1)
+        if not headless:
+          pygame.mixer.music.load('data/music.wav')
+          #music volume
+          pygame.mixer.music.set_volume(0.5)
+          #-1 means infinite looping
+          pygame.mixer.music.play(-1)
 
         self.sfx['ambience'][0].play(-1)
 
         pygame.display.set_caption('ninja game')
         self.screen = pygame.display.set_mode((640, 480))
-        #pygame.SRCALPHA adds a tranparency channel to our
-        #surface
-        self.display = pygame.Surface((320, 240), pygame.SRCALPHA)
-        self.non_silhouette = pygame.Surface((320, 240))
+        #Surfaces every frame is drawn into. See
+        #scripts/rendertargets.py
+        self.targets = RenderTargets(self.screen, (320, 240))
+        self.display = self.targets.display
+        self.non_silhouette = self.targets.non_silhouette
+        #Draws only the parts of the frame that changed if
+        #DIRTY_RECTS is True. See scripts/dirtyrects.py
+        self.dirty = DirtyRects(self.display.get_size()) if DIRTY_RECTS else None
+        #Parts of the screen changed by the last render().
+        #None is the whole screen.
+        self.updated_rects = None
 
         self.clock = pygame.time.Clock()
+        #Times the parts of every frame. F3 shows the times on
+        #the screen and F4 saves them. See scripts/profiler.py
+        self.profiler = FrameProfiler()
+        #Frames drawn per second by run(). Frames are drawn at the
+        #refresh rate of the display. 0 doesn't limit the frame rate.
+        self.fps = 0 if headless else (pygame.display.get_current_refresh_rate() or 60)
+        #Number of frames since the game started
+        self.frame = 0
         
         self.movement = [False, False]
         
         self.factory = Factory()
 
-        self.assets = init_assets()
+        self.assets = self.asset_manager.table('assets', asset_loaders())
+
+        self.animations = self.asset_manager.table('animations', anim_loaders())
 
-        self.animations = init_anims()
+        self.particles = Particles(self.animations)
+        self.sparks = Sparks()
+        self.projectiles = Projectiles(self.assets['projectile'])
 
         self.clouds = Clouds(self.assets['clouds'], count=16)
         
         self.screenshake = 0
+        self.screenshake_offset = (0, 0)
 
         self.player = Player(self, (0, 0), (10, 13))
+        #Rect of the player at the start of the step. Enemies
+        #check if the player's dash hit them with it.
+        self.player_rect = self.player.rect().copy()
         self.dead = 0
 
         self.tilemap = Tilemap(self, tile_size=16)
-
-        self.level = 0
-        self.load_level('data/maps/'+str(self.level)+'.json')
+        #Prepares levels on a worker thread
+        self.levels = LevelCache(self, streaming=STREAM_LEVELS)
+
+        #Records the inputs of every step when set.
+        #See scripts/replay.py
+        self.recorder = None
+
+        self.level = level
+        #Number of levels. Counted once, it lists the level
+        #directory.
+        self.level_count = max_level()
+        #Level loaded after this one is cleared. Set when the
+        #last enemy dies.
+        self.next_level = None
+        #Path of the level being loaded. run() shows a loading
+        #screen until the level and its assets are ready.
+        #Headless games are run with step() so they wait for
+        #the level here.
+        self.loading = self.level_path(self.level)
+        self.levels.prefetch(self.loading)
+        if headless:
+          self.load_level(self.loading)
+          self.loading = None
         self.transition = -(SCREEN_TRANSITION_DURATION)
 
+    def level_path(self, level):
+      return 'data/maps/'+str(level)+'.json'
+
     def load_level(self, path):
-      self.tilemap.load_map(path)
+      #Swap in the level prepared by the worker thread. If it
+      #wasn't prefetched, this waits until it's loaded.
+      level = self.levels.take(path)
+      #take() dropped the prefetched next level
+      self.next_level = None
+      self.tilemap.close_stream()
+      self.tilemap = level['tilemap']
+      #Prepare the level again in the background in case
+      #the player dies and the level restarts.
+      self.levels.prefetch(path)
+
+      if level['player_pos'] is not None:
+        self.player.pos = level['player_pos']
+        self.player.last_pos = list(self.player.pos)
+        self.player.air_time = 0
+
       #This should be subtracted to every objects to achieve
       #the camera effect. Objects should move opposite to camera
-      #movement.
-      self.scroll = [0, 0]
-
-      self.projectiles = []
-      self.particles = []
-      self.sparks = []
-
-      self.leaf_spawners = []
-      self.enemy_spawner = []
-      
-      #Extract tree tile in 'large_decor' tile set on the screen
-      self.leaf_spawners = \
-        self.factory.create_leaf_spawner(self.tilemap.extract([('large_decor', 2)], True))
-      
-      self.enemy_spawner = self.factory.create_character_spawner(
-        self,
-        self.player,
-        #We just want to get the spawner here. Thus, keep should be false
-        #so that it won't be added in the tile list.
-        self.tilemap.extract([('spawner', 0), ('spawner', 1)])
-      )
+      #movement. The camera starts centered on the player.
+      self.scroll = [
+        self.player.rect().centerx - self.display.get_width() * 0.5,
+        self.player.rect().centery - self.display.get_height() * 0.5
+      ]
+      #Camera position before the last step
+      self.last_scroll = list(self.scroll)
+
+      self.projectiles.clear()
+      self.particles.clear()
+      self.sparks.clear()
+
+      #Rects of tree tiles in 'large_decor' tile set
+      self.leaf_spawners = level['leaf_spawners']
+
+      self.enemy_spawner = level['enemies']
+
+      #When the level is streamed, load the chunks the camera
+      #will see on the first frame
+      self.tilemap.update_stream(self.scroll, self.display.get_size(), wait=True)
+      #Bake the chunks of the first frame now instead of
+      #while the first frames are drawn
+      self.tilemap.chunk_cache.warm_view(self.scroll, self.display.get_size())
 
     def create_sparks(self, n_sparks, p_pos, r_angle, r_speed):
       for i in range(n_sparks):
-        self.sparks.append(Spark(p_pos,r_angle,r_speed))
+        self.sparks.spawn(p_pos, r_angle, r_speed)
 
     def explode_entity(self, n_objects, spark_spawn, particle_spawn):
       for i in range(n_objects):
         #get one random angle from a full circle
         r_angle = random.random() * math.pi * 2
         r_speed = random.random() * 2
-        self.sparks.append(
-        Spark(
-          spark_spawn,
-          r_angle,
-          r_speed
+        self.sparks.spawn(spark_spawn, r_angle, r_speed)
+        self.particles.spawn(
+          'dash',
+          particle_spawn,
+          [
+            math.cos(r_angle + math.pi) * r_speed,
+            math.sin(r_angle + math.pi) * r_speed
+          ],
+          random.randint(0, 7)
         )
-        )
-        self.particles.append(
-          Particle(
-            self, 
-            'dash',
-            particle_spawn,
-            [
-              math.cos(r_angle + math.pi) * r_speed,
-              math.sin(r_angle + math.pi) * r_speed
-            ],
-            random.randint(0, 7)
-          )
+
+    #Advance the game logic by one step(1 / 60 of a second).
+    #inputs are the pygame events since the last step, e.g.
+    #pygame.event.get(). Nothing is drawn here, see render().
+    def step(self, inputs=()):
+        jump = False
+        dash = False
+        #Keys pressed since the last frame
+        for event in inputs:
+            if event.type == pygame.QUIT:
+                if self.recorder is not None:
+                    self.recorder.save(self)
+                pygame.quit()
+                sys.exit()
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_LEFT:
+                    self.movement[0] = True
+                if event.key == pygame.K_RIGHT:
+                    self.movement[1] = True
+                if event.key == pygame.K_UP:
+                    self.player.jump()
+                    jump = True
+                if event.key == pygame.K_SPACE:
+                    self.player.dash()
+                    dash = True
+                if event.key == pygame.K_F3:
+                    self.profiler.toggle()
+                if event.key == pygame.K_F4:
+                    self.profiler.dump_csv('profile.csv')
+                    self.profiler.dump_json('profile.json')
+            if event.type == pygame.KEYUP:
+                if event.key == pygame.K_LEFT:
+                    self.movement[0] = False
+                if event.key == pygame.K_RIGHT:
+                    self.movement[1] = False
+
+        if self.recorder is not None:
+          self.recorder.record(self.movement, jump, dash)
+
+        #if screenshake is greater than 0, reduce it
+        #until it reaches 0.
+        self.screenshake = max(0, self.screenshake - 1)
+
+        #If all enemies are dead
+        if not len(self.enemy_spawner):
+          #Load the next level in the background while
+          #the transition plays.
+          if self.next_level is None:
+            self.next_level = (self.level + 1) % self.level_count
+            self.levels.prefetch(self.level_path(self.next_level))
+          #Gradually hide the level.
+          self.transition += 1
+          #If transition reaches 30 frames or half a second,
+          #load new level.
+          if self.transition > SCREEN_TRANSITION_DURATION:
+             self.level = self.next_level
+             self.transition = -(SCREEN_TRANSITION_DURATION)
+             self.load_level(self.level_path(self.level))
+        #When starting a new level, the screen is full black
+        #and transition is negative. As self.transition moves back
+        #to 0 from a negative number, the level becomes visible.
+        if self.transition < 0:
+          self.transition += 1
+
+        #If player dies
+        if self.dead:
+          self.dead += 1
+          #30 = 0.5secs
+          if self.dead > 30:
+             self.load_level(self.level_path(self.level))
+             self.dead = 0
+             self.transition = -(SCREEN_TRANSITION_DURATION)
+          else:
+            self.transition += 1
+             
+        #First get the distance between the center of the display(game screen)
+        #and the player's centerx and then move the camera by the distance that we computed
+        #For example, the camera's 'x' is 0; player's centerx = 50; display centerx = 150
+        #50 - 150 - 0 = -100
+        #the result is negative and thus the camera will move to the left.
+        
+        #Next, move the player based on the result above.
+        #player's 'centerx' is 50 and thus its 'x' is 25, subtract that to
+        #-100 and we got -75
+
+        #Now, if we calculate the distance between the camera's 'x' to player's centerx
+        #the result is 150(|-100 + -50|) which is the center of the screen and now the
+        #player is on the center of the screen and camera.
+
+        #Now, let's update the player's centerx to 60.
+        #60 - 150 - 100 = -90 - 100 = 10
+        #The result is positive and thus the camera will move to the right.
+        #Now, if we calculate the distance between the camera's 'x' to player's centerx
+        #(100 - 10) + 60 = 90 + 60 = 150
+        #The player is still in the middle of the display and camera.
+
+        #What if the player didn't move? The result will be zero and thus no addition
+        #to scroll[0]. Take a look at this example:
+        #60 - 150 - 90 = 90 - 90 = 0
+
+        #Now, to add a 'delay-follow' effect where the camera follows the player
+        #with delay instead of instant, we need to divide the result by some amount.
+        #In this case, I choose 30 because its half of the current FPS of this game.
+        #This makes the camera follow the player with the delay of 1/30
+        #This makes the camera possibly catch up to player by 30 frames.
+        #Example:
+        #40 - 150 - 0 = -90 / 30 = -3
+        #Now, the camera will move -3 pixels in x-coordinate per frame which is
+        #equivalent to -90 at 30 frames.
+        self.last_scroll[0] = self.scroll[0]
+        self.last_scroll[1] = self.scroll[1]
+        self.scroll[0] += (self.player.rect().centerx - (self.display.get_width() * 0.5) - self.scroll[0]) #/ 30
+        self.scroll[1] += (self.player.rect().centery - (self.display.get_height() * 0.5) - self.scroll[1]) #/ 30
+
+        #Load the chunks around the camera if the level is streamed
+        self.tilemap.update_stream(self.scroll, self.display.get_size())
+
+        profiler = self.profiler
+
+        #clouds
+        profiler.begin('clouds')
+        self.clouds.update()
+        profiler.end('clouds')
+
+        profiler.begin('leaves')
+        for rect in self.leaf_spawners:
+          if random.randint(0, 100) < 3:
+            #Get random x and y coordinates within the width and height of spawner objects
+            #For example, tree object.
+            pos = (rect.x + random.random() * rect.width, rect.y + random.random() * rect.height)
+            #Create 'leaf' particle with random pos, velocity and initial frame image
+            self.particles.spawn('leaf', pos, velocity=[-0.15, 0.5], frame=random.randint(5, 15))
+        profiler.end('leaves')
+
+        #Projectiles are pooled. See scripts/projectile.py
+        profiler.begin('projectiles')
+        self.projectiles.update()
+        #The player doesn't move until the end of the step
+        player_rect = self.player.rect().copy()
+        self.player_rect = player_rect
+        dashing = abs(self.player.dashing) >= 50
+        #Projectiles that hit the player. Only the projectiles
+        #in the rows the player covers are checked.
+        hits = () if dashing else self.projectiles.inside([player_rect])
+        #Iterate over a copy because hit projectiles are
+        #released back to the pool
+        in_wall = self.projectiles.in_wall
+        for projectile in list(self.projectiles):
+          if in_wall(projectile, self.tilemap):
+            self.projectiles.release(projectile)
+            self.create_sparks(
+              6,
+              projectile.pos,
+              #Create a spark opposite to the wall. If
+              #projectile comes from right and wall is on the left,
+              #add math.pi in order for the sparks to come out from
+              #the right side of the wall.
+              random.random() - 0.5 + (math.pi if projectile.direction > 0 else 0),
+              1 + random.random()
+            )
+          #300 = 60 * 5 = 5secs
+          #60 = 1sec which is based on our FPS(60)
+          elif projectile.timer > 300:
+            self.projectiles.release(projectile)
+          #If player is not dashing
+          elif not dashing:
+            #If projectile hits the player
+            if projectile in hits:
+              self.sfx['hit'][0].play(0)
+              self.projectiles.release(projectile)
+              self.dead = 1
+              self.screenshake = max(12, self.screenshake)
+
+              self.explode_entity(
+                15, 
+                self.player.rect().center,
+                #Assigning the center here doesn't make the
+                #particles spawn at center. This works for
+                #some reason.
+                (self.player.rect().x, self.player.rect().y)
+              )
+        profiler.end('projectiles')
+
+        #Stopped sparks are removed in update().
+        #See scripts/spark.py
+        profiler.begin('sparks')
+        self.sparks.update()
+        profiler.end('sparks')
+
+        #Completed particles are removed in update(). Leaves
+        #swing when they're drawn. See scripts/particle.py
+        profiler.begin('particles')
+        self.particles.update()
+        profiler.end('particles')
+
+        #enemy
+        profiler.begin('enemies')
+        for enemy in self.enemy_spawner:
+          #Enemies in chunks that aren't loaded are paused
+          #so they don't fall through the missing tiles.
+          if not self.tilemap.loaded(enemy.pos):
+            continue
+          kill = enemy.update(self.tilemap, (0, 0))
+          if kill:
+             self.enemy_spawner.remove(enemy)
+        profiler.end('enemies')
+
+        #player
+        profiler.begin('player')
+        if not self.dead:
+          self.player.update(self.tilemap, (self.movement[1] - self.movement[0], 0))
+        profiler.end('player')
+
+        #First off we get a random number from 0 to self.screenshake.
+        #then we multiply it by (self.screenshake * 0.5). We use the
+        #half value of screenshake to decide if x or y coordinate is
+        #a positive or negative. If half of screenshake is greater than
+        #the random number, the result is negative.
+        self.screenshake_offset = (
+          random.random() * self.screenshake - self.screenshake * 0.5,
+          random.random() * self.screenshake - self.screenshake * 0.5
         )
 
-    def run(self):
+        self.frame += 1
+
+    #Draw the current frame on the screen. alpha is how far
+    #the frame is between the last step(0) and the current
+    #one(1). Entities, projectiles and the camera are drawn
+    #between their positions of the two steps.
+    #
+    #If dirty rects are used, only the parts of the frame where
+    #something moved are drawn again while the camera stands
+    #still. See scripts/dirtyrects.py
+    def render(self, alpha=1):
+        profiler = self.profiler
+
+        scroll = (
+          self.last_scroll[0] + (self.scroll[0] - self.last_scroll[0]) * alpha,
+          self.last_scroll[1] + (self.scroll[1] - self.last_scroll[1]) * alpha
+        )
+        int_scroll = (int(scroll[0]), int(scroll[1]))
+
+        #Frames are only compared while the view stays the same.
+        #Everything but the background is then drawn through
+        #surfaces that keep the blits and draw nothing. Once the
+        #changed parts are known, only they are drawn.
+        dirty = self.dirty
+        if dirty is not None and not dirty.begin((scroll, self.screenshake_offset, self.transition, self.tilemap)):
+          dirty = None
+        display = self.display
+        if dirty is not None:
+          display = dirty.display_recorder(self.display)
+        else:
+          profiler.begin('background')
+          self.display.fill((0, 0, 0, 0))
+          profiler.end('background')
+
+        profiler.begin('projectiles')
+        self.projectiles.render(display, offset=int_scroll, alpha=alpha)
+        profiler.end('projectiles')
+        profiler.begin('sparks')
+        self.sparks.render(display, offset=int_scroll)
+        profiler.end('sparks')
+        profiler.begin('particles')
+        self.particles.render(display, offset=int_scroll)
+        profiler.end('particles')
+
+        #tilemaps
+        profiler.begin('tilemap')
+        self.tilemap.render(display, offset=scroll)
+        profiler.end('tilemap')
+
+        #enemy
+        profiler.begin('enemies')
+        for enemy in self.enemy_spawner:
+          if self.tilemap.loaded(enemy.pos):
+            enemy.render(display, int_scroll, alpha)
+        profiler.end('enemies')
+
+        profiler.begin('transition')
+        if self.transition:
+          transition_surf = self.targets.clear_transition()
+          #radius per frame
+          #divide screen width to 30 frames which is half a second
+          rad_per_frame = int(self.display.get_width() / SCREEN_TRANSITION_DURATION)
+          radius = 0
+
+          if self.transition > 0:
+            #Reduce radius to 0 or near 0
+            radius = (self.display.get_width() - (rad_per_frame * self.transition))
+          else:
+            #Increase radius from near 0 or 0 to screen width
+            radius = rad_per_frame * (SCREEN_TRANSITION_DURATION - abs(self.transition))
+
+          pygame.draw.circle(
+            transition_surf, 
+            (255, 255, 255),
+            #Circle's center
+            (
+              int(self.display.get_width() * 0.5),
+              int(self.display.get_height() * 0.5)
+            ),
+            radius
+          )
+          self.display.blit(transition_surf, (0, 0))
+        profiler.end('transition')
+
+        if dirty is None:
+          self.render_background(self.non_silhouette, int_scroll, alpha)
+          profiler.begin('outline')
+          create_outline(self.non_silhouette, self.display, self.targets.silhouette)
+          profiler.end('outline')
+          profiler.begin('scale')
+          self.targets.present(self.screenshake_offset)
+          profiler.end('scale')
+          self.updated_rects = None
+        else:
+          #Clouds and the player are drawn on non_silhouette
+          #with the background
+          background = dirty.background_recorder(self.non_silhouette)
+          self.clouds.render(background, offset=int_scroll)
+          if not self.dead:
+            self.player.render(background, background, offset=int_scroll, alpha=alpha)
+          #The profiler overlay is see-through so it can't be
+          #drawn over itself
+          rects = dirty.end(dirty.last is None or profiler.enabled)
+          self.render_rects(dirty, rects or [self.display.get_rect()])
+          profiler.begin('scale')
+          if rects is None:
+            self.targets.present(self.screenshake_offset)
+          else:
+            rects = self.targets.present_rects(rects, self.screenshake_offset)
+          profiler.end('scale')
+          self.updated_rects = rects
+
+    #Draw the blits dirty recorded in this frame over rects
+    #only. Every rect is cleared and drawn again with what
+    #overlaps it, the rest of the frame is left as it is.
+    def render_rects(self, dirty, rects):
+        profiler = self.profiler
+        display = self.display
+        non_silhouette = self.non_silhouette
+        silhouette = self.targets.silhouette
+        background = self.targets.background(self.assets['background'])
+
+        profiler.begin('redraw')
+        for rect in rects:
+          display.set_clip(rect)
+          display.fill((0, 0, 0, 0), rect)
+          display.blits(dirty.display, doreturn=False)
+        display.set_clip(None)
+        profiler.end('redraw')
+
+        profiler.begin('background')
+        for rect in rects:
+          non_silhouette.set_clip(rect)
+          non_silhouette.blit(background, (0, 0))
+          non_silhouette.blits(dirty.background, doreturn=False)
+          #The outline of a pixel comes from its neighbours
+          silhouette.set_clip(rect.inflate(2, 2))
+          create_outline(non_silhouette, display, silhouette)
+        non_silhouette.set_clip(None)
+        silhouette.set_clip(None)
+        profiler.end('background')
+
+    #Draw what is behind the display and its outline on surf:
+    #the background, the clouds and the player
+    def render_background(self, surf, int_scroll, alpha):
+        profiler = self.profiler
+
+        profiler.begin('background')
+        surf.blit(self.targets.background(self.assets['background']), (0, 0))
+        profiler.end('background')
+
+        #clouds
+        profiler.begin('clouds')
+        self.clouds.render(surf, offset=int_scroll)
+        profiler.end('clouds')
+
+        #player
+        profiler.begin('player')
+        if not self.dead:
+          self.player.render(surf, surf, offset=int_scroll, alpha=alpha)
+        profiler.end('player')
+
+    #Draw a progress bar of the level and assets being loaded
+    def render_loading(self):
+      assets_done, assets_total = self.asset_manager.progress()
+      progress = (self.levels.ready(self.loading) + assets_done) / (1 + assets_total)
+      self.screen.fill((0, 0, 0))
+      bar = pygame.Rect(0, 0, self.screen.get_width() // 2, 12)
+      bar.center = (self.screen.get_width() // 2, self.screen.get_height() // 2)
+      pygame.draw.rect(self.screen, (255, 255, 255), bar, 1)
+      pygame.draw.rect(self.screen, (255, 255, 255), (bar.x, bar.y, int(bar.width * progress), bar.height))
+
+    #Called by run() every frame while a level is loading.
+    #Loads the level once it and its assets are ready.
+    def update_loading(self):
+      for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+          pygame.quit()
+          sys.exit()
+      if self.levels.ready(self.loading) and self.asset_manager.ready():
+        self.load_level(self.loading)
+        self.loading = None
+      else:
+        self.render_loading()
+        pygame.display.update()
+
+    #The game logic runs in fixed steps of LOGIC_STEP seconds.
+    #Every frame runs as many steps as the time since the last
+    #frame, and the time left is carried to the next frame.
+    #
+    #If replay is given, the inputs come from the replay
+    #instead of the keyboard. run() returns when the replay
+    #ends, True if the game ended in the recorded state.
+    def run(self, replay=None):
+        #Seconds not simulated yet
+        accumulator = 0
+        #Events since the last step
+        events = []
+        self.clock.tick()
         while True:
-            self.display.fill((0, 0, 0, 0))
-            #background
-            self.non_silhouette.blit(
-              pygame.transform.scale(self.assets['background'], self.screen.get_size()), 
-              (0, 0))
-
-            #if screenshake is greater than 0, reduce it
-            #until it reaches 0.
-            self.screenshake = max(0, self.screenshake - 1)
-
-            #If all enemies are dead
-            if not len(self.enemy_spawner):
-              #Gradually hide the level.
-              self.transition += 1
-              #If transition reaches 30 frames or half a second,
-              #load new level.
-              if self.transition > SCREEN_TRANSITION_DURATION:
-                 self.level = (self.level + 1) % MAX_LEVEL
-                 self.transition = -(SCREEN_TRANSITION_DURATION)
-                 self.load_level('data/maps/'+str(self.level)+'.json')
-            #When starting a new level, the screen is full black
-            #and transition is negative. As self.transition moves back
-            #to 0 from a negative number, the level becomes visible.
-            if self.transition < 0:
-              self.transition += 1
-
-            #If player dies
-            if self.dead:
-              self.dead += 1
-              #30 = 0.5secs
-              if self.dead > 30:
-                 self.load_level('data/maps/'+str(self.level)+'.json')
-                 self.dead = 0
-                 self.transition = -(SCREEN_TRANSITION_DURATION)
-              else:
-                self.transition += 1
-                 
-            #First get the distance between the center of the display(game screen)
-            #and the player's centerx and then move the camera by the distance that we computed
-            #For example, the camera's 'x' is 0; player's centerx = 50; display centerx = 150
-            #50 - 150 - 0 = -100
-            #the result is negative and thus the camera will move to the left.
-            
-            #Next, move the player based on the result above.
-            #player's 'centerx' is 50 and thus its 'x' is 25, subtract that to
-            #-100 and we got -75
-
-            #Now, if we calculate the distance between the camera's 'x' to player's centerx
-            #the result is 150(|-100 + -50|) which is the center of the screen and now the
-            #player is on the center of the screen and camera.
-
-            #Now, let's update the player's centerx to 60.
-            #60 - 150 - 100 = -90 - 100 = 10
-            #The result is positive and thus the camera will move to the right.
-            #Now, if we calculate the distance between the camera's 'x' to player's centerx
-            #(100 - 10) + 60 = 90 + 60 = 150
-            #The player is still in the middle of the display and camera.
-
-            #What if the player didn't move? The result will be zero and thus no addition
-            #to scroll[0]. Take a look at this example:
-            #60 - 150 - 90 = 90 - 90 = 0
-
-            #Now, to add a 'delay-follow' effect where the camera follows the player
-            #with delay instead of instant, we need to divide the result by some amount.
-            #In this case, I choose 30 because its half of the current FPS of this game.
-            #This makes the camera follow the player with the delay of 1/30
-            #This makes the camera possibly catch up to player by 30 frames.
-            #Example:
-            #40 - 150 - 0 = -90 / 30 = -3
-            #Now, the camera will move -3 pixels in x-coordinate per frame which is
-            #equivalent to -90 at 30 frames.
-            self.scroll[0] += (self.player.rect().centerx - (self.display.get_width() * 0.5) - self.scroll[0]) #/ 30
-            self.scroll[1] += (self.player.rect().centery - (self.display.get_height() * 0.5) - self.scroll[1]) #/ 30
-            #
-            int_scroll = (int(self.scroll[0]), int(self.scroll[1]))
-
-            #clouds
-            self.clouds.update()
-            self.clouds.render(self.non_silhouette, offset=int_scroll)
-
-            for rect in self.leaf_spawners:
-              if random.randint(0, 100) < 3:
-                #Get random x and y coordinates within the width and height of spawner objects
-                #For example, tree object.
-                pos = (rect.x + random.random() * rect.width, rect.y + random.random() * rect.height)
-                #Create 'leaf' particle with random pos, velocity and initial frame image
-                self.particles.append(Particle(self, 'leaf', pos, velocity=[-0.15, 0.5], frame=random.randint(5, 15)))
-
-            #[[x, y], direction, timer]
-            for projectile in self.projectiles.copy():
-              projectile[0][0] += projectile[1]
-              projectile[2] += 1
-              bullet = self.assets['projectile']
-              self.display.blit(
-                bullet, 
-                [
-                  int(projectile[0][0] - bullet.get_width() * 0.5) - int_scroll[0],
-                  int(projectile[0][1] - bullet.get_height() * 0.5) - int_scroll[1]
-                ]
-              )
-              if self.tilemap.solid_tile(projectile[0]):
-                self.projectiles.remove(projectile)
-                self.create_sparks(
-                  6,
-                  projectile[0],
-                  #Create a spark opposite to the wall. If
-                  #projectile comes from right and wall is on the left,
-                  #add math.pi in order for the sparks to come out from
-                  #the right side of the wall.
-                  random.random() - 0.5 + (math.pi if projectile[1] > 0 else 0),
-                  1 + random.random()
-                )
-              #300 = 60 * 5 = 5secs
-              #60 = 1sec which is based on our FPS(60)
-              elif projectile[2] > 300:
-                self.projectiles.remove(projectile)
-              #If player is not dashing
-              elif abs(self.player.dashing) < 50:
-                #If projectile hits the player
-                if self.player.rect().collidepoint(projectile[0]):
-                  self.sfx['hit'][0].play(0)
-                  self.projectiles.remove(projectile)
-                  self.dead = 1
-                  self.screenshake = max(12, self.screenshake)
-
-                  self.explode_entity(
-                    15, 
-                    self.player.rect().center,
-                    #Assigning the center here doesn't make the
-                    #particles spawn at center. This works for
-                    #some reason.
-                    (self.player.rect().x, self.player.rect().y)
-                  )
-
-            for spark in self.sparks:
-               kill = spark.update()
-               spark.render(self.display, offset=int_scroll)
-               if kill:
-                  self.sparks.remove(spark)
-
-            for particle in self.particles:
-                kill = particle.update()
-                particle.render(self.display, offset=int_scroll)
-                if particle.type == 'leaf':
-                    #We use math.sin() to control the swinging effect of leaves.
-                    #We use the frame * 0.15 as radian(angle)
-                    #For example, the product is 0.785 radians which is 45 degrees.
-                    #If we compute the sin with the product, the result is ~0.7
-                    #If the degree is like 200, the result is going to be ~(-0.34)
-                    #As you can see, the result can be positive or negative depends
-                    #on the input angle.
-                    particle.pos[0] += math.sin(particle.animation.frame * 0.15)
-                if kill:
-                    self.particles.remove(particle)
-
-            #tilemaps
-            self.tilemap.render(self.display, offset=self.scroll)
-
-            #enemy
-            for enemy in self.enemy_spawner:
-              kill = enemy.update(self.tilemap, (0, 0))
-              enemy.render(self.display, int_scroll)
-              if kill:
-                 self.enemy_spawner.remove(enemy)
-
-            #player
-            if not self.dead:
-              self.player.update(self.tilemap, (self.movement[1] - self.movement[0], 0))
-              self.player.render(self.display, self.non_silhouette, offset=int_scroll)
-            #events
+            #Time spent waiting for the next frame isn't counted
+            accumulator += self.clock.tick(self.fps) / 1000
+            if self.loading is not None:
+              self.update_loading()
+              #The time spent loading isn't simulated
+              accumulator = 0
+              continue
+            self.profiler.begin('frame')
             for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_LEFT:
-                        self.movement[0] = True
-                    if event.key == pygame.K_RIGHT:
-                        self.movement[1] = True
-                    if event.key == pygame.K_UP:
-                        self.player.jump()
-                    if event.key == pygame.K_SPACE:
-                        self.player.dash()
-                if event.type == pygame.KEYUP:
-                    if event.key == pygame.K_LEFT:
-                        self.movement[0] = False
-                    if event.key == pygame.K_RIGHT:
-                        self.movement[1] = False
-            
-            if self.transition:
-              transition_surf = pygame.Surface(self.display.get_size())
-              #radius per frame
-              #divide screen width to 30 frames which is half a second
-              rad_per_frame = int(self.display.get_width() / SCREEN_TRANSITION_DURATION)
-              radius = 0
-
-              if self.transition > 0:
-                #Reduce radius to 0 or near 0
-                radius = (self.display.get_width() - (rad_per_frame * self.transition))
-              else:
-                #Increase radius from near 0 or 0 to screen width
-                radius = rad_per_frame * (SCREEN_TRANSITION_DURATION - abs(self.transition))
-
-              pygame.draw.circle(
-                transition_surf, 
-                (255, 255, 255),
-                #Circle's center
-                (
-                  int(self.display.get_width() * 0.5),
-                  int(self.display.get_height() * 0.5)
-                ),
-                radius
-              )
-              transition_surf.set_colorkey((255, 255, 255))
-              self.display.blit(transition_surf, (0, 0))
-
-            #First off we get a random number from 0 to self.screenshake.
-            #then we multiply it by (self.screenshake * 0.5). We use the
-            #half value of screenshake to decide if x or y coordinate is
-            #a positive or negative. If half of screenshake is greater than
-            #the random number, the result is negative.
-            screenshake_offset = (
-              random.random() * self.screenshake - self.screenshake * 0.5,
-              random.random() * self.screenshake - self.screenshake * 0.5
-            )
-            
-            create_outline(self.non_silhouette, self.display)
-            self.screen.blit(
-              pygame.transform.scale(self.non_silhouette, self.screen.get_size()), 
-              screenshake_offset
-            )
-            pygame.display.update()
-            self.clock.tick(60)
-
-Game().run()
\ No newline at end of file
+              #The player keys are ignored during a replay
+              if replay is None or event.type not in (pygame.KEYDOWN, pygame.KEYUP) or \
+                 event.key not in (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_SPACE):
+                events.append(event)
+
+            steps = 0
+            while accumulator >= LOGIC_STEP:
+              #The logic can't keep up. Drop the time that is left
+              #so the next frames don't have even more steps to run.
+              if steps == MAX_STEPS_PER_FRAME:
+                accumulator = 0
+                break
+              if replay is not None:
+                if replay.done():
+                  return replay.matches(self)
+                events.extend(replay.next_events(self.movement))
+              self.step(events)
+              events = []
+              accumulator -= LOGIC_STEP
+              steps += 1
+
+            self.render(accumulator / LOGIC_STEP)
+            self.profiler.render(self.screen)
+
+            self.profiler.begin('flip')
+            if self.updated_rects is None or self.profiler.enabled:
+              pygame.display.update()
+            else:
+              pygame.display.update(self.updated_rects)
+            self.profiler.end('flip')
+
+            self.profiler.end('frame')
+            self.profiler.end_frame()
+
+if __name__ == '__main__':
+  #python3 game.py record <trace file> [level]
+  #python3 game.py replay <trace file> [headless]
+  if len(sys.argv) > 2 and sys.argv[1] == 'record':
+    level = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    seed = random.randrange(2 ** 31)
+    game = Game(seed=seed, level=level)
+    #The trace is saved when the window is closed
+    game.recorder = InputRecorder(sys.argv[2], seed, level)
+    game.run()
+  elif len(sys.argv) > 2 and sys.argv[1] == 'replay':
+    trace = load_trace(sys.argv[2])
+    game = Game(headless='headless' in sys.argv[3:], seed=trace['seed'], level=trace['level'])
+    replay = Replay(trace)
+    if game.headless:
+      matched = replay.play(game)
+    else:
+      matched = game.run(replay)
+    print('The replay ended in the recorded state.' if matched else 'The replay did not end in the recorded state.')
+  else:
+    Game().run()
@@ -0,0 +1,19 @@
+from scripts.atlas import pack, save, ATLAS_PATH, ATLAS_INDEX
+from scripts.utils import BASE_IMG_PATH
+
+#Packs every image in data/images into a few sprite sheets
+#in data/atlas. The game loads images from the sheets if
+#the atlas is up to date. Run it again after adding or
+#changing images.
+#
+#python3 pack_atlas.py
+def main():
+  index, sheets = pack(BASE_IMG_PATH)
+  save(index, sheets)
+  print(
+    str(len(index['images'])) + ' images -> ' +
+    str(len(sheets)) + ' sheets in ' + ATLAS_PATH + ' (index: ' + ATLAS_INDEX + ')'
+  )
+
+if __name__ == '__main__':
+  main()
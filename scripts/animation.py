@@ -1,6 +1,15 @@
+import pygame
+
 class Animation:
-  def __init__(self, images, loop=True, frame_duration=5):
+  def __init__(self, images, loop=True, frame_duration=5, flipped_images=None):
     self.images = images
+    #Images mirrored from left to right. They're made once
+    #when the animation is loaded and shared by every copy
+    #of the animation, so drawing a flipped entity doesn't
+    #create a new surface every frame.
+    if flipped_images is None:
+      flipped_images = [pygame.transform.flip(image, True, False) for image in images]
+    self.flipped_images = flipped_images
     #frame_duration is a padding in between images
     #that is used to control animation speed.
     #For example, you want to animate a slash
@@ -15,7 +24,7 @@ class Animation:
     self.frame = 0
 
   def shallow_copy(self):
-    return Animation(self.images, self.loop, self.frame_duration)
+    return Animation(self.images, self.loop, self.frame_duration, self.flipped_images)
   
   def update(self):
     if self.loop:
@@ -37,7 +46,8 @@ class Animation:
       if self.frame >= (self.frame_duration * len(self.images)) - 1:
         self.complete = True
 
-  def image(self):
+  #If flip is True, the image is mirrored from left to right
+  def image(self, flip=False):
     #Get the current animation frame. This is how
     #the computation here works:
     #Let's say, frame_duration is 3
@@ -49,4 +59,6 @@ class Animation:
     #5 / 3 = 1
     #6 / 3 = 2
     #and so on...
+    if flip:
+      return self.flipped_images[int(self.frame / self.frame_duration)]
     return self.images[int(self.frame / self.frame_duration)]
\ No newline at end of file
@@ -0,0 +1,162 @@
+import hashlib
+import io
+import json
+import os
+import struct
+
+import pygame
+
+#Decoded images and sounds saved by the game so they don't
+#have to be decoded again on the next start. Every entry is
+#the decoded data of one source file and the SHA-1 of the
+#file it was made from, so entries of changed files are made
+#again. The cache can be deleted at any time.
+CACHE_PATH = 'data/cache/'
+CACHE_FILE = 'assets.cache'
+CACHE_MAGIC = b'NJAC'
+CACHE_VERSION = 1
+#magic, version, length of the JSON index in bytes
+CACHE_HEADER = struct.Struct('<4sHI')
+
+#Images are cached as RGBA pixels
+IMAGE_FORMAT = 'RGBA'
+
+#Opened on the first load
+cache = None
+
+def get_cache():
+  global cache
+  if cache is None:
+    cache = AssetCache()
+  return cache
+
+#Same as pygame.image.load() but from the cache if the file
+#hasn't changed since it was cached
+def load_surface(path):
+  return get_cache().load_image(path)
+
+#Same as pygame.mixer.Sound() but from the cache if the file
+#hasn't changed since it was cached
+def load_sound(path):
+  return get_cache().load_sound(path)
+
+#Saves the cache if anything was added to it
+def save_cache():
+  if cache is not None and cache.changed:
+    try:
+      cache.write()
+    except OSError as error:
+      print('Could not save the asset cache:', error)
+
+def sound_format():
+  frequency, size, channels = pygame.mixer.get_init()
+  return 'sound/' + str(frequency) + '/' + str(size) + '/' + str(channels)
+
+class AssetCache:
+  def __init__(self, path=CACHE_PATH + CACHE_FILE):
+    self.path = path
+    #source path -> format of the cached data, SHA-1, time of
+    #modification and size of the source file, and image size
+    self.entries = {}
+    #source path -> cached data
+    self.data = {}
+    #True if the cache has to be written again
+    self.changed = False
+    if os.path.exists(path):
+      self.read()
+
+  def read(self):
+    f = open(self.path, 'rb')
+    data = f.read()
+    f.close()
+    try:
+      magic, version, index_length = CACHE_HEADER.unpack_from(data, 0)
+      if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        raise ValueError('Unsupported asset cache')
+      index = json.loads(data[CACHE_HEADER.size:CACHE_HEADER.size + index_length])
+    except (struct.error, ValueError):
+      #A broken or old cache is made again
+      self.changed = True
+      return
+
+    view = memoryview(data)
+    offset = CACHE_HEADER.size + index_length
+    for path, entry in index.items():
+      self.entries[path] = entry
+      self.data[path] = view[offset:offset + entry['length']]
+      offset += entry['length']
+
+  def write(self):
+    index = {}
+    blobs = []
+    for path, entry in self.entries.items():
+      #Drop entries of deleted files
+      if path in self.data and os.path.exists(path):
+        entry['length'] = len(self.data[path])
+        index[path] = entry
+        blobs.append(self.data[path])
+    index = json.dumps(index).encode()
+
+    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+    #Write a new file and replace the old one, so a cache
+    #that was written halfway is never read
+    f = open(self.path + '.tmp', 'wb')
+    f.write(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(index)))
+    f.write(index)
+    for blob in blobs:
+      f.write(blob)
+    f.close()
+    os.replace(self.path + '.tmp', self.path)
+    self.changed = False
+
+  #Returns the entry of a source file and None if the cached
+  #data was made from the file as it is now. Otherwise makes
+  #a new entry and returns it with the contents of the file.
+  def find(self, path, data_format):
+    stat = os.stat(path)
+    entry = self.entries.get(path)
+    if entry is not None and entry['format'] == data_format and path in self.data:
+      #Not modified since it was cached
+      if entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+        return entry, None
+    else:
+      entry = None
+
+    f = open(path, 'rb')
+    source = f.read()
+    f.close()
+    content_hash = hashlib.sha1(source).hexdigest()
+    #Modified but the contents are the same, like after a
+    #checkout
+    if entry is not None and entry['hash'] == content_hash:
+      entry['mtime'] = stat.st_mtime_ns
+      entry['size'] = stat.st_size
+      self.changed = True
+      return entry, None
+
+    entry = {'format': data_format, 'hash': content_hash, 'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+    self.entries[path] = entry
+    self.data.pop(path, None)
+    return entry, source
+
+  def load_image(self, path):
+    entry, source = self.find(path, IMAGE_FORMAT)
+    if source is None:
+      return pygame.image.frombuffer(self.data[path], entry['image_size'], IMAGE_FORMAT)
+
+    image = pygame.image.load(io.BytesIO(source), path)
+    entry['image_size'] = list(image.get_size())
+    self.data[path] = pygame.image.tobytes(image, IMAGE_FORMAT)
+    self.changed = True
+    return image
+
+  #Sounds are cached as samples in the format of the mixer
+  def load_sound(self, path):
+    entry, source = self.find(path, sound_format())
+    if source is None:
+      return pygame.mixer.Sound(buffer=self.data[path])
+
+    sound = pygame.mixer.Sound(io.BytesIO(source))
+    self.data[path] = sound.get_raw()
+    self.changed = True
+    return sound
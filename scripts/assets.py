@@ -0,0 +1,94 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.assetcache import save_cache
+
+#Assets of one kind, e.g. images or animations, by name.
+#Works like a read-only dict. An asset is loaded the first
+#time it's used unless it was preloaded by AssetManager.
+class AssetTable:
+  def __init__(self, manager, loaders):
+    self.manager = manager
+    #name -> function that loads the asset
+    self.loaders = loaders
+    self.loaded = {}
+
+  def __getitem__(self, name):
+    asset = self.loaded.get(name)
+    if asset is None:
+      with self.manager.lock:
+        asset = self.loaded.get(name)
+        #Not loaded by the worker in the meantime
+        if asset is None:
+          asset = self.loaders[name]()
+          self.loaded[name] = asset
+    return asset
+
+  def __contains__(self, name):
+    return name in self.loaders
+
+  def __iter__(self):
+    return iter(self.loaders)
+
+  def __len__(self):
+    return len(self.loaders)
+
+  def ready(self, name):
+    return name in self.loaded
+
+#Loads assets when they're first used, or ahead of time on
+#a worker thread with preload().
+class AssetManager:
+  def __init__(self):
+    #Loading uses the image atlas and the asset cache, so
+    #only one thread loads at a time
+    self.lock = threading.Lock()
+    #One worker so the game thread keeps most of the CPU
+    self.executor = ThreadPoolExecutor(max_workers=1)
+    #table name -> AssetTable
+    self.tables = {}
+    #Futures of the preloaded assets that aren't done and of
+    #the ones done since everything was last ready
+    self.pending = []
+
+  def table(self, name, loaders):
+    self.tables[name] = AssetTable(self, loaders)
+    return self.tables[name]
+
+  #Start loading assets on the worker thread. names is
+  #table name -> list of asset names, like
+  #{'animations': ['enemy/idle', 'enemy/run']}.
+  #Safe to call from any thread.
+  def preload(self, names):
+    futures = []
+    for table_name, asset_names in names.items():
+      table = self.tables[table_name]
+      for name in asset_names:
+        if not table.ready(name):
+          futures.append(self.executor.submit(table.__getitem__, name))
+    if futures:
+      #Keep the decoded assets for the next start
+      futures.append(self.executor.submit(self.save))
+      with self.lock:
+        self.pending.extend(futures)
+
+  def save(self):
+    with self.lock:
+      save_cache()
+
+  def ready(self):
+    with self.lock:
+      if all(future.done() for future in self.pending):
+        #Raise errors of the worker thread here
+        for future in self.pending:
+          future.result()
+        self.pending = []
+        return True
+      return False
+
+  #Returns the number of preloaded assets that are done and
+  #the number of assets preloaded since everything was last
+  #ready
+  def progress(self):
+    with self.lock:
+      return sum(future.done() for future in self.pending), len(self.pending)
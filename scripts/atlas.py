@@ -0,0 +1,148 @@
+import json
+import os
+
+import pygame
+
+from scripts.assetcache import load_surface
+
+#Sprite sheets of every image in data/images made by
+#pack_atlas.py. The index has the sheet file names and,
+#for every image path relative to data/images, the sheet
+#number and the rect of the image in the sheet.
+ATLAS_PATH = 'data/atlas/'
+ATLAS_INDEX = 'atlas.json'
+ATLAS_VERSION = 1
+SHEET_SIZE = 512
+#Empty pixels between images
+PADDING = 1
+
+#Returns image path relative to base_path -> modification time
+#of every PNG file in base_path and its subdirectories
+def image_files(base_path, directory=''):
+  files = {}
+  for entry in os.scandir(os.path.join(base_path, directory)):
+    path = directory + entry.name
+    if entry.is_dir():
+      files.update(image_files(base_path, path + '/'))
+    elif entry.name.endswith('.png'):
+      files[path] = entry.stat().st_mtime
+  return files
+
+#Packs images into sheets of SHEET_SIZE pixels. Images are
+#placed on rows from the tallest to the shortest and a new
+#sheet is started when a sheet is full. Returns the index
+#and the sheets as bytearrays of RGBA pixels. Sheets are
+#SHEET_SIZE pixels wide and as tall as their images.
+def pack(base_path):
+  images = []
+  for path in sorted(image_files(base_path)):
+    image = pygame.image.load(os.path.join(base_path, path))
+    if image.get_width() + PADDING > SHEET_SIZE or image.get_height() + PADDING > SHEET_SIZE:
+      raise ValueError('Image is too big for the atlas: ' + path)
+    images.append((path, image))
+  images.sort(key=lambda item: (-item[1].get_height(), item[0]))
+
+  index = {'version': ATLAS_VERSION, 'sheet_size': SHEET_SIZE, 'sheets': [], 'images': {}}
+  sheets = []
+  #Height of every sheet without the empty rows at the bottom
+  heights = []
+  x = y = row_height = SHEET_SIZE
+  for path, image in images:
+    width, height = image.get_size()
+    #Next row
+    if x + width > SHEET_SIZE:
+      x = 0
+      y += row_height + PADDING
+      row_height = height
+    #Next sheet
+    if y + height > SHEET_SIZE:
+      sheets.append(bytearray(SHEET_SIZE * SHEET_SIZE * 4))
+      index['sheets'].append('sheet' + str(len(sheets) - 1) + '.png')
+      heights.append(0)
+      x = y = 0
+      row_height = height
+
+    #Copy the pixels as they are. Blitting would change the
+    #color of fully transparent pixels, which images loaded
+    #with a colorkey still use.
+    pixels = pygame.image.tobytes(image, 'RGBA')
+    sheet = sheets[-1]
+    for row in range(height):
+      start = ((y + row) * SHEET_SIZE + x) * 4
+      sheet[start:start + width * 4] = pixels[row * width * 4:(row + 1) * width * 4]
+
+    index['images'][path] = [len(sheets) - 1, x, y, width, height]
+    x += width + PADDING
+    heights[-1] = max(heights[-1], y + height)
+
+  return index, [sheet[:height * SHEET_SIZE * 4] for sheet, height in zip(sheets, heights)]
+
+def save(index, sheets, atlas_path=ATLAS_PATH):
+  os.makedirs(atlas_path, exist_ok=True)
+  for file_name, sheet in zip(index['sheets'], sheets):
+    size = (SHEET_SIZE, len(sheet) // (SHEET_SIZE * 4))
+    pygame.image.save(pygame.image.frombytes(bytes(sheet), size, 'RGBA'), os.path.join(atlas_path, file_name))
+  #The index is written last so a packed atlas is never
+  #newer than its sheets
+  f = open(os.path.join(atlas_path, ATLAS_INDEX), 'w')
+  json.dump(index, f)
+  f.close()
+
+#Loads images from the sprite sheets. Images are
+#subsurfaces of the sheets, so loading an image doesn't
+#read a file or copy pixels.
+class Atlas:
+  def __init__(self, atlas_path=ATLAS_PATH):
+    self.atlas_path = atlas_path
+    f = open(os.path.join(atlas_path, ATLAS_INDEX), 'r')
+    index = json.load(f)
+    f.close()
+    if index['version'] != ATLAS_VERSION:
+      raise ValueError('Unsupported atlas version: ' + str(index['version']))
+    self.sheet_names = index['sheets']
+    self.images = index['images']
+    #sheet number -> sheet as it was loaded, and converted
+    #for images with and without a colorkey. Sheets are
+    #loaded when they're first used.
+    self.loaded_sheets = {}
+    self.sheets = {}
+    self.colorkey_sheets = {}
+
+  #Check that no image in base_path was added, removed or
+  #changed after the atlas was packed
+  def fresh(self, base_path):
+    files = image_files(base_path)
+    if files.keys() != self.images.keys():
+      return False
+    packed = os.path.getmtime(os.path.join(self.atlas_path, ATLAS_INDEX))
+    return max(files.values()) <= packed
+
+  def sheet(self, number, colorkey):
+    sheets = self.colorkey_sheets if colorkey else self.sheets
+    sheet = sheets.get(number)
+    if sheet is None:
+      loaded = self.loaded_sheets.get(number)
+      if loaded is None:
+        loaded = load_surface(os.path.join(self.atlas_path, self.sheet_names[number]))
+        self.loaded_sheets[number] = loaded
+      sheet = loaded.convert() if colorkey else loaded.convert_alpha()
+      sheets[number] = sheet
+    return sheet
+
+  #Same as utils.load_image() but from the sheets
+  def load_image(self, path, colorkey=(0, 0, 0)):
+    number, x, y, width, height = self.images[path]
+    image = self.sheet(number, colorkey is not None).subsurface((x, y, width, height))
+    if colorkey is not None:
+      image.set_colorkey((0, 0, 0))
+    return image
+
+  #Names of the images in a directory, sorted like
+  #utils.load_images() sorts them
+  def list_images(self, path):
+    prefix = path + '/'
+    return sorted(
+      image_path[len(prefix):]
+      for image_path in self.images
+      if image_path.startswith(prefix) and '/' not in image_path[len(prefix):]
+    )
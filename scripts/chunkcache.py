@@ -0,0 +1,123 @@
+import math
+from collections import OrderedDict
+
+import pygame
+
+from scripts.grid import CHUNK_SHIFT, CHUNK_SIZE, EMPTY
+
+class ChunkCache:
+  def __init__(self, tilemap, max_chunks=64):
+    self.tilemap = tilemap
+    #Maximum number of baked chunk surfaces kept in memory.
+    #The least recently drawn chunk is dropped first.
+    self.max_chunks = max_chunks
+    #(chunk_x, chunk_y) -> (chunk version, surface)
+    self.surfaces = OrderedDict()
+    #Largest number of pixels a tile image sticks out of its
+    #cell to the right or bottom. Chunk surfaces are padded
+    #by this amount so big tiles aren't cut at chunk borders.
+    self.padding = 0
+
+  def clear(self):
+    self.surfaces.clear()
+    self.padding = 0
+
+  def bake(self, chunk_loc, chunk):
+    assets = self.tilemap.game.assets
+    type_names = self.tilemap.grid.type_names
+    tile_size = self.tilemap.tile_size
+
+    padding = 0
+    for index in range(CHUNK_SIZE * CHUNK_SIZE):
+      type_id = chunk.types[index]
+      if type_id != EMPTY:
+        img = assets[type_names[type_id]][chunk.variants[index]]
+        padding = max(padding, img.get_width() - tile_size, img.get_height() - tile_size)
+    self.padding = max(self.padding, padding)
+
+    chunk_px = CHUNK_SIZE * tile_size
+    #SRCALPHA keeps empty cells transparent
+    surf = pygame.Surface((chunk_px + padding, chunk_px + padding), pygame.SRCALPHA)
+    #Keep the same drawing order as drawing the tiles one by one,
+    #column by column from left to right.
+    for local_x in range(CHUNK_SIZE):
+      for local_y in range(CHUNK_SIZE):
+        index = (local_y << CHUNK_SHIFT) | local_x
+        type_id = chunk.types[index]
+        if type_id != EMPTY:
+          surf.blit(
+            assets[type_names[type_id]][chunk.variants[index]],
+            (local_x * tile_size, local_y * tile_size)
+          )
+    return surf
+
+  #Get the baked surface of a chunk. Chunks are baked
+  #lazily and baked again if their tiles changed.
+  def surface(self, chunk_loc):
+    chunk = self.tilemap.grid.chunks.get(chunk_loc)
+    if chunk is None:
+      return None
+
+    cached = self.surfaces.get(chunk_loc)
+    if cached is not None and cached[0] == chunk.version:
+      self.surfaces.move_to_end(chunk_loc)
+      return cached[1]
+
+    surf = self.bake(chunk_loc, chunk)
+    self.surfaces[chunk_loc] = (chunk.version, surf)
+    self.surfaces.move_to_end(chunk_loc)
+    while len(self.surfaces) > self.max_chunks:
+      self.surfaces.popitem(last=False)
+    return surf
+
+  #Bake chunks ahead of time, up to max_chunks, so the
+  #first frames of a level don't have to.
+  def warm(self):
+    for chunk_loc in list(self.tilemap.grid.chunks)[:self.max_chunks]:
+      self.surface(chunk_loc)
+
+  #(start_x, start_y, end_x, end_y) of the chunks seen by a
+  #camera at offset with a view of size pixels. The end is
+  #included.
+  def view_range(self, offset, size):
+    chunk_px = CHUNK_SIZE * self.tilemap.tile_size
+    #Start from the chunks on the left and top of the camera
+    #when their padding may stick out into the camera.
+    return (
+      int((offset[0] - self.padding) // chunk_px),
+      int((offset[1] - self.padding) // chunk_px),
+      int((offset[0] + size[0]) // chunk_px),
+      int((offset[1] + size[1]) // chunk_px)
+    )
+
+  #Bake the chunks a camera at offset sees so the first frame
+  #after a level is swapped in doesn't have to
+  def warm_view(self, offset, size):
+    #Baking can make the padding bigger, which brings more
+    #chunks into the view. Bake those too.
+    padding = None
+    while padding != self.padding:
+      padding = self.padding
+      start_x, start_y, end_x, end_y = self.view_range(offset, size)
+      for chunk_x in range(start_x, end_x + 1):
+        for chunk_y in range(start_y, end_y + 1):
+          self.surface((chunk_x, chunk_y))
+
+  def render(self, surf, offset):
+    chunk_px = CHUNK_SIZE * self.tilemap.tile_size
+    start_x, start_y, end_x, end_y = self.view_range(offset, surf.get_size())
+
+    for chunk_x in range(start_x, end_x + 1):
+      for chunk_y in range(start_y, end_y + 1):
+        chunk_surf = self.surface((chunk_x, chunk_y))
+        if chunk_surf is not None:
+          #Use floor instead of letting blit() truncate a float offset
+          #toward zero. Chunks often start left of or above the camera
+          #and truncation would shift all of their tiles by a pixel.
+          surf.blit(
+            chunk_surf,
+            (
+              math.floor(chunk_x * chunk_px - offset[0]),
+              math.floor(chunk_y * chunk_px - offset[1])
+            )
+          )
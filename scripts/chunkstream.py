@@ -0,0 +1,89 @@
+from scripts.grid import CHUNK_SIZE
+
+#Loads the on-grid chunks of a binary level on demand.
+#Only the chunks around the camera are kept in the tile
+#grid. Chunks ahead of the camera are loaded a few at a
+#time every frame and chunks far from the camera are
+#dropped, so memory stays bounded on very large levels
+#and there's no long pause when a level starts.
+class ChunkStream:
+  def __init__(self, tilemap, level, radius=1, max_loads=2):
+    self.tilemap = tilemap
+    self.saveload = tilemap.saveload
+    #Level opened with SaveLoad.open_binary()
+    self.level = level
+    #Number of chunks loaded around the chunks the
+    #camera can see
+    self.radius = radius
+    #Maximum number of chunks loaded per frame
+    self.max_loads = max_loads
+    #Chunks in the grid. Chunks that aren't in the level
+    #file are empty and are never loaded.
+    self.resident = set()
+
+  def close(self):
+    self.saveload.close_binary(self.level)
+
+  def chunk_px(self):
+    return CHUNK_SIZE * self.tilemap.tile_size
+
+  def load_chunk(self, chunk_loc):
+    types, variants = self.saveload.read_chunk(self.level, self.level['chunk_offsets'][chunk_loc])
+    self.tilemap.grid.load_chunk(chunk_loc[0], chunk_loc[1], self.level['types'], types, variants)
+    self.resident.add(chunk_loc)
+
+  #Chunks of the camera area plus radius, sorted by
+  #distance to the center of the camera
+  def wanted_chunks(self, scroll, view_size, radius):
+    chunk_px = self.chunk_px()
+    left = int(scroll[0] // chunk_px) - radius
+    top = int(scroll[1] // chunk_px) - radius
+    right = int((scroll[0] + view_size[0]) // chunk_px) + radius
+    bottom = int((scroll[1] + view_size[1]) // chunk_px) + radius
+    center = (
+      (scroll[0] + view_size[0] * 0.5) / chunk_px - 0.5,
+      (scroll[1] + view_size[1] * 0.5) / chunk_px - 0.5
+    )
+
+    chunks = []
+    for chunk_x in range(left, right + 1):
+      for chunk_y in range(top, bottom + 1):
+        if (chunk_x, chunk_y) in self.level['chunk_offsets']:
+          chunks.append((chunk_x, chunk_y))
+    chunks.sort(key=lambda loc: (loc[0] - center[0]) ** 2 + (loc[1] - center[1]) ** 2)
+    return chunks
+
+  #Load chunks around the camera and drop the far ones.
+  #If wait is True, every chunk around the camera is
+  #loaded now. This is used when a level starts.
+  def update(self, scroll, view_size, wait=False):
+    loads = 0
+    for chunk_loc in self.wanted_chunks(scroll, view_size, self.radius):
+      if chunk_loc not in self.resident:
+        if loads >= self.max_loads and not wait:
+          break
+        self.load_chunk(chunk_loc)
+        loads += 1
+
+    #Keep one more ring of chunks than we load so chunks on
+    #the edge aren't dropped and loaded again every frame
+    keep = set(self.wanted_chunks(scroll, view_size, self.radius + 1))
+    for chunk_loc in list(self.resident):
+      if chunk_loc not in keep:
+        self.tilemap.grid.drop_chunk(chunk_loc[0], chunk_loc[1])
+        self.resident.discard(chunk_loc)
+
+  #Check if the tiles around a position in pixels are
+  #loaded. Entities in chunks that aren't loaded would
+  #fall through the missing tiles.
+  def loaded(self, pos):
+    chunk_px = self.chunk_px()
+    tile_size = self.tilemap.tile_size
+    for offset_x, offset_y in [(-1, -1), (1, -1), (-1, 1), (1, 1)]:
+      chunk_loc = (
+        int((pos[0] + offset_x * tile_size) // chunk_px),
+        int((pos[1] + offset_y * tile_size) // chunk_px)
+      )
+      if chunk_loc in self.level['chunk_offsets'] and chunk_loc not in self.resident:
+        return False
+    return True
@@ -1,6 +1,8 @@
 import random
 
 class Cloud:
+    __slots__ = ('pos', 'img', 'speed', 'depth')
+
     def __init__(self, pos, img, speed, depth):
         self.pos = list(pos)
         self.img = img
@@ -3,54 +3,135 @@ import os
 
 import pygame
 from scripts.animation import Animation
+from scripts.assetcache import load_sound
 from scripts.utils import load_image, load_images
 
 #unit used here is number of frames
 SCREEN_TRANSITION_DURATION = 30
 
-#List of levels
-LEVEL_LIST = os.listdir('data/maps')
+#The game logic runs at a fixed rate no matter how fast
+#frames are drawn. Motion is in pixels per logic step.
+LOGIC_FPS = 60
+LOGIC_STEP = 1 / LOGIC_FPS
+#If drawing a frame took longer than this many logic steps,
+#the remaining steps are dropped and the game slows down
+#instead of falling further behind every frame.
+MAX_STEPS_PER_FRAME = 5
+
+#List of levels. A level may have a JSON file and a
+#binary copy so count file names without extension.
+def level_list():
+  return sorted(set(os.path.splitext(file_name)[0] for file_name in os.listdir('data/maps')))
 
 #number of levels
-MAX_LEVEL = len(LEVEL_LIST)
+def max_level():
+  return len(level_list())
 
-def init_assets():
-  return {
-  'decor': load_images('tiles/decor'),
-  'grass': load_images('tiles/grass'),
-  'large_decor': load_images('tiles/large_decor'),
-  'stone': load_images('tiles/stone'),
-  'spawner': load_images('tiles/spawners'),
-  'player': load_image('entities/player.png', None),
-  'background': load_image('background.png'),
-  'clouds': load_images('clouds'),
-  'gun': load_image('gun.png'),
-  'projectile': load_image('projectile.png')
+#Load the on-grid tiles of binary levels around the
+#camera only instead of the whole level. See
+#scripts/chunkstream.py
+STREAM_LEVELS = False
+
+#Only draw the parts of the frame that changed while the
+#camera doesn't move. See scripts/dirtyrects.py
+DIRTY_RECTS = False
+
+#Assets, animations and sounds used by every level and by
+#the things in a level. See level_assets()
+BASE_ASSETS = {
+  'assets': ['background', 'clouds'],
+  'sfx': ['ambience']
+}
+PLAYER_ASSETS = {
+  'animations': ['player/idle', 'player/run', 'player/jump', 'player/wall_slide', 'particle/dash'],
+  'sfx': ['jump', 'dash', 'hit']
+}
+ENEMY_ASSETS = {
+  'assets': ['gun', 'gun/flipped', 'projectile'],
+  'animations': ['enemy/idle', 'enemy/run', 'particle/dash'],
+  'sfx': ['shoot', 'hit']
+}
+#Trees are the leaf spawners
+TREE_ASSETS = {
+  'animations': ['particle/leaf']
 }
 
-def init_anims():
+#Names of the assets, animations and sounds a level needs.
+#tile_types are the tile sets of its tiles.
+def level_assets(tile_types, player=True, enemies=True, trees=True):
+  names = {'assets': list(tile_types), 'animations': [], 'sfx': []}
+  for used, table in [(True, BASE_ASSETS), (player, PLAYER_ASSETS), (enemies, ENEMY_ASSETS), (trees, TREE_ASSETS)]:
+    if used:
+      for table_name, asset_names in table.items():
+        names[table_name].extend(name for name in asset_names if name not in names[table_name])
+  return names
+
+#Functions that load every asset by name. Used by
+#AssetManager to load assets when they're needed. See
+#scripts/assets.py
+def asset_loaders():
   return {
-    'player/idle': Animation(load_images('entities/player/idle', None)),
-    'player/run': Animation(load_images('entities/player/run', None), frame_duration=4),
-    'player/jump': Animation(load_images('entities/player/jump', None)),
-    'player/wall_slide': Animation(load_images('entities/player/wall_slide', None)),
-    'particle/leaf': Animation(load_images('particles/leaf'), frame_duration=12, loop=False),
-    'particle/dash': Animation(load_images('particles/particle'), frame_duration=6, loop=False),
-    'enemy/idle': Animation(load_images('entities/enemy/idle'), frame_duration=6),
-    'enemy/run': Animation(load_images('entities/enemy/run'), frame_duration=4)
+    'decor': lambda: load_images('tiles/decor'),
+    'grass': lambda: load_images('tiles/grass'),
+    'large_decor': lambda: load_images('tiles/large_decor'),
+    'stone': lambda: load_images('tiles/stone'),
+    'spawner': lambda: load_images('tiles/spawners'),
+    'player': lambda: load_image('entities/player.png', None),
+    'background': lambda: load_image('background.png'),
+    'clouds': lambda: load_images('clouds'),
+    'gun': lambda: load_image('gun.png'),
+    #Enemies facing left hold the gun mirrored
+    'gun/flipped': lambda: pygame.transform.flip(load_image('gun.png'), True, False),
+    'projectile': lambda: load_image('projectile.png')
   }
 
-def init_sfx():
-  sounds = {
-    'jump': (pygame.mixer.Sound('data/sfx/jump.wav'), 0.7),
-    'dash': (pygame.mixer.Sound('data/sfx/dash.wav'), 0.3),
-    'hit': (pygame.mixer.Sound('data/sfx/hit.wav'), 0.8),
-    'shoot': (pygame.mixer.Sound('data/sfx/shoot.wav'), 0.4),
-    'ambience': (pygame.mixer.Sound('data/sfx/ambience.wav'), 0.2)
+def anim_loaders():
+  return {
+    'player/idle': lambda: Animation(load_images('entities/player/idle', None)),
+    'player/run': lambda: Animation(load_images('entities/player/run', None), frame_duration=4),
+    'player/jump': lambda: Animation(load_images('entities/player/jump', None)),
+    'player/wall_slide': lambda: Animation(load_images('entities/player/wall_slide', None)),
+    'particle/leaf': lambda: Animation(load_images('particles/leaf'), frame_duration=12, loop=False),
+    'particle/dash': lambda: Animation(load_images('particles/particle'), frame_duration=6, loop=False),
+    'enemy/idle': lambda: Animation(load_images('entities/enemy/idle'), frame_duration=6),
+    'enemy/run': lambda: Animation(load_images('entities/enemy/run'), frame_duration=4)
   }
 
-  for sound in sounds:
-    volume = sounds[sound][1]
-    sounds[sound][0].set_volume(volume)
+#Load everything now
+def init_assets():
+  return {name: load() for name, load in asset_loaders().items()}
+
+def init_anims():
+  return {name: load() for name, load in anim_loaders().items()}
+
+#Used instead of a pygame Sound when the game has no sound
+class SilentSound:
+  def play(self, loops=0):
+    pass
+
+  def set_volume(self, volume):
+    pass
+
+SOUND_FILES = {
+  'jump': ('data/sfx/jump.wav', 0.7),
+  'dash': ('data/sfx/dash.wav', 0.3),
+  'hit': ('data/sfx/hit.wav', 0.8),
+  'shoot': ('data/sfx/shoot.wav', 0.4),
+  'ambience': ('data/sfx/ambience.wav', 0.2)
+}
+
+#Returns (sound, volume)
+def init_sound(path, volume, enabled=True):
+  sound = load_sound(path) if enabled else SilentSound()
+  sound.set_volume(volume)
+  return (sound, volume)
+
+def sfx_loaders(enabled=True):
+  loaders = {}
+  for sound in SOUND_FILES:
+    path, volume = SOUND_FILES[sound]
+    loaders[sound] = lambda path=path, volume=volume: init_sound(path, volume, enabled)
+  return loaders
 
-  return sounds
\ No newline at end of file
+def init_sfx(enabled=True):
+  return {name: load() for name, load in sfx_loaders(enabled).items()}
@@ -0,0 +1,133 @@
+import pygame
+
+#Largest number of rects redrawn separately. If more parts
+#changed, the whole frame is redrawn.
+MAX_RECTS = 32
+#Redraw the whole frame if more than this fraction of it
+#changed. One big redraw is faster than many small ones.
+FULL_REDRAW = 0.6
+
+#Works like the surface it wraps but draws nothing. Blits on
+#it are kept as (image, (x, y), area, special_flags), the
+#items Surface.blits() takes, so they can be drawn later
+#over the parts of the frame that changed.
+class RecordingSurface:
+  def __init__(self, surface, blits):
+    self.surface = surface
+    self.blits = blits
+
+  def blit(self, source, dest, area=None, special_flags=0):
+    if area is None:
+      rect = pygame.Rect(dest[0], dest[1], source.get_width(), source.get_height())
+    else:
+      area = tuple(pygame.Rect(area))
+      rect = pygame.Rect(dest[0], dest[1], area[2], area[3])
+    self.blits.append((source, (rect.x, rect.y), area, special_flags))
+    return rect
+
+  def fblits(self, blit_sequence, special_flags=0):
+    blits = self.blits
+    #int() truncates like blit() does with float positions
+    for source, dest in blit_sequence:
+      blits.append((source, (int(dest[0]), int(dest[1])), None, special_flags))
+
+  def __getattr__(self, name):
+    return getattr(self.surface, name)
+
+#Rect a recorded blit covers
+def blit_rect(blit):
+  source, dest, area = blit[:3]
+  if area is None:
+    return pygame.Rect(dest, source.get_size())
+  return pygame.Rect(dest, area[2:])
+
+#Compares what is drawn in the last frame and in this frame
+#so only the parts of the frame that changed are drawn again.
+#Images drawn at the same place in both frames didn't change.
+#Whatever isn't recorded, like the background, must only
+#change when the view passed to begin() changes.
+class DirtyRects:
+  def __init__(self, size):
+    self.bounds = pygame.Rect((0, 0), size)
+    #Blits on the display and on what is behind it in the
+    #last frame and in this frame. See RecordingSurface.
+    #last is None if the last frame wasn't recorded.
+    self.last = None
+    self.display = []
+    self.background = []
+    #Everything that changes the whole frame, e.g. the camera
+    self.view = None
+    #Fraction of the frame redrawn in the last frame and the
+    #sum over every frame
+    self.redrawn = 1
+    self.redrawn_total = 0
+    self.frames = 0
+
+  #Start a frame. Returns True if the frame has to be recorded
+  #and passed to end(). A frame where the view changed is
+  #drawn whole and isn't recorded, it would be thrown away
+  #by the next frame if the view changes again. The first
+  #frame after the view stops changing is drawn whole too,
+  #there's nothing to compare it with.
+  def begin(self, view):
+    self.display = []
+    self.background = []
+    if view != self.view:
+      self.view = view
+      self.last = None
+      self.count(1)
+      return False
+    return True
+
+  #Surfaces that keep the blits on the display and on what
+  #is behind it
+  def display_recorder(self, surface):
+    return RecordingSurface(surface, self.display)
+
+  def background_recorder(self, surface):
+    return RecordingSurface(surface, self.background)
+
+  def count(self, redrawn):
+    self.redrawn = redrawn
+    self.redrawn_total += redrawn
+    self.frames += 1
+
+  #End a frame after everything was recorded. Returns the
+  #rects that changed or None to redraw the whole frame, like
+  #when full is True.
+  def end(self, full):
+    current = set(self.display)
+    current.update(self.background)
+    result = None
+    redrawn = 1
+    if not full and self.last is not None:
+      result = self.merge([blit_rect(blit) for blit in self.last ^ current])
+      if result is not None:
+        redrawn = sum(rect.width * rect.height for rect in result) / (self.bounds.width * self.bounds.height)
+        if redrawn > FULL_REDRAW:
+          result = None
+          redrawn = 1
+    self.last = current
+    self.count(redrawn)
+    return result
+
+  #Average fraction of the frame redrawn
+  def average(self):
+    return self.redrawn_total / self.frames if self.frames else 0
+
+  #Returns rects that don't overlap and cover every rect.
+  #Rects grow by 1 pixel on every side for the outline. None
+  #if there are more than MAX_RECTS of them.
+  def merge(self, rects):
+    rects = [rect.inflate(2, 2).clip(self.bounds) for rect in rects]
+    rects = [rect for rect in rects if rect.width and rect.height]
+    merged = []
+    for rect in rects:
+      i = rect.collidelist(merged)
+      while i != -1:
+        rect = rect.union(merged.pop(i))
+        i = rect.collidelist(merged)
+      merged.append(rect)
+    if len(merged) > MAX_RECTS:
+      return None
+    return merged
@@ -1,4 +1,26 @@
 import json
+import mmap
+import os
+import struct
+
+from scripts.grid import CHUNK_SHIFT, CHUNK_SIZE, CHUNK_MASK
+
+#Binary level format. All numbers are little-endian.
+#
+#header: magic, format version, tile size, chunk size,
+#        number of types, number of chunks, number of off-grid tiles
+#types: for every type, 1 byte length + utf-8 name
+#chunks: for every chunk, chunk x and y + one byte per cell of
+#        type numbers(0 is empty, 1 is the first type in the
+#        string table) + one byte per cell of variants
+#off-grid tiles: x, y in pixels, type number, variant
+BINARY_MAGIC = b'NJLV'
+BINARY_VERSION = 1
+BINARY_EXT = '.bin'
+HEADER = struct.Struct('<4sHHHHII')
+CHUNK_HEADER = struct.Struct('<ii')
+OFFGRID_TILE = struct.Struct('<iiBB')
+CHUNK_CELLS = CHUNK_SIZE * CHUNK_SIZE
 
 class SaveLoad:
 
@@ -7,8 +29,166 @@ class SaveLoad:
     json.dump(data, f)
     f.close()
 
+    #Keep the binary copy of the level up to date
+    binary_path = os.path.splitext(path)[0] + BINARY_EXT
+    if path.endswith('.json') and os.path.exists(binary_path):
+      self.save_binary(binary_path, data)
+
+  #Loads a level. If a binary copy of a JSON level exists
+  #and is not older than the JSON file, the binary copy
+  #is loaded instead.
   def load(self, path):
+    binary_path = self.binary_path(path)
+    if binary_path is not None:
+      return self.load_binary(binary_path)
+    return self.load_json(path)
+
+  def load_json(self, path):
     f = open(path, 'r')
     data = json.load(f)
     f.close()
-    return data
\ No newline at end of file
+    return data
+
+  #data is in the same format as the JSON level files
+  def save_binary(self, path, data):
+    type_names = []
+    type_numbers = {}
+    tiles = list(data['tilemap'].values()) + list(data['offgrid'])
+    for tile in tiles:
+      if tile['type'] not in type_numbers:
+        type_names.append(tile['type'])
+        type_numbers[tile['type']] = len(type_names)
+    if len(type_names) > 255:
+      raise ValueError('Too many tile types to save: ' + str(len(type_names)))
+
+    #(chunk x, chunk y) -> [types, variants]
+    chunks = {}
+    for tile in data['tilemap'].values():
+      x, y = int(tile['pos'][0]), int(tile['pos'][1])
+      chunk = chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+      if chunk is None:
+        chunk = [bytearray(CHUNK_CELLS), bytearray(CHUNK_CELLS)]
+        chunks[(x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)] = chunk
+      index = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+      chunk[0][index] = type_numbers[tile['type']]
+      chunk[1][index] = tile['variant']
+
+    f = open(path, 'wb')
+    f.write(HEADER.pack(
+      BINARY_MAGIC,
+      BINARY_VERSION,
+      data['tile_size'],
+      CHUNK_SIZE,
+      len(type_names),
+      len(chunks),
+      len(data['offgrid'])
+    ))
+    for type_name in type_names:
+      name = type_name.encode('utf-8')
+      f.write(bytes([len(name)]) + name)
+    for (chunk_x, chunk_y), chunk in chunks.items():
+      f.write(CHUNK_HEADER.pack(chunk_x, chunk_y))
+      f.write(chunk[0])
+      f.write(chunk[1])
+    for tile in data['offgrid']:
+      #Off-grid positions are saved as whole pixels
+      f.write(OFFGRID_TILE.pack(
+        int(tile['pos'][0]),
+        int(tile['pos'][1]),
+        type_numbers[tile['type']],
+        tile['variant']
+      ))
+    f.close()
+
+  #Opens a binary level without reading its chunks. Returns
+  #the level data with 'file'(the memory-mapped file) and
+  #'chunk_offsets'((chunk x, chunk y) -> file offset) instead
+  #of the on-grid tiles. Chunks are read with read_chunk() and
+  #the file must be closed with close_binary().
+  def open_binary(self, path):
+    f = open(path, 'rb')
+    try:
+      data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+      f.close()
+
+    try:
+      magic, version, tile_size, chunk_size, type_count, chunk_count, offgrid_count = \
+        HEADER.unpack_from(data, 0)
+      if magic != BINARY_MAGIC:
+        raise ValueError('Not a level file: ' + path)
+      if version != BINARY_VERSION:
+        raise ValueError('Unsupported level file version: ' + str(version))
+      if chunk_size != CHUNK_SIZE:
+        raise ValueError('Unsupported level chunk size: ' + str(chunk_size))
+
+      offset = HEADER.size
+      type_names = []
+      for i in range(type_count):
+        length = data[offset]
+        type_names.append(data[offset + 1:offset + 1 + length].decode('utf-8'))
+        offset += 1 + length
+
+      #Chunk records have a fixed size so only their x and y
+      #have to be read to know where each chunk is
+      chunk_offsets = {}
+      for i in range(chunk_count):
+        chunk_offsets[CHUNK_HEADER.unpack_from(data, offset)] = offset + CHUNK_HEADER.size
+        offset += CHUNK_HEADER.size + CHUNK_CELLS * 2
+
+      offgrid = []
+      end = offset + OFFGRID_TILE.size * offgrid_count
+      for x, y, type_number, variant in OFFGRID_TILE.iter_unpack(data[offset:end]):
+        offgrid.append({'type': type_names[type_number - 1], 'variant': variant, 'pos': [x, y]})
+    except Exception:
+      data.close()
+      raise
+
+    return {
+      'file': data,
+      'tile_size': tile_size,
+      'types': type_names,
+      'chunk_offsets': chunk_offsets,
+      'offgrid': offgrid
+    }
+
+  #Returns the type and variant bytes of a chunk
+  #in a level opened with open_binary()
+  def read_chunk(self, level, offset):
+    data = level['file']
+    return (
+      data[offset:offset + CHUNK_CELLS],
+      data[offset + CHUNK_CELLS:offset + CHUNK_CELLS * 2]
+    )
+
+  def close_binary(self, level):
+    level['file'].close()
+
+  #Returns the level data with the on-grid tiles as raw
+  #chunks instead of the 'tilemap' dict. The chunks
+  #can be copied to TileGrid as they are.
+  def load_binary(self, path):
+    level = self.open_binary(path)
+    try:
+      chunks = []
+      for (chunk_x, chunk_y), offset in level['chunk_offsets'].items():
+        chunks.append((chunk_x, chunk_y, *self.read_chunk(level, offset)))
+    finally:
+      self.close_binary(level)
+
+    return {
+      'tile_size': level['tile_size'],
+      'types': level['types'],
+      'chunks': chunks,
+      'offgrid': level['offgrid']
+    }
+
+  #Path of the binary copy of a level if it has an
+  #up to date one, otherwise None
+  def binary_path(self, path):
+    binary_path = os.path.splitext(path)[0] + BINARY_EXT
+    if path.endswith(BINARY_EXT):
+      return path
+    if os.path.exists(binary_path):
+      if not os.path.exists(path) or os.path.getmtime(binary_path) >= os.path.getmtime(path):
+        return binary_path
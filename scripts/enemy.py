@@ -2,7 +2,6 @@
 import math
 import random
 
-import pygame
 from scripts.entities import PhysicsEntity
 
 
@@ -15,6 +14,8 @@ class Enemy(PhysicsEntity):
     self.fire_time = 0
 
   def update(self, tilemap, movement=(0,0)):
+    #The enemy doesn't move until super().update()
+    rect = self.rect()
     if self.walking:
       #Check if there's a tile on bottom-left or
       #bottom-right of the enemy. We use 6 as offset
@@ -23,8 +24,8 @@ class Enemy(PhysicsEntity):
       #you should adjust your offsets too.
       if tilemap.solid_tile(
         (
-          self.rect().centerx + (-6 if self.flip else 6),
-          (self.pos[1] + self.rect().height) + 6
+          rect.centerx + (-6 if self.flip else 6),
+          (self.pos[1] + rect.height) + 6
         )
       ):
         #If we already bumped into a left or right wall.
@@ -49,11 +50,9 @@ class Enemy(PhysicsEntity):
         self.game.player.pos[1] - self.pos[1]
       )
 
-      #Enemy and player height is 15. so, if
-      #their 'y'(top-left point) distance is 
-      #less than 12, they're very likely on 
-      #their line of sight
-      if abs(dist[1]) < 12:
+      #Only shoot when the player is on the enemy's line of
+      #sight so the projectile can hit
+      if self.line_of_sight(tilemap, rect):
         #If enemy is facing the player at right.
         #distance will be negative if enemy
         #is on the right and player is on the
@@ -62,15 +61,14 @@ class Enemy(PhysicsEntity):
           #Shoot the player
           if(self.fire_time == 0):
             self.game.sfx['shoot'][0].play(0)
-            self.game.projectiles.append([
-              [self.rect().centerx - 2, self.rect().centery],
-              -1.25,
-              0
-            ])
+            projectile = self.game.projectiles.acquire(
+              (rect.centerx - 2, rect.centery),
+              -1.25
+            )
             self.game.create_sparks(
               6,
               #newly added projectile
-              self.game.projectiles[-1][0],
+              projectile.pos,
               #from -0.25 to 0.75 + math.pi(180 degrees)
               random.random() - 0.25 + math.pi,
               1 + random.random()
@@ -81,15 +79,14 @@ class Enemy(PhysicsEntity):
           #Shoot the player
           if(self.fire_time == 0):
             self.game.sfx['shoot'][0].play(0)
-            self.game.projectiles.append([
-              [self.rect().centerx + 2, self.rect().centery],
-              1.25,
-              0
-            ])
+            projectile = self.game.projectiles.acquire(
+              (rect.centerx + 2, rect.centery),
+              1.25
+            )
             self.game.create_sparks(
               6,
               #newly added projectile
-              self.game.projectiles[-1][0],
+              projectile.pos,
               random.random() - 0.25,
               1 + random.random()
             )
@@ -109,39 +106,52 @@ class Enemy(PhysicsEntity):
     if abs(self.game.player.dashing) >= 50:
       #If enemy and player collide at this point.
       #Enemy is dead.
-      if(self.rect().colliderect(self.game.player.rect())):
+      #The player's rect is made once per step. See Game.step()
+      rect = self.rect()
+      if(rect.colliderect(self.game.player_rect)):
         self.game.sfx['hit'][0].play(0)
-        self.game.explode_entity(30, self.rect().center, self.rect().center)
+        self.game.explode_entity(30, rect.center, rect.center)
         self.game.screenshake = max(12, self.game.screenshake)
         return True
 
+  #Check if a projectile fired from the enemy's center would
+  #fly into the player: the player covers the row the
+  #projectile flies in and no solid tile is in the way.
+  #rect is the enemy's collision box.
+  def line_of_sight(self, tilemap, rect):
+    player_rect = self.game.player_rect
+    if not player_rect.top <= rect.centery < player_rect.bottom:
+      return False
+    if player_rect.centerx < rect.centerx:
+      end_x = player_rect.right - 1
+    else:
+      end_x = player_rect.left
+    return tilemap.ray_cast_x(rect.center, end_x) is None
+
   #offset is the camera x and y coordinates
-  def render(self, surf, offset):
-    super().render(surf, offset)
+  def render(self, surf, offset, alpha=1):
+    super().render(surf, offset, alpha=alpha)
+    rect = self.render_rect(alpha)
     #number 2 is just an arbitrary offset.
     #you can change it if you wanna adjust
     #the 'x' position of your gun
-    posx_flip = self.rect().centerx - \
+    posx_flip = rect.centerx - \
     self.game.assets['gun'].get_width() - \
     2 - offset[0]
 
     if self.flip:
       surf.blit(
-        pygame.transform.flip(
-          self.game.assets['gun'], 
-          self.flip, 
-          False
-        ),
+        self.game.assets['gun/flipped'],
         (
           posx_flip, 
-          self.rect().centery - offset[1]
+          rect.centery - offset[1]
         )
       )
     else:
       surf.blit(
         self.game.assets['gun'], 
         (
-          self.rect().centerx + 2 - offset[0],
-          self.rect().centery - offset[1]
+          rect.centerx + 2 - offset[0],
+          rect.centery - offset[1]
         )
       )
\ No newline at end of file
@@ -5,7 +5,16 @@ class PhysicsEntity:
         self.game = game
         self.type = type
         self.pos = list(pos)
+        #Position before the last update. The entity is drawn
+        #between this and pos when a frame is drawn between two
+        #logic steps. See Game.render().
+        self.last_pos = list(pos)
         self.size = size
+        #Collision box. It's moved to pos by rect() instead of
+        #making a new rect every time.
+        self.collision_rect = pygame.Rect(self.pos[0], self.pos[1], size[0], size[1])
+        #Box at the drawn position, moved by render_rect()
+        self.draw_rect = pygame.Rect(self.pos[0], self.pos[1], size[0], size[1])
         self.velocity = [0, 0]
         self.collisions = {'up': False, 'down': False, 'right': False, 'left': False}
 
@@ -21,8 +30,28 @@ class PhysicsEntity:
         self.flip = False
         self.set_action('idle')
 
+    #Collision box at pos. The same rect is returned on every
+    #call, copy it to keep it after pos changes.
     def rect(self):
-      return pygame.Rect(self.pos[0], self.pos[1], self.size[0], self.size[1])
+      rect = self.collision_rect
+      rect.topleft = self.pos
+      return rect
+
+    #Position to draw the entity at. alpha is how far the
+    #drawn frame is between the last update(0) and the
+    #current one(1).
+    def render_pos(self, alpha=1):
+      return (
+        self.last_pos[0] + (self.pos[0] - self.last_pos[0]) * alpha,
+        self.last_pos[1] + (self.pos[1] - self.last_pos[1]) * alpha
+      )
+
+    #Collision box at render_pos(). Like rect(), the same rect is
+    #returned on every call.
+    def render_rect(self, alpha=1):
+      rect = self.draw_rect
+      rect.topleft = self.render_pos(alpha)
+      return rect
         
     def set_action(self, action):
         #If there's a new action, replace
@@ -33,6 +62,9 @@ class PhysicsEntity:
             self.animation = self.game.animations[self.type + '/' + self.action].shallow_copy()
 
     def update(self, tilemap, movement=(0, 0)):
+        self.last_pos[0] = self.pos[0]
+        self.last_pos[1] = self.pos[1]
+
         #init collisions
         self.collisions = {'up': False, 'down': False, 'right': False, 'left': False}
         
@@ -87,27 +119,24 @@ class PhysicsEntity:
 
         self.animation.update()
         
-    def render(self, surf, offset, non_silhouette=None):
+    def render(self, surf, offset, non_silhouette=None, alpha=1):
         surface = surf
+        pos = self.render_pos(alpha)
 
         if non_silhouette is not None:
           surface = non_silhouette
 
-        #flip image from left to right and vice versa. The third parameter of
-        #flip is set to false because we don't want to flip the image from top
-        #to bottom and vice versa.
+        #flip image from left to right and vice versa. The flipped
+        #images are made when the animation is loaded.
+        #See scripts/animation.py
         surface.blit(
-          pygame.transform.flip(
-            self.animation.image(), 
-            self.flip, 
-            False
-          ),
+          self.animation.image(self.flip),
           #Convert self.pos[1] to int or else you will have a jitter
           #problem when camera 'y' offset is very close to
           #self.pos[1].
           (
-            int(self.pos[0]) - offset[0] + self.anim_offset[0], 
-            int(self.pos[1]) - offset[1] + self.anim_offset[1]
+            int(pos[0]) - offset[0] + self.anim_offset[0], 
+            int(pos[1]) - offset[1] + self.anim_offset[1]
           )
         )
         
\ No newline at end of file
@@ -20,15 +20,25 @@ class Factory:
       )
     return leaf_spawners
   
-  def create_character_spawner(self, game_instance, player, spawn_list):
-    enemy_spawners = []
-    
+  #Returns the player spawn position(None if the level
+  #has no player spawner) and the enemies. This doesn't
+  #touch the player so it can run on a worker thread.
+  def create_enemies(self, game_instance, spawn_list):
+    player_pos = None
+    enemies = []
+
     for spawner in spawn_list:
       #player
       if spawner['variant'] == 0:
-        player.pos = spawner['pos']
-        player.air_time = 0
+        player_pos = list(spawner['pos'])
       #enemy
       else:
-        enemy_spawners.append(Enemy(game_instance, spawner['pos'], (8, 15)))
-    return enemy_spawners
\ No newline at end of file
+        enemies.append(Enemy(game_instance, spawner['pos'], (8, 15)))
+    return player_pos, enemies
+  
+  def create_character_spawner(self, game_instance, player, spawn_list):
+    player_pos, enemy_spawners = self.create_enemies(game_instance, spawn_list)
+    if player_pos is not None:
+      player.pos = player_pos
+      player.air_time = 0
+    return enemy_spawners
@@ -0,0 +1,330 @@
+#Number of bits used to split a grid coordinate into
+#a chunk coordinate and a local coordinate. 4 bits
+#means every chunk is 16x16 tiles.
+CHUNK_SHIFT = 4
+CHUNK_SIZE = 1 << CHUNK_SHIFT
+CHUNK_MASK = CHUNK_SIZE - 1
+
+#Type id 0 is reserved for empty cells
+EMPTY = 0
+
+class GridChunk:
+  #Large maps have tens of thousands of chunks and a lookup
+  #lands on a random one. Without a __dict__ a lookup reads
+  #one less object that is likely not in the CPU cache.
+  __slots__ = ('types', 'variants', 'count', 'version')
+
+  def __init__(self):
+    #One byte per cell. Cells are stored row by row
+    #so the index of a cell is (local_y * CHUNK_SIZE + local_x)
+    self.types = bytearray(CHUNK_SIZE * CHUNK_SIZE)
+    self.variants = bytearray(CHUNK_SIZE * CHUNK_SIZE)
+    #Number of non-empty cells. Empty chunks are dropped.
+    self.count = 0
+    #Value of TileGrid.version when this chunk was last
+    #changed. Caches compare it to know if they're stale.
+    self.version = 0
+
+class TileGrid:
+  def __init__(self):
+    #(chunk_x, chunk_y) -> GridChunk
+    self.chunks = {}
+    #String table of tile types. The index of a type
+    #in this list is its type id.
+    self.type_names = [None]
+    self.type_ids = {}
+    self.count = 0
+    #Incremented on every change in the grid
+    self.version = 0
+    #(type id, variant) -> set of (x, y) of the tiles
+    #of that kind. Used to find tiles by kind without
+    #scanning the whole grid.
+    self.kinds = {}
+    #Type ids that are missing from self.kinds because
+    #their chunks were loaded in bulk. They're indexed
+    #the first time locations() asks for them.
+    self.unindexed = set()
+
+  def __len__(self):
+    return self.count
+
+  def type_id(self, type_name):
+    #Register the type in the string table if it's new
+    if type_name not in self.type_ids:
+      if len(self.type_names) > 255:
+        raise ValueError('Too many tile types in grid: ' + str(type_name))
+      self.type_ids[type_name] = len(self.type_names)
+      self.type_names.append(type_name)
+    return self.type_ids[type_name]
+
+  def clear(self):
+    self.chunks = {}
+    self.count = 0
+    self.kinds = {}
+    self.unindexed = set()
+    self.version += 1
+
+  #Get the type id of a cell. Returns EMPTY(0) if
+  #there's no tile in the cell. This is the fast path
+  #used by collision and rendering.
+  def tile_id(self, x, y):
+    chunk = self.chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+    if chunk is None:
+      return EMPTY
+    return chunk.types[((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)]
+
+  def variant(self, x, y):
+    chunk = self.chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+    if chunk is None:
+      return 0
+    return chunk.variants[((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)]
+
+  #Returns a (type, variant) pair or None if the cell is empty
+  def get(self, x, y):
+    chunk = self.chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+    if chunk is None:
+      return None
+    index = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+    type_id = chunk.types[index]
+    if type_id == EMPTY:
+      return None
+    return (self.type_names[type_id], chunk.variants[index])
+
+  def set(self, x, y, type_name, variant):
+    type_id = self.type_id(type_name)
+    if not 0 <= variant <= 255:
+      raise ValueError('Tile variant out of range: ' + str(variant))
+
+    key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+    chunk = self.chunks.get(key)
+    if chunk is None:
+      chunk = GridChunk()
+      self.chunks[key] = chunk
+
+    index = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+    #Nothing changed. Don't touch the version so caches
+    #built from this chunk stay valid.
+    if chunk.types[index] == type_id and chunk.variants[index] == variant:
+      return
+    if chunk.types[index] == EMPTY:
+      chunk.count += 1
+      self.count += 1
+    elif chunk.types[index] not in self.unindexed:
+      self.kinds[(chunk.types[index], chunk.variants[index])].discard((x, y))
+    if type_id not in self.unindexed:
+      self.kinds.setdefault((type_id, variant), set()).add((x, y))
+    chunk.types[index] = type_id
+    chunk.variants[index] = variant
+    self.version += 1
+    chunk.version = self.version
+
+  #Remove a tile. Returns True if there was a tile
+  #in the cell.
+  def remove(self, x, y):
+    key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+    chunk = self.chunks.get(key)
+    if chunk is None:
+      return False
+
+    index = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+    if chunk.types[index] == EMPTY:
+      return False
+    if chunk.types[index] not in self.unindexed:
+      self.kinds[(chunk.types[index], chunk.variants[index])].discard((x, y))
+    chunk.types[index] = EMPTY
+    chunk.variants[index] = 0
+    chunk.count -= 1
+    self.count -= 1
+    self.version += 1
+    chunk.version = self.version
+    if not chunk.count:
+      del self.chunks[key]
+    return True
+
+  #Copy a whole chunk into the grid. types and variants are
+  #CHUNK_SIZE * CHUNK_SIZE bytes. type_names maps the type
+  #numbers in types to names, 0 is an empty cell and 1 is
+  #type_names[0].
+  def load_chunk(self, chunk_x, chunk_y, type_names, types, variants):
+    #Map the type numbers to the type ids of this grid
+    #with a single translate() call
+    table = bytearray(range(256))
+    for number, type_name in enumerate(type_names, 1):
+      table[number] = self.type_id(type_name)
+      self.unindexed.add(table[number])
+
+    chunk = GridChunk()
+    chunk.types = bytearray(types).translate(table)
+    chunk.variants = bytearray(variants)
+    chunk.count = CHUNK_SIZE * CHUNK_SIZE - chunk.types.count(EMPTY)
+
+    old_chunk = self.chunks.pop((chunk_x, chunk_y), None)
+    if old_chunk is not None:
+      self.count -= old_chunk.count
+      #The kinds index can't tell which tiles were in the
+      #old chunk without scanning it so rebuild it later.
+      self.unindexed.update(self.type_ids.values())
+      self.kinds = {}
+    if chunk.count:
+      self.chunks[(chunk_x, chunk_y)] = chunk
+      self.count += chunk.count
+    self.version += 1
+    chunk.version = self.version
+
+  #Remove a whole chunk from the grid
+  def drop_chunk(self, chunk_x, chunk_y):
+    chunk = self.chunks.pop((chunk_x, chunk_y), None)
+    if chunk is None:
+      return
+    self.count -= chunk.count
+    #Index the types of the chunk again the next time
+    #they're needed
+    for type_id in set(chunk.types):
+      if type_id != EMPTY:
+        self.unindexed.add(type_id)
+    self.version += 1
+
+  #Add the tiles of a type to the kinds index by searching
+  #the type id in the chunk bytes
+  def index_type(self, type_id):
+    #Drop what's left from before the type was unindexed
+    for kind in [kind for kind in self.kinds if kind[0] == type_id]:
+      del self.kinds[kind]
+
+    needle = bytes([type_id])
+    for (cx, cy), chunk in self.chunks.items():
+      index = chunk.types.find(needle)
+      while index != -1:
+        self.kinds.setdefault((type_id, chunk.variants[index]), set()).add((
+          (cx << CHUNK_SHIFT) | (index & CHUNK_MASK),
+          (cy << CHUNK_SHIFT) | (index >> CHUNK_SHIFT)
+        ))
+        index = chunk.types.find(needle, index + 1)
+    self.unindexed.discard(type_id)
+
+  #Grid coordinates of every tile with the given type
+  #and variant
+  def locations(self, type_name, variant):
+    type_id = self.type_ids.get(type_name)
+    if type_id is None:
+      return set()
+    if type_id in self.unindexed:
+      self.index_type(type_id)
+    return self.kinds.get((type_id, variant), set())
+
+  #Yields (x, y, type, variant) of every tile in the grid
+  def items(self):
+    for (cx, cy), chunk in list(self.chunks.items()):
+      types = chunk.types
+      for index in range(CHUNK_SIZE * CHUNK_SIZE):
+        if types[index] != EMPTY:
+          yield (
+            (cx << CHUNK_SHIFT) | (index & CHUNK_MASK),
+            (cy << CHUNK_SHIFT) | (index >> CHUNK_SHIFT),
+            self.type_names[types[index]],
+            chunk.variants[index]
+          )
+
+#Solid cells of a TileGrid. Every chunk gets a copy of its
+#types with one byte per cell, 1 for a solid cell and 0 for
+#anything else, made with a single translate() call. Rows of
+#cells can then be searched with find() instead of looking
+#at one cell at a time. A copy is made again the first time
+#its chunk is asked about after the chunk changed, so edits
+#and streamed chunks are picked up without telling the mask.
+class SolidMask:
+  def __init__(self, grid, solid_ids):
+    self.grid = grid
+    #Type id -> 1 if the type is solid. 256 bytes, used as the
+    #translate() table.
+    self.solid_ids = solid_ids
+    #(chunk_x, chunk_y) -> (chunk, chunk version, cells)
+    self.masks = {}
+
+  def clear(self):
+    self.masks = {}
+
+  #Solid bytes of a chunk. None if the chunk is empty.
+  def chunk_cells(self, chunk_x, chunk_y):
+    key = (chunk_x, chunk_y)
+    chunk = self.grid.chunks.get(key)
+    if chunk is None:
+      self.masks.pop(key, None)
+      return None
+    entry = self.masks.get(key)
+    if entry is None or entry[0] is not chunk or entry[1] != chunk.version:
+      entry = (chunk, chunk.version, chunk.types.translate(self.solid_ids))
+      self.masks[key] = entry
+    return entry[2]
+
+  #True if the cell x, y is solid
+  def solid(self, x, y):
+    cells = self.chunk_cells(x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+    return cells is not None and cells[((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)] == 1
+
+  #True if any cell from left to right and from top to bottom
+  #is solid. The bounds are cells and they're included.
+  def any_solid(self, left, top, right, bottom):
+    chunk_x = left >> CHUNK_SHIFT
+    chunk_y = top >> CHUNK_SHIFT
+    #Small rects are mostly inside one chunk. Check its rows
+    #without the loops over chunks.
+    if right >> CHUNK_SHIFT == chunk_x and bottom >> CHUNK_SHIFT == chunk_y:
+      cells = self.chunk_cells(chunk_x, chunk_y)
+      if cells is None:
+        return False
+      start = left & CHUNK_MASK
+      end = (right & CHUNK_MASK) + 1
+      for row in range((top & CHUNK_MASK) << CHUNK_SHIFT, ((bottom & CHUNK_MASK) + 1) << CHUNK_SHIFT, CHUNK_SIZE):
+        if cells.find(1, row + start, row + end) != -1:
+          return True
+      return False
+    for chunk_y in range(top >> CHUNK_SHIFT, (bottom >> CHUNK_SHIFT) + 1):
+      base_y = chunk_y << CHUNK_SHIFT
+      first_row = max(top, base_y) - base_y
+      last_row = min(bottom, base_y + CHUNK_MASK) - base_y
+      for chunk_x in range(left >> CHUNK_SHIFT, (right >> CHUNK_SHIFT) + 1):
+        cells = self.chunk_cells(chunk_x, chunk_y)
+        if cells is None:
+          continue
+        base_x = chunk_x << CHUNK_SHIFT
+        start = max(left, base_x) - base_x
+        end = min(right, base_x + CHUNK_MASK) - base_x + 1
+        for row in range(first_row << CHUNK_SHIFT, (last_row + 1) << CHUNK_SHIFT, CHUNK_SIZE):
+          if cells.find(1, row + start, row + end) != -1:
+            return True
+    return False
+
+  #x of the first solid cell in row y going from start_x to
+  #end_x, either way. Both are included. None if there's no
+  #solid cell.
+  def first_solid_x(self, y, start_x, end_x):
+    row = (y & CHUNK_MASK) << CHUNK_SHIFT
+    chunk_y = y >> CHUNK_SHIFT
+    if start_x <= end_x:
+      for chunk_x in range(start_x >> CHUNK_SHIFT, (end_x >> CHUNK_SHIFT) + 1):
+        cells = self.chunk_cells(chunk_x, chunk_y)
+        if cells is None:
+          continue
+        base_x = chunk_x << CHUNK_SHIFT
+        index = cells.find(
+          1,
+          row + max(start_x, base_x) - base_x,
+          row + min(end_x, base_x + CHUNK_MASK) - base_x + 1
+        )
+        if index != -1:
+          return base_x + index - row
+    else:
+      for chunk_x in range(start_x >> CHUNK_SHIFT, (end_x >> CHUNK_SHIFT) - 1, -1):
+        cells = self.chunk_cells(chunk_x, chunk_y)
+        if cells is None:
+          continue
+        base_x = chunk_x << CHUNK_SHIFT
+        index = cells.rfind(
+          1,
+          row + max(end_x, base_x) - base_x,
+          row + min(start_x, base_x + CHUNK_MASK) - base_x + 1
+        )
+        if index != -1:
+          return base_x + index - row
+    return None
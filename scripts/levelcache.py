@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.constants import level_assets
+from scripts.editor.saveload import SaveLoad
+from scripts.factory import Factory
+from scripts.tilemap import Tilemap
+
+#Prepares levels on a worker thread so the game can swap
+#in a ready level instead of loading it on the frame it's
+#needed. Parsed level files are kept in memory so loading
+#the same level again doesn't read the file.
+class LevelCache:
+  def __init__(self, game, streaming=False, max_files=2, max_pending=2):
+    self.game = game
+    self.streaming = streaming
+    self.saveload = SaveLoad()
+    self.factory = Factory()
+    #One worker so levels are prepared one at a time
+    #and the game thread keeps most of the CPU
+    self.executor = ThreadPoolExecutor(max_workers=1)
+    #path -> Future of a prepared level. Only the level being
+    #played and the next one are kept, see prefetch().
+    self.pending = OrderedDict()
+    self.max_pending = max_pending
+    #path -> parsed level file. Only the latest max_files
+    #levels are kept.
+    self.files = OrderedDict()
+    self.max_files = max_files
+
+  def load_file(self, path):
+    map_data = self.files.get(path)
+    if map_data is None:
+      map_data = self.saveload.load(path)
+      self.files[path] = map_data
+    self.files.move_to_end(path)
+    while len(self.files) > self.max_files:
+      self.files.popitem(last=False)
+    return map_data
+
+  #Runs on the worker thread. Does everything
+  #Game.load_level() needs except touching the game
+  #state.
+  def prepare(self, path):
+    tilemap = Tilemap(self.game, tile_size=16)
+    try:
+      if self.streaming and self.saveload.binary_path(path) is not None:
+        tilemap.load_map(path, streaming=True)
+      else:
+        #Chunk surfaces are made on the game thread. The chunks
+        #the camera sees first are baked by Game.load_level().
+        tilemap.load_data(self.load_file(path), warm=False)
+    except FileNotFoundError:
+      print("No map found.")
+
+    #Extract tree tile in 'large_decor' tile set on the screen
+    leaf_spawners = self.factory.create_leaf_spawner(tilemap.extract([('large_decor', 2)], True))
+    #We just want to get the spawner here. Thus, keep should be false
+    #so that it won't be added in the tile list.
+    player_pos, enemies = self.factory.create_enemies(
+      self.game,
+      tilemap.extract([('spawner', 0), ('spawner', 1)])
+    )
+
+    #Load the assets of the level on the asset worker
+    tile_types = set(tilemap.grid.type_names[1:])
+    tile_types.update(type for type, variant in tilemap.offgrid_kinds)
+    if tilemap.stream is not None:
+      tile_types.update(tilemap.stream.level['types'])
+    self.game.asset_manager.preload(level_assets(
+      tile_types,
+      player=player_pos is not None,
+      enemies=len(enemies) > 0,
+      trees=len(leaf_spawners) > 0
+    ))
+
+    return {
+      'tilemap': tilemap,
+      'leaf_spawners': leaf_spawners,
+      'player_pos': player_pos,
+      'enemies': enemies
+    }
+
+  #Start preparing a level in the background. Does
+  #nothing if the level is already being prepared. The
+  #oldest prepared levels are dropped past max_pending.
+  def prefetch(self, path):
+    if path not in self.pending:
+      self.pending[path] = self.executor.submit(self.prepare, path)
+    self.pending.move_to_end(path)
+    while len(self.pending) > self.max_pending:
+      self.drop(next(iter(self.pending)))
+
+  #Forget a prefetched level. A level that is still waiting
+  #for the worker is cancelled. Otherwise its stream is
+  #closed once it's prepared.
+  def drop(self, path):
+    future = self.pending.pop(path, None)
+    if future is not None and not future.cancel():
+      future.add_done_callback(close_level)
+
+  #Check if a prefetched level is prepared
+  def ready(self, path):
+    return path in self.pending and self.pending[path].done()
+
+  #Get a prepared level. Waits for the worker if the level
+  #isn't ready yet and prepares it now if it wasn't
+  #prefetched. A prepared level can only be taken once.
+  #Every other prefetched level is dropped, they were
+  #prepared for the level being left.
+  def take(self, path):
+    self.prefetch(path)
+    future = self.pending.pop(path)
+    for other in list(self.pending):
+      self.drop(other)
+    return future.result()
+
+#Close the stream of a prepared level that won't be played
+def close_level(future):
+  if future.exception() is None:
+    future.result()['tilemap'].close_stream()
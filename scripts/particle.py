@@ -1,26 +1,145 @@
-class Particle:
-    def __init__(self, game, type, pos, velocity=[0, 0], frame=0):
-        self.game = game
-        self.type = type
-        self.pos = list(pos)
-        self.velocity = list(velocity)
-        self.animation = self.game.animations['particle/' + type].shallow_copy()
-        self.animation.frame = frame
-    
+import math
+
+import pygame
+
+PARTICLE_TYPES = ['leaf', 'dash']
+
+#All particles are stored in one set of parallel lists
+#(one list per attribute) instead of one object per
+#particle. A particle moves in a straight line with a fixed
+#velocity and its animation plays at a fixed rate, so where
+#it is and which image it shows can be computed from the
+#number of updates since it was spawned. update() only
+#counts the updates and removes the particles whose
+#animation completed. Positions are computed when the
+#particles are drawn with one fblits() call.
+class Particles:
+    def __init__(self, animations):
+        #Per particle type, indexed by type number
+        self.type_numbers = {}
+        #The image of every animation frame. Animation.image()
+        #divides the frame by frame_duration, this list does
+        #it ahead of time. The last image is repeated a few
+        #times so a particle on its last frame doesn't need a
+        #min() when it's drawn.
+        self.frame_images = []
+        #Last frame of the animation. Particle animations
+        #don't loop and the particle dies on its last frame.
+        self.last_frames = []
+        #Sum of the swings of a leaf before every frame. Leaves
+        #swing left and right while falling. The other types
+        #get zeros.
+        self.sways = []
+        for type in PARTICLE_TYPES:
+            animation = animations['particle/' + type]
+            last_frame = animation.frame_duration * len(animation.images) - 1
+            #The images are shared with the animations. The
+            #copies are RLE encoded which makes drawing colorkey
+            #images faster.
+            images = []
+            for image in animation.images:
+                image = image.copy()
+                image.set_colorkey(image.get_colorkey(), pygame.RLEACCEL)
+                images.append(image)
+            self.type_numbers[type] = len(self.frame_images)
+            self.frame_images.append(
+              [images[int(min(frame, last_frame) / animation.frame_duration)] for frame in range(last_frame + 4)]
+            )
+            self.last_frames.append(last_frame)
+            sways = [0]
+            for frame in range(last_frame + 3):
+                #We use math.sin() to control the swinging effect of leaves.
+                #We use the frame * 0.15 as radian(angle)
+                #For example, the product is 0.785 radians which is 45 degrees.
+                #If we compute the sin with the product, the result is ~0.7
+                #If the degree is like 200, the result is going to be ~(-0.34)
+                #As you can see, the result can be positive or negative depends
+                #on the input angle.
+                sways.append(sways[-1] + (math.sin(min(frame, last_frame) * 0.15) if type == 'leaf' else 0))
+            self.sways.append(sways)
+        self.clear()
+
+    def __len__(self):
+        return len(self.deaths)
+
+    def clear(self):
+        #Number of updates since the particles were cleared
+        self.clock = 0
+        #Position at clock 0 if the particle had always moved
+        #with its velocity, minus the swing before its first
+        #frame. The position at a clock is
+        #(x + velocity_x * clock + sways[frame]).
+        self.xs = []
+        self.ys = []
+        self.velocity_xs = []
+        self.velocity_ys = []
+        #Frame of the particle at clock 0. The frame at a clock
+        #is (frame + clock).
+        self.frames = []
+        #frame_images and sways of the type of the particle
+        self.images = []
+        self.type_sways = []
+        #Clock of the update that removes the particle
+        self.deaths = []
+
+    def spawn(self, type, pos, velocity=(0, 0), frame=0):
+        type = self.type_numbers[type]
+        clock = self.clock
+        sways = self.sways[type]
+        #A leaf swings after it's drawn, the first swing is seen
+        #after its second update. Particles are drawn after their
+        #first update, so the swing before it is left out.
+        self.xs.append(pos[0] - velocity[0] * clock - sways[frame + 1])
+        self.ys.append(pos[1] - velocity[1] * clock)
+        self.velocity_xs.append(velocity[0])
+        self.velocity_ys.append(velocity[1])
+        self.frames.append(frame - clock)
+        self.images.append(self.frame_images[type])
+        self.type_sways.append(sways)
+        #The animation completes on update (last frame - frame).
+        #The particle is drawn one more update and removed on
+        #the next. It's drawn at least twice.
+        self.deaths.append(clock + max(2, self.last_frames[type] - frame + 1) + 1)
+
     def update(self):
-        kill = False
-        if self.animation.complete:
-            kill = True
-        
-        self.pos[0] += self.velocity[0]
-        self.pos[1] += self.velocity[1]
-        
-        self.animation.update()
-        
-        return kill
-    
+        self.clock += 1
+        clock = self.clock
+        deaths = self.deaths
+
+        #Remove the particles that completed their animation by
+        #moving the last particle into their place. The lists
+        #keep their size instead of being made again.
+        removed = []
+        index = -1
+        while True:
+            try:
+                index = deaths.index(clock, index + 1)
+            except ValueError:
+                break
+            removed.append(index)
+        if removed:
+            columns = (
+              self.xs, self.ys, self.velocity_xs, self.velocity_ys,
+              self.frames, self.images, self.type_sways, deaths
+            )
+            #From the last one so the particle moved into a place
+            #is never one that is removed
+            for index in reversed(removed):
+                for column in columns:
+                    column[index] = column[-1]
+                    column.pop()
+
     def render(self, surf, offset=(0, 0)):
-        img = self.animation.image()
-        #Position
-        surf.blit(img, (int(self.pos[0] - offset[0]), int(self.pos[1] - offset[1])))
-    
\ No newline at end of file
+        clock = self.clock
+        offset_x, offset_y = offset
+        #fblits() rounds float positions toward zero like int()
+        #does, calling int() twice per particle is left out
+        surf.fblits([
+          (
+            images[frame + clock],
+            (x + velocity_x * clock + sways[frame + clock] - offset_x, y + velocity_y * clock - offset_y)
+          )
+          for x, y, velocity_x, velocity_y, frame, images, sways in zip(
+            self.xs, self.ys, self.velocity_xs, self.velocity_ys, self.frames, self.images, self.type_sways
+          )
+        ])
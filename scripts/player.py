@@ -3,7 +3,6 @@ import math
 import random
 
 from scripts.entities import PhysicsEntity
-from scripts.particle import Particle
 
 
 class Player(PhysicsEntity):
@@ -16,9 +15,9 @@ class Player(PhysicsEntity):
 
     self.prev_movement = [0, 0]
 
-  def render(self, surf, non_silhouette, offset):
+  def render(self, surf, non_silhouette, offset, alpha=1):
     if abs(self.dashing) <= 50:
-      super().render(surf, offset, non_silhouette)
+      super().render(surf, offset, non_silhouette, alpha)
 
 
   def update(self, tilemap, movement):
@@ -86,9 +85,7 @@ class Player(PhysicsEntity):
         #visual effect may change.
         #We use this in order to distribute particles in circular shape.
         p_velocity = [math.cos(angle) * speed, math.sin(angle) * speed]
-        self.game.particles.append(
-          Particle(self.game, 'dash', self.rect().center, p_velocity, random.randint(0, 5))
-        )
+        self.game.particles.spawn('dash', self.rect().center, p_velocity, random.randint(0, 5))
 
     #Right Dash
     if self.dashing > 0:
@@ -111,9 +108,7 @@ class Player(PhysicsEntity):
       #For example, if the normalized value is a positive value like 0.5 
       #then the player is moving to the right.
       p_velocity = [(abs(self.dashing) / self.dashing) * random.random() * 3, 0]
-      self.game.particles.append(
-        Particle(self.game, 'dash', self.rect().center, p_velocity, random.randint(0, 5))
-      )
+      self.game.particles.spawn('dash', self.rect().center, p_velocity, random.randint(0, 5))
 
     #This acts like a horizontal friction. We do this to
     #reduce horizontal movement especially when player
@@ -0,0 +1,122 @@
+import csv
+import json
+import time
+from collections import deque
+
+import pygame
+
+#Measures how long each part of a frame takes. Parts are
+#named scopes timed with begin() and end(). A scope can be
+#timed more than once per frame, e.g. in every logic step
+#and when drawing, and the times are added up. end_frame()
+#stores the times of the frame.
+#
+#When the profiler is disabled, begin() and end() only
+#check a flag.
+class FrameProfiler:
+  def __init__(self, window=120, history=3600):
+    self.enabled = False
+    #enabled is switched at the end of a frame so a scope
+    #is never ended without being started
+    self.toggle_pending = False
+    #Number of frames used for the percentiles on the overlay
+    self.window = window
+    #Times of the last 'history' frames. Each frame is a dict
+    #of scope name -> milliseconds.
+    self.frames = deque(maxlen=history)
+    #Scope names in the order they were first timed
+    self.scopes = []
+    self.starts = {}
+    self.current = {}
+    self.font = None
+    #Surface with the text of the overlay
+    self.overlay = None
+
+  def toggle(self):
+    self.toggle_pending = True
+
+  def begin(self, name):
+    if self.enabled:
+      self.starts[name] = time.perf_counter()
+
+  def end(self, name):
+    if self.enabled:
+      elapsed = (time.perf_counter() - self.starts[name]) * 1000
+      if name not in self.current:
+        if name not in self.scopes:
+          self.scopes.append(name)
+        self.current[name] = elapsed
+      else:
+        self.current[name] += elapsed
+
+  def end_frame(self):
+    if self.enabled:
+      self.frames.append(self.current)
+      self.current = {}
+    if self.toggle_pending:
+      self.toggle_pending = False
+      self.enabled = not self.enabled
+      self.starts.clear()
+      self.current = {}
+      self.overlay = None
+
+  #Returns scope name -> (p50, p99) in milliseconds over the
+  #last 'window' frames. Frames a scope wasn't timed in count
+  #as 0 ms.
+  def percentiles(self):
+    frames = list(self.frames)[-self.window:]
+    result = {}
+    for name in self.scopes:
+      times = sorted(frame.get(name, 0) for frame in frames)
+      if times:
+        result[name] = (
+          times[int((len(times) - 1) * 0.5)],
+          times[int((len(times) - 1) * 0.99)]
+        )
+    return result
+
+  #Draw the percentiles of every scope on the top-left
+  #corner of a surface. The text is drawn again every
+  #'refresh' frames only.
+  def render(self, surf, refresh=30):
+    if not self.enabled:
+      return
+    if self.overlay is None or len(self.frames) % refresh == 0:
+      self.overlay = self.draw_overlay()
+    surf.blit(self.overlay, (0, 0))
+
+  def draw_overlay(self):
+    if self.font is None:
+      self.font = pygame.font.Font(None, 18)
+
+    rows = [('scope', 'p50 ms', 'p99 ms')]
+    for name, (p50, p99) in self.percentiles().items():
+      rows.append((name, f'{p50:.2f}', f'{p99:.2f}'))
+
+    line_height = self.font.get_linesize()
+    #x of the columns
+    columns = [4, 100, 150]
+    overlay = pygame.Surface((200, line_height * len(rows) + 4), pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, 160))
+    for i, row in enumerate(rows):
+      for x, text in zip(columns, row):
+        overlay.blit(self.font.render(text, True, (255, 255, 255)), (x, 2 + i * line_height))
+    return overlay
+
+  #One row per frame, one column per scope
+  def dump_csv(self, path):
+    f = open(path, 'w', newline='')
+    writer = csv.writer(f)
+    writer.writerow(['frame'] + self.scopes)
+    for i, frame in enumerate(self.frames):
+      writer.writerow([i] + [round(frame.get(name, 0), 4) for name in self.scopes])
+    f.close()
+
+  def dump_json(self, path):
+    f = open(path, 'w')
+    json.dump({
+      'scopes': self.scopes,
+      'percentiles': {name: {'p50': p50, 'p99': p99} for name, (p50, p99) in self.percentiles().items()},
+      'frames': list(self.frames)
+    }, f)
+    f.close()
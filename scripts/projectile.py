@@ -0,0 +1,147 @@
+#Height in pixels of the rows projectiles are sorted into.
+#Projectiles fly straight to the left or right so they stay
+#in the row they were fired in.
+ROW_SIZE = 16
+
+class Projectile:
+  #Projectiles are created and dropped all the time. __slots__
+  #makes them smaller and faster to access than objects with
+  #a __dict__.
+  __slots__ = ('pos', 'direction', 'timer', 'flying', 'column', 'column_version', 'in_solid')
+
+  def __init__(self):
+    #[x, y] in pixels
+    self.pos = [0, 0]
+    #Pixels per frame. Negative values move to the left.
+    self.direction = 0
+    #Frames since the projectile was fired
+    self.timer = 0
+    #False once released. Released projectiles stay in
+    #Projectiles.active until it's compacted.
+    self.flying = False
+    #Column of tiles the projectile was last checked in, the
+    #version of the grid then and if its tile was solid. See
+    #Projectiles.in_wall().
+    self.column = None
+    self.column_version = None
+    self.in_solid = False
+
+#Pool of projectiles. Projectiles are taken from the pool
+#with acquire() and given back with release() so the same
+#objects are reused instead of creating new ones on every
+#shot.
+class Projectiles:
+  def __init__(self, image):
+    self.image = image
+    #Projectiles that are flying, in the order they were
+    #fired. May hold released projectiles, see compact().
+    self.active = []
+    #Released projectiles that can be reused
+    self.free = []
+    #Released projectiles still in self.active
+    self.released = []
+    #Flying projectiles by row. See inside()
+    #row -> {projectile: None}
+    self.rows = {}
+
+  def __len__(self):
+    return len(self.active) - len(self.released)
+
+  def __iter__(self):
+    self.compact()
+    return iter(self.active)
+
+  #Drop the released projectiles from self.active in one pass
+  #and keep the order of the others. Removing them one by one
+  #would search the list on every release.
+  def compact(self):
+    if self.released:
+      self.active = [projectile for projectile in self.active if projectile.flying]
+      self.free.extend(self.released)
+      self.released.clear()
+
+  def acquire(self, pos, direction):
+    self.compact()
+    projectile = self.free.pop() if self.free else Projectile()
+    projectile.flying = True
+    projectile.pos[0] = pos[0]
+    projectile.pos[1] = pos[1]
+    projectile.direction = direction
+    projectile.timer = 0
+    projectile.column = None
+    self.active.append(projectile)
+    self.rows.setdefault(int(projectile.pos[1]) // ROW_SIZE, {})[projectile] = None
+    return projectile
+
+  def release(self, projectile):
+    projectile.flying = False
+    self.released.append(projectile)
+    row_index = int(projectile.pos[1]) // ROW_SIZE
+    row = self.rows[row_index]
+    del row[projectile]
+    if not row:
+      del self.rows[row_index]
+
+  def clear(self):
+    for projectile in self.active:
+      projectile.flying = False
+    self.free.extend(self.active)
+    self.active.clear()
+    self.released.clear()
+    self.rows.clear()
+
+  #Projectiles inside any of rects, like
+  #pygame.Rect.collidepoint(). Only the projectiles in the rows
+  #the rects cover are checked instead of all of them.
+  def inside(self, rects):
+    found = set()
+    rows = self.rows
+    for rect in rects:
+      #Truncated like collidepoint() truncates the position
+      for row_index in range(rect.top // ROW_SIZE, (rect.bottom - 1) // ROW_SIZE + 1):
+        for projectile in rows.get(row_index, ()):
+          if rect.collidepoint(projectile.pos):
+            found.add(projectile)
+    return found
+
+  #True if the projectile is in a solid tile, like
+  #tilemap.solid_tile(projectile.pos). A projectile flies
+  #along one row of tiles and crosses a tile in several
+  #frames, so its tile is only looked up again when it enters
+  #a new column or the grid changed.
+  def in_wall(self, projectile, tilemap):
+    column = projectile.pos[0] // tilemap.tile_size
+    if column != projectile.column or projectile.column_version != tilemap.grid.version:
+      projectile.column = column
+      projectile.column_version = tilemap.grid.version
+      projectile.in_solid = tilemap.solid_tile(projectile.pos)
+    return projectile.in_solid
+
+  def update(self):
+    self.compact()
+    for projectile in self.active:
+      projectile.pos[0] += projectile.direction
+      projectile.timer += 1
+
+  #alpha is how far the drawn frame is between the last
+  #update(0) and the current one(1)
+  def render(self, surf, offset=(0, 0), alpha=1):
+    image = self.image
+    half_width = image.get_width() * 0.5
+    half_height = image.get_height() * 0.5
+    offset_x, offset_y = offset
+    back = 1 - alpha
+    blit_sequence = []
+    self.compact()
+    for projectile in self.active:
+      x = projectile.pos[0]
+      #Projectiles that didn't move yet are drawn where
+      #they were fired
+      if projectile.timer:
+        x -= projectile.direction * back
+      #Draw the projectiles centered on their position
+      blit_sequence.append((
+        image,
+        (int(x - half_width) - offset_x, int(projectile.pos[1] - half_height) - offset_y)
+      ))
+    surf.fblits(blit_sequence)
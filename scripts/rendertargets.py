@@ -0,0 +1,59 @@
+import pygame
+
+#Surfaces a frame is drawn into before it's put on the
+#screen. They're made once so drawing a frame doesn't make
+#any new surface.
+class RenderTargets:
+  def __init__(self, screen, size=(320, 240)):
+    self.screen = screen
+    #pygame.SRCALPHA adds a tranparency channel to our
+    #surface
+    self.display = pygame.Surface(size, pygame.SRCALPHA)
+    self.non_silhouette = pygame.Surface(size)
+    #Drawn over by create_outline() every frame
+    self.silhouette = pygame.Surface(size, pygame.SRCALPHA)
+    #Circle wipe between levels. The circle is drawn in white
+    #and white is transparent so the level shows through it.
+    self.transition = pygame.Surface(size)
+    self.transition.set_colorkey((255, 255, 255))
+    #non_silhouette scaled to the screen. pygame can only
+    #scale into a surface of the same format.
+    self.scaled = pygame.Surface(screen.get_size(), 0, self.non_silhouette)
+    #Last image passed to background() and that image scaled
+    #to the screen
+    self.background_image = None
+    self.scaled_background = None
+
+  #Returns image scaled to the screen size. The image is only
+  #scaled again if a different image is passed.
+  def background(self, image):
+    if image is not self.background_image:
+      self.background_image = image
+      self.scaled_background = pygame.transform.scale(image, self.screen.get_size())
+    return self.scaled_background
+
+  #Returns the transition surface filled with black
+  def clear_transition(self):
+    self.transition.fill((0, 0, 0))
+    return self.transition
+
+  #Draw non_silhouette scaled to the screen
+  def present(self, offset=(0, 0)):
+    pygame.transform.scale(self.non_silhouette, self.screen.get_size(), self.scaled)
+    self.screen.blit(self.scaled, offset)
+
+  #Draw parts of non_silhouette scaled to the screen. Returns
+  #the rects of the screen that were drawn. The screen must
+  #be a whole multiple of the size of non_silhouette. Only the
+  #parts are scaled, each into its place in self.scaled.
+  #Subsurfaces share the pixels of their surface, making them
+  #copies nothing.
+  def present_rects(self, rects, offset=(0, 0)):
+    scale_x = self.screen.get_width() // self.non_silhouette.get_width()
+    scale_y = self.screen.get_height() // self.non_silhouette.get_height()
+    screen_rects = []
+    for rect in rects:
+      area = pygame.Rect(rect.x * scale_x, rect.y * scale_y, rect.width * scale_x, rect.height * scale_y)
+      pygame.transform.scale(self.non_silhouette.subsurface(rect), area.size, self.scaled.subsurface(area))
+      screen_rects.append(self.screen.blit(self.scaled, (area.x + offset[0], area.y + offset[1]), area))
+    return screen_rects
@@ -0,0 +1,127 @@
+import struct
+import zlib
+
+import pygame
+
+#Input trace file. All numbers are little-endian.
+#
+#header: magic, format version, random seed, level,
+#        number of steps, checksum of the game state after
+#        the last step
+#inputs: zlib compressed, one byte of INPUT_* flags per step
+TRACE_MAGIC = b'NJRP'
+TRACE_VERSION = 1
+TRACE_HEADER = struct.Struct('<4sHqIII')
+
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_JUMP = 4
+INPUT_DASH = 8
+
+#Checksum of the game state that a replay must end in
+def state_checksum(game):
+  state = (
+    game.level,
+    game.dead,
+    tuple(game.player.pos),
+    tuple(tuple(enemy.pos) for enemy in game.enemy_spawner)
+  )
+  return zlib.crc32(repr(state).encode('utf-8'))
+
+def load_trace(path):
+  f = open(path, 'rb')
+  data = f.read()
+  f.close()
+
+  magic, version, seed, level, steps, checksum = TRACE_HEADER.unpack_from(data, 0)
+  if magic != TRACE_MAGIC:
+    raise ValueError('Not an input trace: ' + path)
+  if version != TRACE_VERSION:
+    raise ValueError('Unsupported input trace version: ' + str(version))
+  inputs = zlib.decompress(data[TRACE_HEADER.size:])
+  if len(inputs) != steps:
+    raise ValueError('Input trace is truncated: ' + path)
+
+  return {
+    'seed': seed,
+    'level': level,
+    'inputs': inputs,
+    'checksum': checksum
+  }
+
+#Records the input state of every step of a game.
+#Game.step() calls record() when Game.recorder is set.
+class InputRecorder:
+  def __init__(self, path, seed, level):
+    self.path = path
+    self.seed = seed
+    self.level = level
+    self.inputs = bytearray()
+
+  def record(self, movement, jump, dash):
+    self.inputs.append(
+      (INPUT_LEFT if movement[0] else 0) |
+      (INPUT_RIGHT if movement[1] else 0) |
+      (INPUT_JUMP if jump else 0) |
+      (INPUT_DASH if dash else 0)
+    )
+
+  #Save the trace. game is the recorded game, its state is
+  #saved to check replays against.
+  def save(self, game):
+    f = open(self.path, 'wb')
+    f.write(TRACE_HEADER.pack(
+      TRACE_MAGIC,
+      TRACE_VERSION,
+      self.seed,
+      self.level,
+      len(self.inputs),
+      state_checksum(game)
+    ))
+    f.write(zlib.compress(bytes(self.inputs), 9))
+    f.close()
+
+#Feeds a recorded trace back to a game as key events.
+#The game must be created with the seed and level of
+#the trace.
+class Replay:
+  def __init__(self, trace):
+    self.trace = trace
+    self.index = 0
+
+  def done(self):
+    return self.index >= len(self.trace['inputs'])
+
+  #Key events that turn the current movement of the game
+  #into the recorded input state of the next step
+  def next_events(self, movement):
+    flags = self.trace['inputs'][self.index]
+    self.index += 1
+
+    events = []
+    for held, flag, key in [
+      (movement[0], INPUT_LEFT, pygame.K_LEFT),
+      (movement[1], INPUT_RIGHT, pygame.K_RIGHT)
+    ]:
+      if bool(flags & flag) != held:
+        events.append(pygame.event.Event(pygame.KEYDOWN if flags & flag else pygame.KEYUP, key=key))
+    if flags & INPUT_JUMP:
+      events.append(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_UP))
+    if flags & INPUT_DASH:
+      events.append(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+    return events
+
+  #Check if the game is in the state the recorded game
+  #ended in
+  def matches(self, game):
+    return state_checksum(game) == self.trace['checksum']
+
+  #Run the rest of the trace. If render is True, every step
+  #is also drawn. Returns True if the game ended in the
+  #recorded state.
+  def play(self, game, render=False):
+    while not self.done():
+      game.step(self.next_events(game.movement))
+      if render:
+        game.render()
+    return self.matches(game)
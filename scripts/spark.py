@@ -1,54 +1,118 @@
-
 import math
+from itertools import compress
 
 import pygame
 
+#Spark sprites are drawn ahead of time for this many
+#angles in a full circle and for speeds rounded to
+#SPEED_STEP. Sparks lose 0.1 speed per frame so most
+#sparks of a burst share the same sprites.
+ANGLE_STEPS = 64
+SPEED_STEP = 0.1
+
+#All sparks are stored in one set of parallel lists
+#(one list per attribute) and updated in batches. The
+#diamond shape of a spark is drawn once per angle and
+#speed and all sparks are drawn with one fblits() call.
+class Sparks:
+  def __init__(self):
+    #(angle step, speed step) -> (sprite, center of the sprite)
+    self.sprites = {}
+    self.clear()
+
+  def __len__(self):
+    return len(self.xs)
 
-class Spark:
-  def __init__(self, pos, angle, speed):
-    #pos may be a tuple. Convert it to list
-    self.pos = list(pos)
-    self.angle = angle #radians
-    self.speed = speed
+  def clear(self):
+    self.xs = []
+    self.ys = []
+    #cos and sin of the spark angle. The angle doesn't
+    #change so they're computed once.
+    self.directions_x = []
+    self.directions_y = []
+    self.speeds = []
+    self.angle_steps = []
+    #Sparks that stopped. They're drawn one last time
+    #and removed on the next update.
+    self.dead = []
+
+  def spawn(self, pos, angle, speed):
+    self.xs.append(pos[0])
+    self.ys.append(pos[1])
+    self.directions_x.append(math.cos(angle))
+    self.directions_y.append(math.sin(angle))
+    self.speeds.append(speed)
+    self.angle_steps.append(round(angle / (math.pi * 2) * ANGLE_STEPS) % ANGLE_STEPS)
+    self.dead.append(False)
 
   def update(self):
+    #Remove the sparks that stopped on the last frame
+    if True in self.dead:
+      alive = [not dead for dead in self.dead]
+      self.xs = list(compress(self.xs, alive))
+      self.ys = list(compress(self.ys, alive))
+      self.directions_x = list(compress(self.directions_x, alive))
+      self.directions_y = list(compress(self.directions_y, alive))
+      self.speeds = list(compress(self.speeds, alive))
+      self.angle_steps = list(compress(self.angle_steps, alive))
+
     #Convert polar to cartesian. The hypotenuse or length
     #is the 'speed' variable.
-    self.pos[0] += math.cos(self.angle) * self.speed
-    self.pos[1] += math.sin(self.angle) * self.speed
+    self.xs = [x + direction * speed for x, direction, speed in zip(self.xs, self.directions_x, self.speeds)]
+    self.ys = [y + direction * speed for y, direction, speed in zip(self.ys, self.directions_y, self.speeds)]
+
+    self.speeds = [speed - 0.1 if speed > 0.1 else 0 for speed in self.speeds]
+    self.dead = [not speed for speed in self.speeds]
+
+  #Draw the diamond shape of a spark on its own surface
+  def draw_sprite(self, angle_step, speed_step):
+    angle = angle_step / ANGLE_STEPS * math.pi * 2
+    speed = speed_step * SPEED_STEP
+    center = math.ceil(speed * 3) + 1
+    sprite = pygame.Surface((center * 2 + 1, center * 2 + 1), pygame.SRCALPHA)
 
-    self.speed = max(0, self.speed - 0.1)
-    return not self.speed
-  
-  def render(self, surf, offset):
     #Create a diamond shape polygon
     #In my assumption, 0 degree starts from the right due to inverted
     #cartesian.
     vertices = [
-      #Arbitrary number '3' and '0.5' multiplied to speed 
+      #Arbitrary number '3' and '0.5' multiplied to speed
       #is the length of vertex or how far the vertex is from the center of diamond
       #right vertex.
       (
-        self.pos[0] + math.cos(self.angle) * self.speed * 3 - offset[0],
-        self.pos[1] + math.sin(self.angle) * self.speed * 3 - offset[1]
+        center + math.cos(angle) * speed * 3,
+        center + math.sin(angle) * speed * 3
       ),
       #'math.pi * 0.5' is equal to 90 degrees
       #bottom vertex
       (
-        self.pos[0] + math.cos(self.angle + math.pi * 0.5) * self.speed * 0.5 - offset[0],
-        self.pos[1] + math.sin(self.angle + math.pi * 0.5) * self.speed * 0.5 - offset[1]
+        center + math.cos(angle + math.pi * 0.5) * speed * 0.5,
+        center + math.sin(angle + math.pi * 0.5) * speed * 0.5
       ),
       #'math.pi' is equal to 180 degrees
       #left vertex
       (
-        self.pos[0] + math.cos(self.angle + math.pi) * self.speed * 3 - offset[0],
-        self.pos[1] + math.sin(self.angle + math.pi) * self.speed * 3 - offset[1]
+        center + math.cos(angle + math.pi) * speed * 3,
+        center + math.sin(angle + math.pi) * speed * 3
       ),
       #top vertex
       (
-        self.pos[0] + math.cos(self.angle - math.pi * 0.5) * self.speed * 0.5 - offset[0],
-        self.pos[1] + math.sin(self.angle - math.pi * 0.5) * self.speed * 0.5 - offset[1]
+        center + math.cos(angle - math.pi * 0.5) * speed * 0.5,
+        center + math.sin(angle - math.pi * 0.5) * speed * 0.5
       )
     ]
 
-    pygame.draw.polygon(surf, (255, 255, 255), vertices)
+    pygame.draw.polygon(sprite, (255, 255, 255), vertices)
+    return sprite, center
+
+  def render(self, surf, offset):
+    sprites = self.sprites
+    offset_x, offset_y = offset
+    blit_sequence = []
+    for x, y, speed, angle_step in zip(self.xs, self.ys, self.speeds, self.angle_steps):
+      key = (angle_step, round(speed / SPEED_STEP))
+      sprite = sprites.get(key)
+      if sprite is None:
+        sprite = self.draw_sprite(*key)
+        sprites[key] = sprite
+      blit_sequence.append((sprite[0], (round(x - offset_x) - sprite[1], round(y - offset_y) - sprite[1])))
+    surf.fblits(blit_sequence)
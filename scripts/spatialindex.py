@@ -0,0 +1,102 @@
+#Uniform grid of buckets over pixel space. Items are stored
+#in every bucket their rect touches so looking up a point or
+#an area only needs to check the items in a few buckets
+#instead of all of them.
+class SpatialIndex:
+  def __init__(self, bucket_size=64):
+    self.bucket_size = bucket_size
+    #(bucket_x, bucket_y) -> {item id: item}
+    self.buckets = {}
+    #item id -> (insertion order, item, rect)
+    self.entries = {}
+    self.next_order = 0
+
+  def __len__(self):
+    return len(self.entries)
+
+  def clear(self):
+    self.buckets = {}
+    self.entries = {}
+    self.next_order = 0
+
+  def bucket_range(self, rect):
+    size = self.bucket_size
+    #Subtract 1 from the right and bottom edges because
+    #they're exclusive like pygame.Rect
+    return (
+      int(rect[0] // size),
+      int(rect[1] // size),
+      int((rect[0] + max(rect[2], 1) - 1) // size),
+      int((rect[1] + max(rect[3], 1) - 1) // size)
+    )
+
+  #rect is (x, y, width, height) in pixels.
+  #Items don't need to be hashable, they are
+  #stored by identity.
+  def insert(self, item, rect):
+    item_id = id(item)
+    if item_id in self.entries:
+      self.remove(item)
+
+    self.entries[item_id] = (self.next_order, item, tuple(rect))
+    self.next_order += 1
+
+    left, top, right, bottom = self.bucket_range(rect)
+    for bucket_x in range(left, right + 1):
+      for bucket_y in range(top, bottom + 1):
+        bucket = self.buckets.get((bucket_x, bucket_y))
+        if bucket is None:
+          bucket = {}
+          self.buckets[(bucket_x, bucket_y)] = bucket
+        bucket[item_id] = item
+
+  def remove(self, item):
+    entry = self.entries.pop(id(item), None)
+    if entry is None:
+      return False
+
+    left, top, right, bottom = self.bucket_range(entry[2])
+    for bucket_x in range(left, right + 1):
+      for bucket_y in range(top, bottom + 1):
+        bucket = self.buckets.get((bucket_x, bucket_y))
+        if bucket is not None:
+          bucket.pop(id(item), None)
+          if not bucket:
+            del self.buckets[(bucket_x, bucket_y)]
+    return True
+
+  #Items whose rect overlaps the area, in insertion order
+  def query_rect(self, rect):
+    found = {}
+    left, top, right, bottom = self.bucket_range(rect)
+    for bucket_x in range(left, right + 1):
+      for bucket_y in range(top, bottom + 1):
+        bucket = self.buckets.get((bucket_x, bucket_y))
+        if bucket is not None:
+          found.update(bucket)
+
+    matches = []
+    for item_id in found:
+      entry = self.entries[item_id]
+      item_rect = entry[2]
+      if item_rect[0] < rect[0] + rect[2] and rect[0] < item_rect[0] + item_rect[2] \
+        and item_rect[1] < rect[1] + rect[3] and rect[1] < item_rect[1] + item_rect[3]:
+        matches.append(entry)
+    matches.sort(key=lambda entry: entry[0])
+    return [entry[1] for entry in matches]
+
+  #Items whose rect contains the point, in insertion order
+  def query_point(self, pos):
+    bucket = self.buckets.get((int(pos[0] // self.bucket_size), int(pos[1] // self.bucket_size)))
+    if bucket is None:
+      return []
+
+    matches = []
+    for item_id in bucket:
+      entry = self.entries[item_id]
+      item_rect = entry[2]
+      if item_rect[0] <= pos[0] < item_rect[0] + item_rect[2] \
+        and item_rect[1] <= pos[1] < item_rect[1] + item_rect[3]:
+        matches.append(entry)
+    matches.sort(key=lambda entry: entry[0])
+    return [entry[1] for entry in matches]
@@ -1,6 +1,12 @@
+from collections.abc import MutableMapping
+
 import pygame
 
+from scripts.chunkcache import ChunkCache
+from scripts.chunkstream import ChunkStream
 from scripts.editor.saveload import SaveLoad
+from scripts.grid import TileGrid, SolidMask, EMPTY
+from scripts.spatialindex import SpatialIndex
 
 CLOSEST_TILES = [
   (-1, 0), #left
@@ -15,6 +21,54 @@ CLOSEST_TILES = [
 ]
 PHYSICS_TILES = {'grass', 'stone'}
 
+def tile_key(x, y):
+  return str(x) + ',' + str(y)
+
+#Compatibility layer over TileGrid that behaves like the
+#old {'x,y': {'type', 'variant', 'pos'}} dict. Tiles returned
+#by this view are copies, modifying them doesn't change the
+#grid. Use Tilemap.add_tile() or assign the tile back instead.
+class TilemapView(MutableMapping):
+  def __init__(self, grid):
+    self.grid = grid
+
+  def _loc(self, key):
+    try:
+      x, y = key.split(',')
+      return int(x), int(y)
+    except (AttributeError, ValueError):
+      raise KeyError(key)
+
+  def __getitem__(self, key):
+    x, y = self._loc(key)
+    tile = self.grid.get(x, y)
+    if tile is None:
+      raise KeyError(key)
+    return {'type': tile[0], 'variant': tile[1], 'pos': [x, y]}
+
+  def __setitem__(self, key, tile):
+    x, y = self._loc(key)
+    self.grid.set(x, y, tile['type'], tile['variant'])
+
+  def __delitem__(self, key):
+    x, y = self._loc(key)
+    if not self.grid.remove(x, y):
+      raise KeyError(key)
+
+  def __contains__(self, key):
+    try:
+      x, y = self._loc(key)
+    except KeyError:
+      return False
+    return self.grid.tile_id(x, y) != EMPTY
+
+  def __iter__(self):
+    for x, y, type, variant in self.grid.items():
+      yield tile_key(x, y)
+
+  def __len__(self):
+    return len(self.grid)
+
 class Tilemap:
     def __init__(self, game, tile_size=16):
         self.saveload = SaveLoad()
@@ -22,66 +76,174 @@ class Tilemap:
         self.tile_size = tile_size
         #Foreground Tiles that are included in grid system.
         #these tiles have collision box that can collide with
-        #players or other objects.
-        self.tilemap = {}
+        #players or other objects. Tiles are stored in integer
+        #keyed chunks. See scripts/grid.py
+        self.grid = TileGrid()
+        #Lookup table of type ids that have collision box.
+        #Indexed by type id from self.grid
+        self.solid_ids = bytearray(256)
+        for type in PHYSICS_TILES:
+          self.solid_ids[self.grid.type_id(type)] = 1
+        #Solid cells of the grid for queries over areas and rows
+        #of tiles. See scripts/grid.py
+        self.solid = SolidMask(self.grid, self.solid_ids)
+        #(x, y) -> collision boxes of the solid tiles around
+        #the cell x, y. Made once and returned by
+        #closest_collision_tiles() until the grid changes.
+        self.collision_cells = {}
+        #self.grid.version when collision_cells was filled
+        self.collision_version = self.grid.version
+        #Pre-rendered surfaces of on-grid tile chunks.
+        #On-grid tiles are drawn from here instead of
+        #being blitted one by one every frame.
+        self.chunk_cache = ChunkCache(self)
         #Background Tiles. These tiles are excluded in 
         #grid system. These tiles consist of decorations and 
         #they don't have collision box.
-        self.offgrid_tiles = []
+        #Tiles are stored by id() to remove them without
+        #searching. Use offgrid_tiles to get them as a list.
+        self.offgrid = {}
+        #(type, variant) -> {id(tile): tile}. Used by extract()
+        #to find tiles without scanning all of them.
+        self.offgrid_kinds = {}
+        #Buckets of off-grid tiles by pixel area. Used to
+        #draw only the tiles on the screen and to find
+        #the tile under a point.
+        self.offgrid_index = SpatialIndex()
+        #Loads on-grid chunks around the camera when
+        #a level is streamed. None if the whole level
+        #is loaded.
+        self.stream = None
 
     def extract(self, attr_pairs, keep=False):
       matches = []
-      #We use copy() in this function because we don't want
-      #the original tiles to be modified 
-      #
-      #Loop through off-grid tiles
-      for tile in self.offgrid_tiles.copy():
-        #Check if the selected tile has the same type
-        #and variant as the attr_pairs
-        if (tile['type'], tile['variant']) in attr_pairs:
-          #If true, add a selected tile copy to 'matches' list
-          matches.append(tile.copy())
-          #if keep is False remove the selected tile to
-          #the off-grid tiles list
-          if not keep:
-            self.offgrid_tiles.remove(tile)
-
-      #Next, loop through on-grid tilemaps
-      for loc in self.tilemap:
-        tile = self.tilemap[loc]
-        #Check if the selected tile has the same type
-        #and variant as the attr_pairs
-        if (tile['type'], tile['variant']) in attr_pairs:
-          #If true, add a selected tile copy to 'matches' list
-          matches.append(tile.copy())
-          
-          #Convert the selected tile copy's x and y
-          #to screen coordinates. -1 means the last
-          #element in the list which is the newly
-          #added tile.
-          matches[-1]['pos'][0] *= self.tile_size
-          matches[-1]['pos'][1] *= self.tile_size
+      #Remove duplicate pairs so a tile isn't matched twice.
+      #dict keeps the caller's order, a set would order the
+      #on-grid matches by the string hash seed.
+      attr_pairs = list(dict.fromkeys(attr_pairs))
+
+      #Find off-grid tiles that have the same type and
+      #variant as the attr_pairs. Only the matching tiles
+      #are visited thanks to offgrid_kinds.
+      offgrid_matches = []
+      for pair in attr_pairs:
+        offgrid_matches.extend(self.offgrid_kinds.get(pair, {}).values())
+      #Keep the order the tiles were placed in
+      offgrid_matches.sort(key=lambda tile: self.offgrid_index.entries[id(tile)][0])
+
+      for tile in offgrid_matches:
+        #Add a selected tile copy to 'matches' list.
+        #We use copy() because we don't want the original
+        #tiles to be modified 
+        matches.append(tile.copy())
+        #if keep is False remove the selected tile from
+        #the off-grid tiles
+        if not keep:
+          self.remove_offgrid(tile)
+
+      #Next, find on-grid tiles the same way
+      for type, variant in attr_pairs:
+        for x, y in sorted(self.grid.locations(type, variant)):
+          #Add the selected tile to 'matches' list.
+          #Convert the tile's x and y to screen coordinates.
+          matches.append({
+            'type': type,
+            'variant': variant,
+            'pos': [x * self.tile_size, y * self.tile_size]
+          })
 
           if not keep:
-            del self.tilemap[loc]
+            self.grid.remove(x, y)
             
       return matches
 
+    @property
+    def tilemap(self):
+      return TilemapView(self.grid)
+
+    @tilemap.setter
+    def tilemap(self, tiles):
+      self.load_tiles(tiles)
+
+    def load_tiles(self, tiles):
+      self.grid.clear()
+      for tile in tiles.values():
+        self.add_tile(tile['pos'], tile['type'], tile['variant'])
+
+    def add_tile(self, loc, type, variant):
+      self.grid.set(loc[0], loc[1], type, variant)
+
+    def remove_tile(self, loc):
+      return self.grid.remove(loc[0], loc[1])
+
+    def offgrid_rect(self, tile):
+      img = self.game.assets[tile['type']][tile['variant']]
+      return (tile['pos'][0], tile['pos'][1], img.get_width(), img.get_height())
+
+    @property
+    def offgrid_tiles(self):
+      return list(self.offgrid.values())
+
+    @offgrid_tiles.setter
+    def offgrid_tiles(self, tiles):
+      self.load_offgrid(tiles)
+
+    def load_offgrid(self, tiles):
+      self.offgrid = {}
+      self.offgrid_kinds = {}
+      self.offgrid_index.clear()
+      for tile in tiles:
+        self.add_offgrid(tile)
+
+    def add_offgrid(self, tile):
+      self.offgrid[id(tile)] = tile
+      self.offgrid_kinds.setdefault((tile['type'], tile['variant']), {})[id(tile)] = tile
+      self.offgrid_index.insert(tile, self.offgrid_rect(tile))
+
+    def remove_offgrid(self, tile):
+      del self.offgrid[id(tile)]
+      del self.offgrid_kinds[(tile['type'], tile['variant'])][id(tile)]
+      self.offgrid_index.remove(tile)
+
+    #Get the first off-grid tile that contains a point
+    #in pixel coordinates. Returns None if there's none.
+    def offgrid_at(self, pos):
+      tiles = self.offgrid_index.query_point(pos)
+      if tiles:
+        return tiles[0]
+
     #Check if there's a solid tile existing in a
     #specific coordinate
     def solid_tile(self, pos):
-      #Get grid coodinate
-      tile_loc = str(
-          int(pos[0] // self.tile_size)) \
-          + ',' + \
-          str(int(pos[1] // self.tile_size)
+      #Get grid coodinate and check if the tile in it
+      #has collision box
+      return self.solid_ids[
+        self.grid.tile_id(int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
+      ] == 1
+
+    #Check if a rect in pixels overlaps a solid tile
+    def solid_rect(self, rect):
+      return self.solid.any_solid(
+        int(rect[0] // self.tile_size),
+        int(rect[1] // self.tile_size),
+        int((rect[0] + rect[2] - 1) // self.tile_size),
+        int((rect[1] + rect[3] - 1) // self.tile_size)
       )
-      #Check if grid coordinate has tile in tilemap
-      if tile_loc in self.tilemap:
-        #Check if the tilemap type has collision box
-        if self.tilemap[tile_loc]['type'] in PHYSICS_TILES:
-          #Return
-          return self.tilemap[tile_loc]
+
+    #Follow the row of pos in pixels to end_x. Returns the x
+    #where the first solid tile on the way starts or None if
+    #nothing is in the way.
+    def ray_cast_x(self, pos, end_x):
+      x = self.solid.first_solid_x(
+        int(pos[1] // self.tile_size),
+        int(pos[0] // self.tile_size),
+        int(end_x // self.tile_size)
+      )
+      if x is None:
+        return None
+      if end_x >= pos[0]:
+        return max(x * self.tile_size, pos[0])
+      return min((x + 1) * self.tile_size, pos[0])
 
     def tiles_around(self, pos):
         tiles = []
@@ -90,55 +252,113 @@ class Tilemap:
         #closest tiles collision boxes is based on player position.
         tile_loc = (int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
         for offset in CLOSEST_TILES:
-            loc = str(tile_loc[0] + offset[0]) + ',' + str(tile_loc[1] + offset[1])
-            if loc in self.tilemap:
-                tiles.append(self.tilemap[loc])
+            loc = (tile_loc[0] + offset[0], tile_loc[1] + offset[1])
+            tile = self.grid.get(loc[0], loc[1])
+            if tile is not None:
+                tiles.append({'type': tile[0], 'variant': tile[1], 'pos': list(loc)})
         return tiles
     
+    #Collision boxes of the solid tiles around a position.
+    #The list and the rects are shared, don't modify them.
     def closest_collision_tiles(self, pos):
-        rects = []
-        for tile in self.tiles_around(pos):
-            if tile['type'] in PHYSICS_TILES:
-                rects.append(pygame.Rect(tile['pos'][0] * self.tile_size, tile['pos'][1] * self.tile_size, self.tile_size, self.tile_size))
+        tile_x = int(pos[0] // self.tile_size)
+        tile_y = int(pos[1] // self.tile_size)
+        #Tiles were added or removed since the rects were made
+        if self.collision_version != self.grid.version:
+            self.collision_cells.clear()
+            self.collision_version = self.grid.version
+        rects = self.collision_cells.get((tile_x, tile_y))
+        if rects is None:
+            rects = []
+            for offset in CLOSEST_TILES:
+                x = tile_x + offset[0]
+                y = tile_y + offset[1]
+                if self.solid_ids[self.grid.tile_id(x, y)]:
+                    rects.append(pygame.Rect(x * self.tile_size, y * self.tile_size, self.tile_size, self.tile_size))
+            self.collision_cells[(tile_x, tile_y)] = rects
         return rects
 
-    def load_map(self, path):
-        try:
-          map_data = self.saveload.load(path)
+    #Data in the same format as the level files
+    def serialize(self):
+      tilemap = {}
+      for x, y, type, variant in self.grid.items():
+        tilemap[tile_key(x, y)] = {'type': type, 'variant': variant, 'pos': [x, y]}
+      return {
+        'tilemap': tilemap,
+        'tile_size': self.tile_size,
+        'offgrid': self.offgrid_tiles
+      }
+
+    def close_stream(self):
+      if self.stream is not None:
+        self.stream.close()
+        self.stream = None
 
-          self.tilemap = map_data['tilemap']
-          self.tile_size = map_data['tile_size']
-          self.offgrid_tiles = map_data['offgrid']
+    def load_data(self, map_data, warm=True):
+      self.close_stream()
+      self.chunk_cache.clear()
+      self.tile_size = map_data['tile_size']
+      self.collision_cells.clear()
+      self.solid.clear()
+      #Binary levels come with raw chunks instead of tile dicts.
+      #See scripts/editor/saveload.py
+      if 'chunks' in map_data:
+        self.grid.clear()
+        for chunk_x, chunk_y, types, variants in map_data['chunks']:
+          self.grid.load_chunk(chunk_x, chunk_y, map_data['types'], types, variants)
+      else:
+        self.load_tiles(map_data['tilemap'])
+      self.load_offgrid(map_data['offgrid'])
+      if warm:
+        self.chunk_cache.warm()
+
+    #If streaming is True and the level has a binary copy,
+    #only the off-grid tiles are loaded here. On-grid chunks
+    #are loaded by update_stream() as the camera moves.
+    #Off-grid tiles are always loaded because they hold the
+    #spawners and they're a small part of a level.
+    def load_map(self, path, streaming=False):
+        try:
+          binary_path = self.saveload.binary_path(path)
+          if streaming and binary_path is not None:
+            level = self.saveload.open_binary(binary_path)
+            self.close_stream()
+            self.chunk_cache.clear()
+            self.grid.clear()
+            self.tile_size = level['tile_size']
+            self.collision_cells.clear()
+            self.solid.clear()
+            self.load_offgrid(level['offgrid'])
+            self.stream = ChunkStream(self, level)
+          else:
+            self.load_data(self.saveload.load(path))
         except FileNotFoundError:
           print("No map found.")
 
+    #scroll is the top-left of the camera and view_size
+    #is the size of the display in pixels
+    def update_stream(self, scroll, view_size, wait=False):
+      if self.stream is not None:
+        self.stream.update(scroll, view_size, wait)
+
+    #Check if the tiles around a position are loaded
+    def loaded(self, pos):
+      if self.stream is None:
+        return True
+      return self.stream.loaded(pos)
+
     def render(self, surf, offset):
-        for tile in self.offgrid_tiles:
+        #Only draw the off-grid tiles that overlap the camera
+        visible_tiles = self.offgrid_index.query_rect(
+          (offset[0], offset[1], surf.get_width(), surf.get_height())
+        )
+        for tile in visible_tiles:
             surf.blit(
               self.game.assets[tile['type']][tile['variant']], 
               (tile['pos'][0] - offset[0], tile['pos'][1] - offset[1])
             )
         
-        #Map all tiles that's covered by the camera
-        #This is more efficient performance-wise rather than
-        #rendering all tiles even the ones that are not visible
-        #on the screen.
-        #
-        #First off, convert the top-left(offset[0]) point of the camera to 
-        #grid x-coordinate then do the same to the top-right
-        #(offset[0] + surf.get_width()) of the camera.
-        #Do the same for y-axis to get the top and bottom points of camera.
-        #Don't forget to add +1 to the second parameter of range() this is because
-        #the second parameter of range is exclusive. In other words, range skips
-        #the value in the second param. For example, range(1, 5) will be iterated 
-        #from 1 to 4, excluding 5.
-        for x in range(int(offset[0] // self.tile_size), int((offset[0] + surf.get_width()) // self.tile_size + 1)):
-            for y in range(int(offset[1] // self.tile_size), int((offset[1] + surf.get_height()) // self.tile_size + 1)):
-                loc = str(x) + ',' + str(y)
-                if loc in self.tilemap:
-                    tile = self.tilemap[loc]
-                    surf.blit(
-                      self.game.assets[tile['type']][tile['variant']], 
-                      (tile['pos'][0] * self.tile_size - offset[0], 
-                       tile['pos'][1] * self.tile_size - offset[1])
-                    )
\ No newline at end of file
+        #Draw the pre-rendered chunks covered by the camera.
+        #Chunks are 16x16 tiles so only a few blits are
+        #needed per frame. See scripts/chunkcache.py
+        self.chunk_cache.render(surf, offset)
@@ -2,36 +2,69 @@ import os
 
 import pygame
 
+from scripts.assetcache import load_surface
+from scripts.atlas import Atlas, ATLAS_PATH, ATLAS_INDEX
+
 BASE_IMG_PATH = 'data/images/'
 
+#Sprite sheets made by pack_atlas.py. Opened on the first
+#image load. False if there's no atlas or it's out of date.
+atlas = None
+
+def get_atlas():
+    global atlas
+    if atlas is None:
+      atlas = False
+      if os.path.exists(ATLAS_PATH + ATLAS_INDEX):
+        packed = Atlas()
+        if packed.fresh(BASE_IMG_PATH):
+          atlas = packed
+        else:
+          print('The image atlas is out of date. Run pack_atlas.py to update it.')
+    return atlas
+
 def load_image(path, colorkey=(0, 0, 0)):
+    if get_atlas():
+      return atlas.load_image(path, colorkey)
+
     img = None
     if colorkey is not None:
-      img = pygame.image.load(BASE_IMG_PATH + path).convert()
+      img = load_surface(BASE_IMG_PATH + path).convert()
       img.set_colorkey((0, 0, 0))
     else:
-      img = pygame.image.load(BASE_IMG_PATH + path).convert_alpha()
+      img = load_surface(BASE_IMG_PATH + path).convert_alpha()
 
     return img
 
 def load_images(path, colorkey=(0, 0, 0)):
     images = []
-    for img_name in sorted(os.listdir(BASE_IMG_PATH + path)):
+    if get_atlas():
+      img_names = atlas.list_images(path)
+    else:
+      img_names = sorted(os.listdir(BASE_IMG_PATH + path))
+    for img_name in img_names:
         images.append(load_image(path + '/' + img_name, colorkey))
     return images
 
-def create_outline(non_silhouette_surf, display_surf):
-  #Select a surface for masking
-  mask = pygame.mask.from_surface(display_surf)
-  #All non-transparent color becomes black
-  #according to setcolor All transparent color becomes 
-  #transparent according to unsetcolor.
-  #remember, to_surface creates a copy of the surface from 'from_surface',
-  #it doesn't modify the surface.
-  silhouette = mask.to_surface(setcolor=(0,0,0,100), unsetcolor=(0,0,0,0))
+#silhouette_surf is an SRCALPHA surface as big as
+#display_surf that is drawn over. A new one is made if it's
+#not given. Pass the same one every frame to avoid making
+#a surface per frame.
+def create_outline(non_silhouette_surf, display_surf, silhouette_surf=None):
+  if silhouette_surf is None:
+    silhouette_surf = pygame.Surface(display_surf.get_size(), pygame.SRCALPHA)
+  #All non-transparent color becomes (0,0,0,100) and all
+  #transparent color stays transparent. Multiplying by the
+  #display does this in one blit instead of making a mask
+  #and a new surface from it. The display only has fully
+  #transparent and fully opaque pixels since every image is
+  #drawn with a colorkey, so alpha becomes 100 * 255 / 255
+  #or 0 like with a mask.
+  silhouette_surf.fill((0, 0, 0, 100))
+  silhouette_surf.blit(display_surf, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
 
   for offset in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-    non_silhouette_surf.blit(silhouette, offset)
+    non_silhouette_surf.blit(silhouette_surf, offset)
 
   #Override silhouette
   non_silhouette_surf.blit(display_surf, (0, 0))
\ No newline at end of file